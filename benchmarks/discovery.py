@@ -0,0 +1,78 @@
+# Copyright (c) Twisted Matrix Laboratories.
+# See LICENSE for details.
+
+"""
+Compare the time taken to find the projects of a Git working copy by walking
+its directories with L{ProjectFinder} against listing the files under version
+control with C{git ls-files} and filtering them with L{TrackedFiles}.
+
+Usage: python benchmarks/discovery.py [PROJECTS [DIRECTORIES]]
+"""
+
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from twisted.python.filepath import FilePath
+
+from newsbuilder._discovery import ProjectFinder, TrackedFiles
+from newsbuilder._vcs import GitBackend
+
+from synthetic import makeRepository
+
+
+
+def makeDirectories(base, count):
+    """
+    Create C{count} directories holding one file each, which are not
+    projects, spread over a few levels beneath C{base}.
+    """
+    for number in range(count):
+        directory = base.descendant(
+            ['other', str(number % 10), str(number % 100), str(number)])
+        directory.makedirs()
+        directory.child('module.py').setContent('')
+
+
+
+def main(args):
+    """
+    Run the benchmark, optionally with the number of projects and of other
+    directories given as arguments.
+    """
+    projects = int(args[0]) if args else 50
+    directories = int(args[1]) if len(args) > 1 else 5000
+    base = FilePath(tempfile.mkdtemp())
+    try:
+        repository = makeRepository(base, projects, 5, 0)
+        makeDirectories(repository, directories)
+        subprocess.check_call(['git', 'init', '-q', repository.path])
+        subprocess.check_call(
+            ['git', '-C', repository.path, 'add', '-A'])
+
+        def walk():
+            return ProjectFinder().find(repository.path)
+
+        def index():
+            backend = GitBackend(
+                lambda args, output: output(subprocess.check_output(args)))
+            return TrackedFiles(
+                repository.path, backend.trackedFiles(repository.path)
+            ).findProjects()
+
+        assert walk() == index()
+        for name, function in [("walk", walk), ("git ls-files", index)]:
+            before = time.time()
+            function()
+            elapsed = time.time() - before
+            print("%-13s %5d projects %6d directories %8.3fs" % (
+                name, projects, directories, elapsed))
+    finally:
+        shutil.rmtree(base.path)
+
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,56 @@
+# Copyright (c) Twisted Matrix Laboratories.
+# See LICENSE for details.
+
+"""
+Count the version control processes spawned by
+L{TwistedBuildStrategy.buildAll} for a synthetic release, compared with one
+process per news fragment.
+
+The version control commands are recorded instead of being run, so no
+working copy is needed.
+
+Usage: python benchmarks/fragmentdeletion.py [PROJECTS [FRAGMENTS]]
+
+FRAGMENTS is the number of news fragments of each type in each project.
+"""
+
+import shutil
+import sys
+import tempfile
+import time
+
+from twisted.python.filepath import FilePath
+
+from newsbuilder import NewsBuilder, TwistedBuildStrategy
+
+from synthetic import StubVCS, makeRepository
+
+
+
+def main(args):
+    """
+    Run the benchmark, optionally with the number of projects and of
+    fragments per project given as arguments.
+    """
+    projects = int(args[0]) if args else 20
+    fragments = int(args[1]) if len(args) > 1 else 40
+    total = projects * fragments * len(NewsBuilder._headings)
+    base = FilePath(tempfile.mkdtemp())
+    try:
+        repository = makeRepository(base, projects, fragments, 0)
+        with StubVCS() as vcs:
+            before = time.time()
+            TwistedBuildStrategy(NewsBuilder()).buildAll(repository)
+            elapsed = time.time() - before
+    finally:
+        shutil.rmtree(base.path)
+
+    print("%d projects, %d fragments" % (projects, total))
+    print("one process per fragment: %6d processes" % (1 + total,))
+    print("batched:                  %6d processes" % (len(vcs.commands),))
+    print("elapsed:                  %9.3fs" % (elapsed,))
+
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
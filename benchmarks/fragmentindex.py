@@ -0,0 +1,88 @@
+# Copyright (c) Twisted Matrix Laboratories.
+# See LICENSE for details.
+
+"""
+Compare the number of directory listings and the time taken to load news
+fragments one type at a time with L{NewsBuilder._findChanges} against loading
+them all at once with L{NewsBuilder._indexChanges}.
+
+Usage: python benchmarks/fragmentindex.py [FRAGMENTS]
+"""
+
+import shutil
+import sys
+import tempfile
+import time
+
+from twisted.python.filepath import FilePath
+
+from newsbuilder import NewsBuilder
+
+
+
+def makeFragments(directory, count):
+    """
+    Fill C{directory} with C{count} news fragments spread evenly over the
+    supported news entry types.
+    """
+    types = sorted(NewsBuilder._headings)
+    for ticket in range(count):
+        ticketType = types[ticket % len(types)]
+        directory.child('%d%s' % (ticket, ticketType)).setContent(
+            'Fragment number %d.\n' % (ticket,))
+
+
+
+def measure(function):
+    """
+    Call C{function} and count how many times it lists a directory.
+
+    @return: A two-tuple of the number of calls to L{FilePath.listdir} and
+        the elapsed wall time in seconds.
+    """
+    listings = []
+    listdir = FilePath.listdir
+    def countingListdir(self):
+        listings.append(self.path)
+        return listdir(self)
+    FilePath.listdir = countingListdir
+    try:
+        before = time.time()
+        function()
+        elapsed = time.time() - before
+    finally:
+        FilePath.listdir = listdir
+    return len(listings), elapsed
+
+
+
+def main(args):
+    """
+    Run the benchmark, optionally with the number of fragments given as the
+    first argument.
+    """
+    count = int(args[0]) if args else 5000
+    builder = NewsBuilder()
+    directory = FilePath(tempfile.mkdtemp())
+    try:
+        makeFragments(directory, count)
+
+        def perType():
+            for ticketType in builder._headings:
+                builder._findChanges(directory, ticketType)
+
+        def indexed():
+            builder._indexChanges(directory)
+
+        for name, function in [("per-type scans", perType),
+                               ("single index", indexed)]:
+            listings, elapsed = measure(function)
+            print("%-15s %6d fragments %3d listings %8.3fs" % (
+                name, count, listings, elapsed))
+    finally:
+        shutil.rmtree(directory.path)
+
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
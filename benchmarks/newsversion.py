@@ -0,0 +1,99 @@
+# Copyright (c) Twisted Matrix Laboratories.
+# See LICENSE for details.
+
+"""
+Time changing the version in the header of a large NEWS file with
+L{_changeNewsVersion}, compared with the way it used to be changed and with
+reading the whole file once.
+
+Usage: python benchmarks/newsversion.py [MEGABYTES [RUNS]]
+"""
+
+import re
+import shutil
+import sys
+import tempfile
+import time
+
+from twisted.python.filepath import FilePath
+from twisted.python.versions import Version
+
+from newsbuilder._newsbuilder import (
+    _changeNewsVersion, _formatHeader, replaceInFile)
+
+from synthetic import makeNews
+
+
+
+def previousChangeNewsVersion(news, name, oldVersion, newVersion, today):
+    """
+    Change the header of a NEWS file the way newsbuilder used to: compile
+    the header pattern, search the whole contents of the file for it and
+    have L{replaceInFile} rewrite the file.
+    """
+    newHeader = _formatHeader(
+        "Twisted %s %s (%s)" % (name, newVersion.base(), today))
+    expectedHeaderRegex = re.compile(
+        r"Twisted %s %s \(\d{4}-\d\d-\d\d\)\n=+\n\n" % (
+            re.escape(name), re.escape(oldVersion.base())))
+    oldNews = news.getContent()
+    match = expectedHeaderRegex.search(oldNews)
+    if match:
+        oldHeader = match.group()
+        replaceInFile(news.path, {oldHeader: newHeader})
+
+
+
+def timeChange(function, news, versions, runs):
+    """
+    Change the version in the header of C{news} back and forth with
+    C{function}, C{runs} times.
+
+    @return: The mean time of the runs, in seconds.
+    """
+    before = time.time()
+    for run in range(runs):
+        function(news, 'Core', versions[run % 2], versions[(run + 1) % 2],
+                 '2015-01-01')
+    return (time.time() - before) / runs
+
+
+
+def main(args):
+    """
+    Run the benchmark, optionally with the size of the NEWS file in
+    megabytes and the number of runs given as arguments.
+    """
+    megabytes = float(args[0]) if args else 16
+    runs = int(args[1]) if len(args) > 1 else 10
+    versions = [Version('twisted', 15, 0, 0), Version('twisted', 15, 1, 0)]
+    base = FilePath(tempfile.mkdtemp())
+    try:
+        news = base.child('NEWS')
+        news.setContent(
+            _formatHeader('Twisted Core 15.0.0 (2015-01-01)') +
+            makeNews(int(megabytes * 2 ** 20)))
+
+        before = time.time()
+        for _ in range(runs):
+            news.getContent()
+        reading = (time.time() - before) / runs
+
+        # An even number of runs leaves the header as it was for the next
+        # function.
+        runs += runs % 2
+        previous = timeChange(previousChangeNewsVersion, news, versions, runs)
+        changing = timeChange(_changeNewsVersion, news, versions, runs)
+    finally:
+        shutil.rmtree(base.path)
+
+    print("NEWS size:                %9.1fMB" % (megabytes,))
+    print("reading the whole file:   %9.2fms" % (reading * 1000,))
+    print("read, search and replace: %9.2fms" % (previous * 1000,))
+    print("_changeNewsVersion:       %9.2fms" % (changing * 1000,))
+    print("speedup:                  %9.1fx" % (previous / changing,))
+
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,77 @@
+# Copyright (c) Twisted Matrix Laboratories.
+# See LICENSE for details.
+
+"""
+Measure how long it takes to import newsbuilder and to run
+C{newsbuilder --version} in a fresh interpreter.
+
+Usage: python benchmarks/startup.py [--runs N] [--max-ms MILLISECONDS]
+
+With I{--max-ms}, the exit status is 1 if the median time of any of the
+commands exceeds the given number of milliseconds.
+"""
+
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+COMMANDS = [
+    ("python (baseline)", [sys.executable, "-c", "pass"]),
+    ("import newsbuilder", [sys.executable, "-c", "import newsbuilder"]),
+    ("newsbuilder --version",
+     [sys.executable, os.path.join(ROOT, "bin", "newsbuilder"), "--version"]),
+]
+
+
+
+def timeCommand(args, runs):
+    """
+    Run C{args} C{runs} times.
+
+    @return: The median wall time of the runs, in milliseconds.
+    """
+    environ = dict(os.environ)
+    environ['PYTHONPATH'] = os.pathsep.join(
+        [ROOT] + filter(None, [environ.get('PYTHONPATH')]))
+    timings = []
+    with open(os.devnull, 'w') as devnull:
+        for _ in range(runs):
+            before = time.time()
+            subprocess.check_call(args, stdout=devnull, env=environ)
+            timings.append((time.time() - before) * 1000)
+    timings.sort()
+    return timings[len(timings) // 2]
+
+
+
+def main(args):
+    """
+    Time each of the L{COMMANDS}.
+    """
+    runs = 10
+    maximum = None
+    while args:
+        option = args.pop(0)
+        if option == '--runs':
+            runs = int(args.pop(0))
+        elif option == '--max-ms':
+            maximum = float(args.pop(0))
+        else:
+            sys.exit(__doc__)
+
+    failed = False
+    for name, command in COMMANDS:
+        median = timeCommand(command, runs)
+        print("%-25s %8.1fms" % (name, median))
+        if maximum is not None and median > maximum:
+            failed = True
+    if failed:
+        sys.exit(1)
+
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,229 @@
+# Copyright (c) Twisted Matrix Laboratories.
+# See LICENSE for details.
+
+"""
+Time each stage of a release on a synthetic repository, from project
+discovery to L{TwistedBuildStrategy.buildAll}.
+
+The version control commands are recorded instead of being run, so no
+working copy is needed.
+
+Usage: python benchmarks/suite.py [--projects N] [--fragments M]
+           [--news-size BYTES] [--runs N] [--output RESULTS.json]
+           [--compare PREVIOUS.json] [--tolerance FRACTION]
+
+With I{--output}, the results are saved as JSON.  With I{--compare}, they are
+checked against the results of a previous run, and the exit status is 1 if
+the median time of any benchmark grew by more than the tolerance (by default
+0.2, that is 20%).
+"""
+
+import json
+import platform
+import shutil
+import sys
+import tempfile
+import time
+
+from StringIO import StringIO
+
+from twisted.python.filepath import FilePath
+
+from newsbuilder import NewsBuilder, TwistedBuildStrategy, findTwistedProjects
+
+from synthetic import StubVCS, makeRepository
+
+
+
+def measure(setup, function, runs):
+    """
+    Time a function.
+
+    @param setup: A function called before each run, which is not timed, and
+        the result of which is passed to C{function}.
+    @param function: The function to time.
+    @param runs: The number of times to run C{function}.
+
+    @return: A C{dict} with the C{"min"} and C{"median"} times of the runs
+        and the C{"runs"} themselves, in milliseconds.
+    """
+    timings = []
+    for _ in range(runs):
+        state = setup()
+        before = time.time()
+        function(state)
+        timings.append((time.time() - before) * 1000)
+    ordered = sorted(timings)
+    return {
+        'min': ordered[0],
+        'median': ordered[len(ordered) // 2],
+        'runs': timings,
+    }
+
+
+
+def benchmarks(pristine, scratch):
+    """
+    Describe the benchmarks to run on a synthetic repository.
+
+    @param pristine: The I{twisted} directory of a synthetic repository,
+        which is only read.
+    @type pristine: L{FilePath}
+
+    @param scratch: A directory into which C{pristine} is copied for the
+        benchmarks which change the repository.
+    @type scratch: L{FilePath}
+
+    @return: A C{list} of C{(name, setup, function)} tuples, as accepted by
+        L{measure}.
+    """
+    builder = NewsBuilder()
+    projects = findTwistedProjects(pristine)
+    topfiles = [project.directory.child('topfiles') for project in projects]
+    indexes = [builder._indexChanges(path) for path in topfiles]
+    sections = [
+        ticketType for ticketType in sorted(builder._headings)
+        if ticketType != builder._MISC]
+
+    def nothing():
+        return None
+
+    def copy():
+        target = scratch.child('twisted')
+        if target.exists():
+            target.remove()
+        pristine.copyTo(target)
+        return target
+
+    def findProjects(ignored):
+        findTwistedProjects(pristine)
+
+    def findChanges(ignored):
+        for path in topfiles:
+            for ticketType in builder._headings:
+                builder._findChanges(path, ticketType)
+
+    def writeSections(ignored):
+        output = StringIO()
+        for index in indexes:
+            for ticketType in sections:
+                builder._writeSection(
+                    output, builder._headings[ticketType], index[ticketType])
+            builder._writeMisc(
+                output, builder._headings[builder._MISC],
+                index[builder._MISC])
+
+    def build(repository):
+        for project in findTwistedProjects(repository):
+            topfiles = project.directory.child('topfiles')
+            builder.build(
+                topfiles, topfiles.child('NEWS'),
+                'Twisted Benchmark 1.0.0 (2015-01-01)')
+
+    def buildAll(repository):
+        with StubVCS():
+            TwistedBuildStrategy(NewsBuilder()).buildAll(repository)
+
+    return [
+        ('findTwistedProjects', nothing, findProjects),
+        ('_findChanges', nothing, findChanges),
+        ('_writeSection/_writeMisc', nothing, writeSections),
+        ('build', copy, build),
+        ('buildAll', copy, buildAll),
+    ]
+
+
+
+def compare(results, previous, tolerance):
+    """
+    Compare the results of this run with those of a previous one.
+
+    @param results: The benchmark results of this run, mapping benchmark
+        names to the C{dict}s returned by L{measure}.
+    @param previous: The benchmark results of a previous run, in the same
+        form.
+    @param tolerance: The fraction by which a median time may grow before it
+        counts as a regression.
+
+    @return: A C{list} of the names of the benchmarks which regressed.
+    """
+    regressions = []
+    for name in sorted(results):
+        if name not in previous:
+            continue
+        before = previous[name]['median']
+        after = results[name]['median']
+        change = (after - before) / before if before else 0.0
+        regressed = change > tolerance
+        if regressed:
+            regressions.append(name)
+        print("%-25s %10.2fms -> %10.2fms %+7.1f%%%s" % (
+            name, before, after, change * 100,
+            "  REGRESSION" if regressed else ""))
+    return regressions
+
+
+
+def main(args):
+    """
+    Generate a synthetic repository, run the benchmarks on it and report,
+    save or compare the results as given by the command line arguments.
+    """
+    parameters = {'projects': 20, 'fragments': 20, 'newsSize': 2 ** 20}
+    runs = 5
+    output = None
+    previous = None
+    tolerance = 0.2
+    while args:
+        option = args.pop(0)
+        if option == '--projects':
+            parameters['projects'] = int(args.pop(0))
+        elif option == '--fragments':
+            parameters['fragments'] = int(args.pop(0))
+        elif option == '--news-size':
+            parameters['newsSize'] = int(args.pop(0))
+        elif option == '--runs':
+            runs = int(args.pop(0))
+        elif option == '--output':
+            output = FilePath(args.pop(0))
+        elif option == '--compare':
+            previous = json.loads(FilePath(args.pop(0)).getContent())
+        elif option == '--tolerance':
+            tolerance = float(args.pop(0))
+        else:
+            sys.exit(__doc__)
+
+    base = FilePath(tempfile.mkdtemp())
+    try:
+        pristine = makeRepository(
+            base.child('pristine'), parameters['projects'],
+            parameters['fragments'], parameters['newsSize'])
+        scratch = base.child('scratch')
+        scratch.makedirs()
+        results = {}
+        for name, setup, function in benchmarks(pristine, scratch):
+            results[name] = measure(setup, function, runs)
+            print("%-25s %10.2fms (min %.2fms)" % (
+                name, results[name]['median'], results[name]['min']))
+    finally:
+        shutil.rmtree(base.path)
+
+    if output is not None:
+        output.setContent(json.dumps({
+            'parameters': parameters,
+            'runs': runs,
+            'python': platform.python_version(),
+            'results': results,
+        }, indent=2, sort_keys=True))
+
+    if previous is not None:
+        if previous.get('parameters') != parameters:
+            print("warning: the previous results were for %r" % (
+                previous.get('parameters'),))
+        if compare(results, previous['results'], tolerance):
+            sys.exit(1)
+
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
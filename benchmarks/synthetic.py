@@ -0,0 +1,153 @@
+# Copyright (c) Twisted Matrix Laboratories.
+# See LICENSE for details.
+
+"""
+Generation of synthetic Twisted-style repositories for the benchmarks, and a
+stub version control system so they can be built without a working copy.
+"""
+
+from twisted.python.versions import Version
+
+from newsbuilder import NewsBuilder, generateVersionFileData
+from newsbuilder import _newsbuilder
+
+# The text repeated to fill the NEWS files.
+_OLD_NEWS = (
+    'Twisted Synthetic 1.0.0 (2010-01-01)\n'
+    '====================================\n'
+    '\n'
+    'Features\n'
+    '--------\n'
+    ' - twisted.synthetic now generates some old news so that there is\n'
+    '   something to prepend new news to. (#1)\n'
+    '\n\n')
+
+
+
+def makeNews(size):
+    """
+    Make the contents of a NEWS file.
+
+    @param size: The approximate size of the contents in bytes.
+    @return: A C{str} starting with the ticket hint.
+    """
+    repeats = max(size // len(_OLD_NEWS), 1)
+    return NewsBuilder._TICKET_HINT + _OLD_NEWS * repeats
+
+
+
+def makeFragments(topfiles, fragments, firstTicket=1):
+    """
+    Create news fragments of every type in a directory.
+
+    @param topfiles: The directory in which to create the fragments.
+    @type topfiles: L{FilePath}
+
+    @param fragments: The number of fragments of each type to create.
+
+    @param firstTicket: The ticket number of the first fragment.
+
+    @return: The ticket number following the last fragment.
+    """
+    ticket = firstTicket
+    for ticketType in sorted(NewsBuilder._headings):
+        for _ in range(fragments):
+            if ticketType == NewsBuilder._MISC:
+                content = ''
+            else:
+                content = (
+                    'twisted.synthetic.Thing%d now does the right thing when '
+                    'called with\nthe wrong arguments, which used to make it '
+                    'do the wrong thing.\n' % (ticket,))
+            topfiles.child('%d%s' % (ticket, ticketType)).setContent(content)
+            ticket += 1
+    return ticket
+
+
+
+def makeRepository(base, projects=10, fragments=10, newsSize=65536):
+    """
+    Create a synthetic repository of Twisted-style projects.
+
+    The first project is I{twisted} itself, directly beneath C{base}, and the
+    others are its subpackages.  Each has a I{_version.py}, a I{topfiles}
+    directory with a I{README}, a I{NEWS} file and news fragments.
+
+    @param base: The directory in which to create the repository.  It is
+        created if it does not exist.
+    @type base: L{FilePath}
+
+    @param projects: The number of projects.
+    @param fragments: The number of news fragments of each type per project.
+    @param newsSize: The approximate size in bytes of each I{NEWS} file,
+        including the top-level one.
+
+    @return: The L{FilePath} of the I{twisted} directory, to be given to
+        L{TwistedBuildStrategy.buildAll}.
+    """
+    twisted = base.child('twisted')
+    twisted.makedirs()
+    # Recognized as a Subversion working copy by newsbuilder._vcs.
+    twisted.child('.svn').makedirs()
+    twisted.child('.svn').child('wc.db').setContent('')
+    twisted.child('NEWS').setContent(makeNews(newsSize))
+    ticket = 1
+    for number in range(projects):
+        if number == 0:
+            package = 'twisted'
+            directory = twisted
+        else:
+            package = 'twisted.sub%d' % (number,)
+            directory = twisted.child('sub%d' % (number,))
+            directory.makedirs()
+        version = Version(package, 15, number % 10, 0)
+        directory.child('__init__.py').setContent('')
+        directory.child('_version.py').setContent(
+            generateVersionFileData(version))
+        topfiles = directory.child('topfiles')
+        topfiles.makedirs()
+        topfiles.child('README').setContent(version.base())
+        topfiles.child('NEWS').setContent(makeNews(newsSize))
+        ticket = makeFragments(topfiles, fragments, ticket)
+    return twisted
+
+
+
+class StubVCS(object):
+    """
+    A stand-in for the version control commands run by newsbuilder, which
+    records them instead of running them.
+
+    Use it as a context manager; while it is active, L{runCommand} in
+    L{newsbuilder._newsbuilder} is replaced.
+
+    @ivar commands: The argument vectors of the commands run.
+    """
+    def __init__(self):
+        self.commands = []
+
+
+    def runCommand(self, args, output=None):
+        """
+        Record a command as having succeeded with no output, except for
+        C{svn status}, whose output shows every file as under version
+        control.
+        """
+        self.commands.append(args)
+        result = ''
+        if args[:2] == ['svn', 'status']:
+            result = '<?xml version="1.0"?>\n<status>\n</status>\n'
+        if output is None:
+            return result
+        output(result)
+        return ''
+
+
+    def __enter__(self):
+        self._runCommand = _newsbuilder.runCommand
+        _newsbuilder.runCommand = self.runCommand
+        return self
+
+
+    def __exit__(self, *exc):
+        _newsbuilder.runCommand = self._runCommand
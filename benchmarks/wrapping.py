@@ -0,0 +1,73 @@
+# Copyright (c) Twisted Matrix Laboratories.
+# See LICENSE for details.
+
+"""
+Compare the time taken to wrap news entries with L{textwrap.fill} and with
+the wrapper used by newsbuilder, for typical entries and for the single
+entry listing every miscellaneous ticket.
+
+Usage: python benchmarks/wrapping.py [TICKETS [RUNS]]
+"""
+
+import sys
+import textwrap
+import time
+
+from newsbuilder._wrapping import fill
+
+
+
+def textwrapFill(text):
+    """
+    Wrap an entry the way newsbuilder used to.
+    """
+    return textwrap.fill(text, subsequent_indent='   ')
+
+
+
+def timeFill(function, entries, runs):
+    """
+    Wrap each of C{entries} with C{function}, C{runs} times.
+
+    @return: The best time of the runs, in milliseconds.
+    """
+    best = None
+    for _ in range(runs):
+        before = time.time()
+        for entry in entries:
+            function(entry)
+        elapsed = (time.time() - before) * 1000
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+
+
+def main(args):
+    """
+    Run the benchmark, optionally with the number of tickets and of runs
+    given as arguments.
+    """
+    tickets = int(args[0]) if args else 20000
+    runs = int(args[1]) if len(args) > 1 else 5
+    cases = [
+        ("%d entries" % (tickets,), [
+            ' - twisted.synthetic.Thing%d now does the right thing when '
+            'called with the wrong arguments, which used to make it do the '
+            'wrong thing. (#%d)' % (ticket, ticket)
+            for ticket in range(tickets)]),
+        ("misc list of %d tickets" % (tickets,), [
+            ' - ' + ', '.join('#%d' % (ticket,)
+                              for ticket in range(tickets))]),
+    ]
+    for name, entries in cases:
+        assert map(fill, entries) == map(textwrapFill, entries)
+        slow = timeFill(textwrapFill, entries, runs)
+        fast = timeFill(fill, entries, runs)
+        print("%-28s textwrap %9.2fms  fill %9.2fms  (%.1fx)" % (
+            name, slow, fast, slow / fast))
+
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -3,14 +3,14 @@
 
 """
 L{newsbuilder} public APIs
+
+The public names are loaded from L{newsbuilder._newsbuilder}, and
+C{__version__} is computed, the first time they are used, so that importing
+this package does not import Twisted or run any version control commands.
 """
 
-from ._newsbuilder import (
-    findTwistedProjects, replaceInFile,
-    replaceProjectVersion, Project, generateVersionFileData,
-    CommandFailed, runCommand, NewsBuilder, NotWorkingDirectory,
-    TwistedBuildStrategy,
-    NewsBuilderOptions, NewsBuilderScript)
+import sys
+from types import ModuleType
 
 __all__ = [
     'findTwistedProjects',
@@ -28,6 +28,57 @@ __all__ = [
     '__version__',
 ]
 
-from ._version import get_versions
-__version__ = get_versions()['version']
-del get_versions
+
+
+def _getVersion():
+    """
+    Compute the version of newsbuilder.
+
+    In distributions and builds, I{_version.py} is replaced by versioneer with
+    a file containing the version computed at build time.  In a checkout, the
+    version is computed from the version control metadata.
+
+    @return: The version string.
+    """
+    from ._version import get_versions
+    return get_versions()['version']
+
+
+
+class _LazyModule(ModuleType):
+    """
+    The L{newsbuilder} package, which loads its public names when they are
+    first used.
+
+    @ivar _original: The module object this one replaced in L{sys.modules},
+        which is kept alive because on Python 2 the globals of a module are
+        cleared when it is garbage collected.
+    """
+
+    def __getattr__(self, name):
+        """
+        Load a public name which has not been used yet.
+        """
+        if name == '__version__':
+            value = _getVersion()
+        elif name in __all__:
+            from . import _newsbuilder
+            value = getattr(_newsbuilder, name)
+        else:
+            raise AttributeError(name)
+        setattr(self, name, value)
+        return value
+
+
+    def __dir__(self):
+        """
+        Include the public names which have not been loaded yet.
+        """
+        return sorted(set(self.__dict__) | set(__all__))
+
+
+
+_module = _LazyModule(__name__)
+_module.__dict__.update(sys.modules[__name__].__dict__)
+_module._original = sys.modules[__name__]
+sys.modules[__name__] = _module
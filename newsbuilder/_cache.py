@@ -0,0 +1,47 @@
+# -*- test-case-name: newsbuilder.test.test_cache -*-
+# Copyright (c) Twisted Matrix Laboratories.
+# See LICENSE for details.
+
+"""
+The files newsbuilder keeps about a working copy in the user's cache, rather
+than in the working copy, where they would show up as files unknown to the
+version control system.
+"""
+
+from hashlib import sha1
+import os
+
+from twisted.python.filepath import FilePath
+
+
+
+def cacheDirectory():
+    """
+    Get the directory in which newsbuilder keeps its files.
+
+    @return: A L{FilePath} of the I{newsbuilder} directory in
+        C{$XDG_CACHE_HOME}, or in I{~/.cache} if it is not set.
+    """
+    cache = os.environ.get('XDG_CACHE_HOME')
+    if not cache:
+        cache = os.path.join(os.path.expanduser('~'), '.cache')
+    return FilePath(cache).child('newsbuilder')
+
+
+
+def cachePath(kind, path):
+    """
+    Get the file in which something about a file or directory is kept,
+    named after its absolute path.
+
+    @param kind: The name of the directory, in L{cacheDirectory}, of the
+        files of this kind, such as C{"news-index"}.
+    @type kind: C{str}
+
+    @param path: The path of the file or directory.
+    @type path: C{str}
+
+    @return: A L{FilePath}, whose parent directory may not exist yet.
+    """
+    key = sha1(os.path.abspath(path)).hexdigest()
+    return cacheDirectory().child(kind).child(key + '.json')
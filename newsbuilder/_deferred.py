@@ -0,0 +1,178 @@
+# -*- test-case-name: newsbuilder.test.test_deferred -*-
+# Copyright (c) Twisted Matrix Laboratories.
+# See LICENSE for details.
+
+"""
+Building news without blocking the reactor, for use inside Twisted
+applications.
+
+This is kept apart from L{newsbuilder._newsbuilder} so that the command line
+tool does not pay for importing L{twisted.internet}.
+"""
+
+import errno
+import os
+
+from twisted.internet.defer import Deferred, fail, inlineCallbacks
+from twisted.internet.error import (
+    ProcessDone, ProcessExitedAlready, ProcessTerminated)
+from twisted.internet.protocol import ProcessProtocol
+from twisted.internet.threads import blockingCallFromThread, deferToThreadPool
+from twisted.python.procutils import which
+
+from ._process import CommandFailed, CommandTimedOut, _TailBuffer
+
+
+
+class _CommandProtocol(ProcessProtocol):
+    """
+    Collect the output of a process and report how it exited.
+
+    @ivar deferred: The L{Deferred} fired with the output of the process
+        once it has exited successfully, or failed with L{CommandFailed}, or
+        L{CommandTimedOut} if it was killed by L{_CommandProtocol.timeOut}.
+    """
+    def __init__(self, deferred, maxOutput, output=None):
+        self.deferred = deferred
+        self._kept = _TailBuffer(maxOutput)
+        self._output = output or self._kept.append
+        self._timeout = None
+        self.timeoutCall = None
+
+
+    def connectionMade(self):
+        self.transport.closeStdin()
+
+
+    def childDataReceived(self, childFD, data):
+        self._output(data)
+
+
+    def timeOut(self, timeout):
+        """
+        Kill the process for running for too long.
+
+        @param timeout: The number of seconds for which it was allowed to
+            run.
+        """
+        self._timeout = timeout
+        try:
+            self.transport.signalProcess('KILL')
+        except ProcessExitedAlready:
+            pass
+
+
+    def processEnded(self, reason):
+        if self.timeoutCall is not None and self.timeoutCall.active():
+            self.timeoutCall.cancel()
+        output = self._kept.getvalue()
+        if self._timeout is not None:
+            self.deferred.errback(CommandTimedOut(self._timeout, output))
+        elif reason.check(ProcessDone):
+            self.deferred.callback(output)
+        elif reason.check(ProcessTerminated):
+            self.deferred.errback(CommandFailed(
+                reason.value.exitCode, reason.value.signal, output))
+        else:
+            self.deferred.errback(reason)
+
+
+
+def runCommandAsync(args, reactor=None, timeout=None, maxOutput=2 ** 24,
+                    output=None):
+    """
+    Execute a vector of arguments without blocking the reactor.
+
+    This is the asynchronous version of
+    L{newsbuilder._newsbuilder.runCommand}, with the same protections as
+    L{ProcessRunner.run}.
+
+    @type args: C{list} of C{str}
+    @param args: A list of arguments, the first of which will be used as the
+        executable to run.  It is searched for on the I{PATH} if it does not
+        contain a slash.
+
+    @param reactor: The reactor with which to run the command, or C{None} to
+        use the global reactor.
+
+    @param timeout: The number of seconds after which to kill the command,
+        or C{None} for no limit.
+
+    @param maxOutput: The number of bytes of output kept from the command.
+
+    @param output: A callable to which to give each chunk of the standard
+        output and error of the command as it is read, in the reactor
+        thread, instead of keeping it, or C{None}.
+
+    @return: A L{Deferred} which fires with the standard output and standard
+        error of the process, of which only the last C{maxOutput} bytes are
+        kept, or with an empty string if C{output} was given.  It fails with
+        L{CommandFailed} when the program exited with a non-0 exit code or
+        was killed by a signal, with L{CommandTimedOut} when it is killed for
+        running for too long, or with L{OSError} if the executable cannot be
+        found.
+    """
+    if reactor is None:
+        from twisted.internet import reactor
+    executable = args[0]
+    if '/' not in executable:
+        found = which(executable)
+        if not found:
+            return fail(OSError(
+                errno.ENOENT, os.strerror(errno.ENOENT), executable))
+        executable = found[0]
+    deferred = Deferred()
+    protocol = _CommandProtocol(deferred, maxOutput, output)
+    reactor.spawnProcess(protocol, executable, args, env=os.environ)
+    if timeout is not None:
+        protocol.timeoutCall = reactor.callLater(
+            timeout, protocol.timeOut, timeout)
+    return deferred
+
+
+
+@inlineCallbacks
+def buildAllAsync(strategy, baseDirectory, reactor=None, threadPool=None):
+    """
+    Do what L{TwistedBuildStrategy.buildAll} does without blocking the
+    reactor.
+
+    @param strategy: The L{TwistedBuildStrategy} whose projects to build.
+
+    @param baseDirectory: A L{FilePath} representing the root directory
+        beneath which to find Twisted projects for which to generate news.
+
+    @param reactor: The reactor with which to run the version control
+        commands, or C{None} to use the global reactor.
+
+    @param threadPool: The L{twisted.python.threadpool.ThreadPool} in which to
+        read and write files, or C{None} to use the reactor's.
+
+    @return: A L{Deferred} which fires with C{None} once the build is done.
+    """
+    # The commands have the time limit and output limit of those run by
+    # runCommand.
+    from ._newsbuilder import _processRunner
+    if reactor is None:
+        from twisted.internet import reactor
+    if threadPool is None:
+        threadPool = reactor.getThreadPool()
+
+    def run(args, output=None):
+        # The version control backend runs in the thread pool, and each of
+        # its commands is spawned by the reactor.
+        return blockingCallFromThread(
+            reactor, runCommandAsync, args, reactor, _processRunner.timeout,
+            _processRunner.maxOutput, output)
+
+    with strategy.tracer.span('buildAll', path=baseDirectory.path):
+        backend = yield deferToThreadPool(
+            reactor, threadPool, strategy._backend, baseDirectory, run)
+        transaction, unversioned = yield deferToThreadPool(
+            reactor, threadPool, strategy._commitNews, baseDirectory,
+            backend)
+        fragments = strategy._pendingFragments(transaction)
+        yield deferToThreadPool(
+            reactor, threadPool, strategy.newsBuilder._removeFragments,
+            fragments, backend, unversioned)
+        yield deferToThreadPool(reactor, threadPool, transaction.finish)
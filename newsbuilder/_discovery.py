@@ -0,0 +1,481 @@
+# -*- test-case-name: newsbuilder.test.test_discovery -*-
+# Copyright (c) Twisted Matrix Laboratories.
+# See LICENSE for details.
+
+"""
+Discovery of the directories of Twisted-style projects beneath a base
+directory.
+
+A project is any directory which contains a I{topfiles} directory.  The search
+does not descend into version control metadata, build outputs, virtualenvs
+and similar directories which never contain projects but which are often very
+large.
+
+Instead of searching the directories, the projects can also be found among
+the files under version control (see L{TrackedFiles}).
+"""
+
+from fnmatch import fnmatch
+from multiprocessing.pool import ThreadPool
+import json
+import os
+import time
+
+try:
+    from os import scandir
+except ImportError:
+    try:
+        from scandir import scandir
+    except ImportError:
+        scandir = None
+
+# Basename patterns of the directories which are never searched for projects.
+DEFAULT_EXCLUDES = (
+    '.svn', '.git', '.hg', '.bzr', 'CVS', '_darcs',
+    '.tox', '.venv', 'venv', 'node_modules', '__pycache__',
+    '_trial_temp', 'build', 'dist', '*.egg-info',
+)
+
+
+
+def _listDirectory(path):
+    """
+    List the entries of a directory.
+
+    This uses C{scandir} (either from L{os} or from the I{scandir} backport)
+    when it is available, so that the type of each entry is usually known
+    without a further C{stat} call.
+
+    @param path: The directory to list.
+    @type path: C{str}
+
+    @return: A two-tuple of a C{list} of the basenames of all the entries in
+        C{path} and a C{list} of the basenames of the entries which are
+        directories (following symbolic links).
+    """
+    names = []
+    directories = []
+    if scandir is not None:
+        for entry in scandir(path):
+            names.append(entry.name)
+            try:
+                if entry.is_dir():
+                    directories.append(entry.name)
+            except OSError:
+                pass
+    else:
+        for name in os.listdir(path):
+            names.append(name)
+            if os.path.isdir(os.path.join(path, name)):
+                directories.append(name)
+    return names, directories
+
+
+
+class ProjectFinder(object):
+    """
+    Find the directories of Twisted-style projects.
+
+    @ivar exclude: A C{tuple} of L{fnmatch} patterns.  Directories with a
+        basename matching any of these are not searched.
+
+    @ivar jobs: The number of threads over which to spread the search of the
+        subdirectories of the base directory.
+
+    @ivar manifest: A L{DiscoveryManifest} recording the results of an
+        earlier search, or C{None}.
+    """
+
+    def __init__(self, exclude=(), jobs=1, manifest=None):
+        """
+        @param exclude: Basename patterns of directories which should not be
+            searched, in addition to L{DEFAULT_EXCLUDES}.
+        @type exclude: iterable of C{str}
+
+        @param jobs: The number of threads to use.
+        @type jobs: C{int}
+
+        @param manifest: A L{DiscoveryManifest}.  Directories which have not
+            been modified since the manifest recorded them are not listed
+            again, and the manifest is updated with every directory listed.
+        @type manifest: L{DiscoveryManifest}
+        """
+        self.exclude = DEFAULT_EXCLUDES + tuple(exclude)
+        self.jobs = jobs
+        self.manifest = manifest
+
+
+    def _isExcluded(self, name):
+        """
+        Decide whether the directory called C{name} should not be searched.
+        """
+        for pattern in self.exclude:
+            if fnmatch(name, pattern):
+                return True
+        return False
+
+
+    def _expand(self, directory, isBase=False):
+        """
+        List one directory.
+
+        @param directory: The directory to list.
+        @type directory: C{str}
+
+        @param isBase: C{True} if C{directory} is the base directory of the
+            search, which is searched even if it looks like a virtualenv.
+
+        @return: A two-tuple of a C{bool} which is C{True} if C{directory} is
+            a project and a C{list} of the subdirectories of C{directory}
+            which should be searched, as C{str}.
+        """
+        if self.manifest is not None:
+            try:
+                modified = os.stat(directory).st_mtime
+            except OSError:
+                return False, []
+            known = self.manifest.lookup(directory, modified)
+            if known is not None:
+                isProject, names = known
+                return isProject, [
+                    os.path.join(directory, name) for name in names]
+
+        try:
+            names, subdirectories = _listDirectory(directory)
+        except OSError:
+            return False, []
+        isProject = 'topfiles' in subdirectories
+        children = []
+        if 'pyvenv.cfg' in names and not isBase:
+            # A virtualenv, whatever its name.
+            isProject = False
+        else:
+            for name in sorted(subdirectories):
+                if self._isExcluded(name):
+                    continue
+                child = os.path.join(directory, name)
+                if os.path.islink(child) and _isAncestor(child, directory):
+                    continue
+                children.append(child)
+
+        if self.manifest is not None:
+            self.manifest.record(
+                directory, modified, isProject,
+                [os.path.basename(path) for path in children])
+        return isProject, children
+
+
+    def _walk(self, path, isBase=False):
+        """
+        Search C{path} and its subdirectories for projects.
+
+        @param path: The directory to search.
+        @type path: C{str}
+
+        @param isBase: C{True} if C{path} is the base directory of the search.
+
+        @return: A C{list} of the project directories found, as C{str}.
+        """
+        found = []
+        isProject, pending = self._expand(path, isBase)
+        if isProject:
+            found.append(path)
+        while pending:
+            directory = pending.pop()
+            isProject, children = self._expand(directory)
+            if isProject:
+                found.append(directory)
+            pending.extend(children)
+        return found
+
+
+    def find(self, baseDirectory):
+        """
+        Find all of the projects beneath C{baseDirectory}.
+
+        @param baseDirectory: The directory to search.
+        @type baseDirectory: C{str}
+
+        @return: A sorted C{list} of the project directories found, as
+            C{str}.
+        """
+        found = []
+        if os.path.basename(baseDirectory) == 'topfiles':
+            found.append(os.path.dirname(baseDirectory))
+
+        if self.jobs <= 1:
+            found.extend(self._walk(baseDirectory, isBase=True))
+            return sorted(found)
+
+        isProject, roots = self._expand(baseDirectory, isBase=True)
+        if isProject:
+            found.append(baseDirectory)
+
+        pool = ThreadPool(self.jobs)
+        try:
+            for projects in pool.map(self._walk, roots):
+                found.extend(projects)
+        finally:
+            pool.close()
+            pool.join()
+        return sorted(found)
+
+
+
+class TrackedFiles(object):
+    """
+    The files under version control beneath a base directory, from which the
+    projects and the contents of their I{topfiles} directories are found
+    without listing any directory.
+
+    A project is then any directory containing a I{topfiles} directory with
+    a file under version control in it, and files which are not under
+    version control, such as scratch files, are ignored.
+
+    @ivar baseDirectory: The path of the base directory, as C{str}.
+    """
+
+    def __init__(self, baseDirectory, paths, exclude=()):
+        """
+        @param baseDirectory: The path of the base directory.
+        @type baseDirectory: C{str}
+
+        @param paths: The paths of the files and directories under version
+            control beneath C{baseDirectory}, as C{str}.
+
+        @param exclude: Basename patterns of directories whose projects are
+            ignored, in addition to L{DEFAULT_EXCLUDES}.
+        """
+        self.baseDirectory = os.path.normpath(baseDirectory)
+        self._exclude = DEFAULT_EXCLUDES + tuple(exclude)
+        # Maps the path of each topfiles directory to the basenames of the
+        # files in it.
+        self._topfiles = {}
+        virtualenvs = []
+        for path in paths:
+            path = os.path.normpath(path)
+            directory, name = os.path.split(path)
+            if name == 'topfiles':
+                self._topfiles.setdefault(path, [])
+            elif os.path.basename(directory) == 'topfiles':
+                self._topfiles.setdefault(directory, []).append(name)
+            elif name == 'pyvenv.cfg' and directory != self.baseDirectory:
+                virtualenvs.append(directory + os.sep)
+        self._virtualenvs = tuple(virtualenvs)
+
+
+    def _isExcluded(self, project):
+        """
+        Decide whether a project is in a directory which is not searched by
+        L{ProjectFinder}.
+
+        @param project: The path of the directory of the project.
+        @type project: C{str}
+        """
+        if (project + os.sep).startswith(self._virtualenvs):
+            return True
+        relative = os.path.relpath(project, self.baseDirectory)
+        if relative == os.curdir:
+            return False
+        for name in relative.split(os.sep):
+            for pattern in self._exclude:
+                if fnmatch(name, pattern):
+                    return True
+        return False
+
+
+    def findProjects(self):
+        """
+        Find the projects among the files under version control.
+
+        @return: A sorted C{list} of the project directories, as C{str}, as
+            L{ProjectFinder.find} returns them.
+        """
+        found = []
+        for topfiles in self._topfiles:
+            project = os.path.dirname(topfiles)
+            if topfiles == self.baseDirectory:
+                # The base directory is itself a topfiles directory.
+                found.append(project)
+            elif ((project + os.sep).startswith(self.baseDirectory + os.sep)
+                  and not self._isExcluded(project)):
+                found.append(project)
+        return sorted(found)
+
+
+    def children(self, topfiles):
+        """
+        List the files under version control in a I{topfiles} directory.
+
+        @param topfiles: The path of the directory.
+        @type topfiles: C{str}
+
+        @return: A C{list} of the basenames of the files.
+        """
+        return list(self._topfiles.get(os.path.normpath(topfiles), ()))
+
+
+
+def _isAncestor(link, directory):
+    """
+    Decide whether the symbolic link C{link} points at C{directory} or at one
+    of its ancestors, in which case following it would loop forever.
+    """
+    target = os.path.realpath(link)
+    current = os.path.realpath(directory)
+    return current == target or current.startswith(target + os.sep)
+
+
+
+class DiscoveryManifest(object):
+    """
+    A record of the directories listed by a L{ProjectFinder}, which lets a
+    later search skip listing the directories which have not been modified
+    since.
+
+    Adding or removing an entry of a directory changes its modification time,
+    so a directory whose modification time is unchanged still has the same
+    subdirectories and is still a project (or not).  Each search only has to
+    C{stat} the directories it visits, and to list those which changed.
+
+    @cvar _FORMAT: The version of the on-disk format of the manifest.
+
+    @cvar _RACY_SECONDS: The age below which the modification time of a
+        directory is not trusted, because the directory could have been
+        modified again after it was listed without the modification time
+        changing.
+
+    @ivar baseDirectory: The path of the directory searched, as C{str}.
+
+    @ivar exclude: The C{tuple} of exclude patterns of the search.
+
+    @ivar directories: A C{dict} mapping the path of each directory listed in
+        the most recent search to a three-tuple of its modification time, a
+        C{bool} which is C{True} if it is a project and the C{list} of the
+        basenames of its subdirectories which were searched.
+    """
+
+    _FORMAT = 1
+    _RACY_SECONDS = 2
+
+    def __init__(self, baseDirectory, exclude=(), directories=None,
+                 listedAt=None):
+        """
+        @param baseDirectory: The path of the directory searched.
+        @type baseDirectory: C{str}
+
+        @param exclude: The exclude patterns of the search.
+
+        @param directories: The directories recorded by a previous search, in
+            the form of the C{directories} attribute.
+
+        @param listedAt: The time at which the previous search started.
+        @type listedAt: C{float}
+        """
+        self.baseDirectory = baseDirectory
+        self.exclude = tuple(exclude)
+        self._known = directories or {}
+        self._listedAt = listedAt or 0
+        self.directories = {}
+        self._startedAt = time.time()
+
+
+    @classmethod
+    def load(cls, manifest, baseDirectory, exclude=()):
+        """
+        Read a manifest saved by L{DiscoveryManifest.save}.
+
+        @param manifest: The manifest file to read.
+        @type manifest: L{twisted.python.filepath.FilePath}
+
+        @param baseDirectory: The path of the directory to be searched.
+        @type baseDirectory: C{str}
+
+        @param exclude: The exclude patterns of the search.
+
+        @return: A L{DiscoveryManifest}, which is empty if C{manifest} does
+            not exist, cannot be read, or was written for another directory
+            or other exclude patterns.
+        """
+        exclude = tuple(exclude)
+        try:
+            data = json.loads(manifest.getContent())
+        except (IOError, ValueError):
+            return cls(baseDirectory, exclude)
+        if (not isinstance(data, dict) or
+                data.get('format') != cls._FORMAT or
+                data.get('baseDirectory') != baseDirectory or
+                tuple(data.get('exclude', ())) != exclude):
+            return cls(baseDirectory, exclude)
+        directories = dict(
+            (path.encode('utf-8'),
+             (modified, isProject,
+              [name.encode('utf-8') for name in names]))
+            for path, (modified, isProject, names)
+            in data['directories'].items())
+        return cls(baseDirectory, exclude, directories, data['listedAt'])
+
+
+    def lookup(self, directory, modified):
+        """
+        Look up what an earlier search found in C{directory}.
+
+        @param directory: The path of the directory.
+        @type directory: C{str}
+
+        @param modified: The current modification time of C{directory}.
+        @type modified: C{float}
+
+        @return: C{None} if the directory must be listed again, otherwise a
+            two-tuple of a C{bool} which is C{True} if C{directory} is a
+            project and the C{list} of the basenames of the subdirectories to
+            search.
+        """
+        known = self._known.get(directory)
+        if known is None:
+            return None
+        knownModified, isProject, names = known
+        if (knownModified != modified or
+                modified >= self._listedAt - self._RACY_SECONDS):
+            return None
+        self.directories[directory] = known
+        return isProject, names
+
+
+    def record(self, directory, modified, isProject, names):
+        """
+        Record what was found by listing C{directory}.
+
+        @param directory: The path of the directory.
+        @type directory: C{str}
+
+        @param modified: The modification time of C{directory} before it was
+            listed.
+        @type modified: C{float}
+
+        @param isProject: C{True} if C{directory} is a project.
+
+        @param names: The basenames of the subdirectories of C{directory} to
+            search.
+        """
+        self.directories[directory] = (modified, isProject, names)
+
+
+    def save(self, manifest):
+        """
+        Write the directories recorded by the latest search to a file, which
+        is replaced atomically.
+
+        @param manifest: The manifest file to write.
+        @type manifest: L{twisted.python.filepath.FilePath}
+        """
+        data = {
+            'format': self._FORMAT,
+            'baseDirectory': self.baseDirectory,
+            'exclude': list(self.exclude),
+            'listedAt': self._startedAt,
+            'directories': self.directories,
+        }
+        temporary = manifest.temporarySibling()
+        temporary.setContent(json.dumps(data, sort_keys=True))
+        temporary.moveTo(manifest)
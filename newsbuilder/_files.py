@@ -0,0 +1,246 @@
+# -*- test-case-name: newsbuilder.test.test_files -*-
+# Copyright (c) Twisted Matrix Laboratories.
+# See LICENSE for details.
+
+"""
+Helpers for copying and rewriting files without holding their contents in
+memory.
+"""
+
+from contextlib import contextmanager
+import errno
+import os
+import re
+import stat
+
+# The number of bytes read at once when a file is copied through Python.
+CHUNK_SIZE = 2 ** 16
+
+# The system calls which copy between files inside the kernel, if this version
+# of Python exposes them.
+_copyFileRange = getattr(os, 'copy_file_range', None)
+_sendfile = getattr(os, 'sendfile', None)
+
+# The errors with which the system calls above report that they cannot copy
+# between the given files, in which case the next method is tried.
+_UNSUPPORTED = frozenset([
+    errno.EINVAL, errno.ENOSYS, errno.EXDEV, errno.EBADF,
+    getattr(errno, 'EOPNOTSUPP', errno.EINVAL),
+    getattr(errno, 'ENOTSUP', errno.EINVAL),
+])
+
+
+
+def _copyWithKernel(copy, sourceFD, destinationFD, offset, end):
+    """
+    Copy bytes between two file descriptors with a system call which does
+    not pass the data through user space.
+
+    @param copy: A function accepting the source and destination file
+        descriptors, the offset in the source to copy from and the number of
+        bytes to copy, and returning the number of bytes copied.
+
+    @param sourceFD: The file descriptor to copy from.
+    @param destinationFD: The file descriptor to copy to, at its current
+        position.
+    @param offset: The offset in the source at which to start.
+    @param end: The offset in the source at which to stop.
+
+    @return: The offset in the source up to which the data was copied, which
+        is less than C{end} if C{copy} is not supported for these files.
+    """
+    while offset < end:
+        try:
+            copied = copy(sourceFD, destinationFD, offset, end - offset)
+        except OSError as e:
+            if e.errno in _UNSUPPORTED:
+                return offset
+            raise
+        if copied == 0:
+            break
+        offset += copied
+    return offset
+
+
+
+def copyFileRange(source, destination, offset=0, end=None):
+    """
+    Copy the contents of a file from the given offset to its end, or to the
+    given end, into another file.
+
+    The data is copied with C{copy_file_range} or C{sendfile} where these are
+    available and supported by the files, and otherwise in chunks of
+    L{CHUNK_SIZE} bytes, so that memory use does not depend on the size of
+    the file.
+
+    @param source: A file object opened for reading.
+    @param destination: A file object opened for writing, to which the data
+        is written at its current position.
+    @param offset: The offset in C{source} at which to start copying.
+    @type offset: C{int}
+    @param end: The offset in C{source} at which to stop copying, or C{None}
+        to copy to the end of the file.
+    @type end: C{int}
+    """
+    destination.flush()
+    sourceFD = source.fileno()
+    destinationFD = destination.fileno()
+    size = os.fstat(sourceFD).st_size
+    if end is None or end > size:
+        end = size
+    initialOffset = offset
+
+    if _copyFileRange is not None:
+        offset = _copyWithKernel(
+            lambda src, dst, start, count: _copyFileRange(
+                src, dst, count, start),
+            sourceFD, destinationFD, offset, end)
+    if _sendfile is not None and offset < end:
+        offset = _copyWithKernel(
+            lambda src, dst, start, count: _sendfile(dst, src, start, count),
+            sourceFD, destinationFD, offset, end)
+    if offset > initialOffset:
+        # The data was written behind the back of the file object.
+        destination.seek(os.lseek(destinationFD, 0, os.SEEK_CUR))
+    if offset < end:
+        source.seek(offset)
+        while offset < end:
+            chunk = source.read(min(CHUNK_SIZE, end - offset))
+            if not chunk:
+                break
+            destination.write(chunk)
+            offset += len(chunk)
+
+
+
+def sameContents(path, other):
+    """
+    Check whether two files have the same contents.
+
+    The sizes of the files are compared first, so that files of different
+    sizes are not read, and the contents are then compared a chunk at a time
+    up to the first difference.
+
+    @param path: One file.
+    @type path: L{twisted.python.filepath.FilePath}
+    @param other: The other file.
+    @type other: L{twisted.python.filepath.FilePath}
+
+    @return: C{True} if both files exist and have the same contents.
+    """
+    try:
+        if os.path.getsize(path.path) != os.path.getsize(other.path):
+            return False
+    except OSError:
+        return False
+    # FilePath.open cannot be used, as it would try to create the temporary
+    # siblings made by FilePath.temporarySibling.
+    with open(path.path, 'rb') as first, open(other.path, 'rb') as second:
+        while True:
+            chunk = first.read(CHUNK_SIZE)
+            if chunk != second.read(CHUNK_SIZE):
+                return False
+            if not chunk:
+                return True
+
+
+
+def replaceIfChanged(new, path):
+    """
+    Rename a file over another, unless they have the same contents, in which
+    case the new file is removed and the other one, along with its
+    modification time, is left alone.
+
+    @param new: The file with the new contents.
+    @type new: L{twisted.python.filepath.FilePath}
+    @param path: The file to replace.
+    @type path: L{twisted.python.filepath.FilePath}
+
+    @return: C{True} if C{path} was replaced, C{False} if it was unchanged.
+    """
+    if sameContents(new, path):
+        new.remove()
+        return False
+    new.moveTo(path)
+    return True
+
+
+
+@contextmanager
+def atomicReplacement(path):
+    """
+    Write new contents for a file, which replace the old ones at once when
+    the C{with} block using this exits without an exception.
+
+    The new contents are written to a temporary file next to C{path}, which
+    is given the permissions of C{path} and renamed over it, unless they are
+    the same as the old ones (see L{replaceIfChanged}).
+
+    @param path: The file to replace.
+    @type path: L{twisted.python.filepath.FilePath}
+
+    @return: A context manager giving the temporary file, opened for
+        writing.
+    """
+    temporary = path.temporarySibling()
+    try:
+        with temporary.open('w') as new:
+            yield new
+        os.chmod(temporary.path, stat.S_IMODE(os.stat(path.path).st_mode))
+        replaceIfChanged(temporary, path)
+    finally:
+        if temporary.exists():
+            temporary.remove()
+
+
+
+def replaceStrings(source, destination, oldToNew):
+    """
+    Copy a file, replacing every occurrence of some strings by others, in a
+    single pass over its contents.
+
+    The strings are looked for all at once: at each position, the longest of
+    them which occurs there is replaced, and the text it is replaced by is
+    not searched again.  The file is read in chunks of L{CHUNK_SIZE} bytes,
+    so that memory use depends on the lengths of the strings but not on the
+    size of the file.
+
+    @param source: A file object opened for reading.
+    @param destination: A file object opened for writing.
+
+    @param oldToNew: A C{dict} mapping the strings to replace to their
+        replacements.
+
+    @raise ValueError: If one of the strings to replace is empty.
+    """
+    if '' in oldToNew:
+        raise ValueError("The empty string cannot be replaced.")
+    if not oldToNew:
+        copyFileRange(source, destination, source.tell())
+        return
+    pattern = re.compile('|'.join(
+        re.escape(old) for old in sorted(oldToNew, key=len, reverse=True)))
+    replace = lambda match: oldToNew[match.group()]
+    # A match starting at least as far from the end of the data read so far
+    # as the longest string is long cannot be changed by reading more.
+    overlap = max(len(old) for old in oldToNew) - 1
+
+    pending = ''
+    while True:
+        chunk = source.read(CHUNK_SIZE)
+        data = pending + chunk
+        if not chunk:
+            destination.write(pattern.sub(replace, data))
+            return
+        end = len(data) - overlap
+        written = 0
+        for match in pattern.finditer(data):
+            if match.start() >= end:
+                break
+            destination.write(data[written:match.start()])
+            destination.write(replace(match))
+            written = match.end()
+        if written < end:
+            destination.write(data[written:end])
+            written = end
+        pending = data[written:]
@@ -12,23 +12,46 @@ Only Linux is supported by this code.  It should not be used by any tools
 which must run on multiple platforms (eg the setup.py script).
 """
 
-import textwrap
+import ast
+import difflib
+from StringIO import StringIO
+import time
 from datetime import date
+from multiprocessing.pool import ThreadPool
 import re
 import sys
 import os
 
-from subprocess import PIPE, STDOUT, Popen
-
 from twisted.python.filepath import FilePath
-from twisted.python.compat import execfile
 from twisted.python import usage
+from twisted.python.versions import Version
+
+from ._cache import cachePath
+from ._discovery import DiscoveryManifest, ProjectFinder, TrackedFiles
+from ._files import (
+    atomicReplacement, copyFileRange, replaceIfChanged, replaceStrings,
+    sameContents)
+from ._newsindex import NewsIndex
+from ._process import CommandFailed, ProcessRunner
+from ._progress import Progress, fragmentsKey
+from ._revision import GitRevision, RevisionPath
+from ._trace import NullTracer, Tracer
+from ._transaction import Transaction
+from ._vcs import (
+    BACKENDS, FilesystemBackend, SubversionBackend, chooseBackend)
+from ._wrapping import fill
 
 # The offset between a year and the corresponding major version number.
 VERSION_OFFSET = 2000
 
+# The runner of the commands run by runCommand, whose default time limit and
+# number of commands run at once are set from the command line by
+# NewsBuilderScript.
+_processRunner = ProcessRunner()
+
+
 
-def runCommand(args):
+def runCommand(args, timeout=None, output=None):
     """
     Execute a vector of arguments.
 
@@ -36,40 +59,32 @@ def runCommand(args):
     @param args: A list of arguments, the first of which will be used as the
         executable to run.
 
-    @rtype: C{str}
-    @return: All of the standard output.
-
-    @raise CommandFailed: when the program exited with a non-0 exit code.
-    """
-    process = Popen(args, stdout=PIPE, stderr=STDOUT)
-    stdout = process.stdout.read()
-    exitCode = process.wait()
-    if exitCode < 0:
-        raise CommandFailed(None, -exitCode, stdout)
-    elif exitCode > 0:
-        raise CommandFailed(exitCode, None, stdout)
-    return stdout
+    @param timeout: The number of seconds after which to kill the program, or
+        C{None} for the default limit, if any.
 
+    @param output: A callable to which to give the output of the program as
+        it is read, instead of returning it, or C{None}.
 
+    @rtype: C{str}
+    @return: All of the standard output, or as much of its end as
+        L{ProcessRunner.maxOutput} allows.
 
-class CommandFailed(Exception):
+    @raise CommandFailed: when the program exited with a non-0 exit code, or
+        was killed for running for longer than the time limit, in which case
+        it is a L{newsbuilder._process.CommandTimedOut}.
     """
-    Raised when a child process exits unsuccessfully.
+    return _processRunner.run(args, timeout, output)
 
-    @type exitStatus: C{int}
-    @ivar exitStatus: The exit status for the child process.
 
-    @type exitSignal: C{int}
-    @ivar exitSignal: The exit signal for the child process.
 
-    @type output: C{str}
-    @ivar output: The bytes read from stdout and stderr of the child process.
+def _runVersionControl(args, output=None):
+    """
+    Run a version control command with L{runCommand}, for the backends in
+    L{newsbuilder._vcs}.
     """
-    def __init__(self, exitStatus, exitSignal, output):
-        Exception.__init__(self, exitStatus, exitSignal, output)
-        self.exitStatus = exitStatus
-        self.exitSignal = exitSignal
-        self.output = output
+    if output is None:
+        return runCommand(args)
+    return runCommand(args, output=output)
 
 
 
@@ -96,10 +111,49 @@ def _formatHeader(header):
 
 
 
+# The number of bytes at the start of a NEWS file in which _changeNewsVersion
+# looks for the header to change before reading the rest of the file.
+_HEADER_SEARCH_SIZE = 2 ** 16
+
+# The patterns matching the headers of the news of a version, as compiled by
+# _newsHeaderPattern, keyed by project name and version.
+_newsHeaderPatterns = {}
+
+
+
+def _newsHeaderPattern(name, version):
+    """
+    Get the pattern matching the header of the news for a version of a
+    project, whatever its date.
+
+    @param name: The name of the project.
+    @type name: C{str}
+    @param version: The version of the project.
+    @type version: L{Version}
+
+    @return: A compiled regular expression.
+    """
+    key = (name, version.base())
+    pattern = _newsHeaderPatterns.get(key)
+    if pattern is None:
+        pattern = _newsHeaderPatterns[key] = re.compile(
+            r"Twisted %s %s \(\d{4}-\d\d-\d\d\)\n=+\n\n" % (
+                re.escape(name), re.escape(version.base())))
+    return pattern
+
+
+
 def _changeNewsVersion(news, name, oldVersion, newVersion, today):
     """
-    Change all references to the current version number in a NEWS file to
-    refer to C{newVersion} instead.
+    Change the header of the news for the current version of a project in a
+    NEWS file to refer to C{newVersion} instead.
+
+    If the file has an up-to-date L{NewsIndex}, the header is looked for
+    where the index says it is, and the index is updated.  Otherwise, as the
+    header is normally close to the start of the file, only the first
+    L{_HEADER_SEARCH_SIZE} bytes are searched for it unless it is not found
+    there.  The new header is spliced in with a single copy of the rest of
+    the file, which replaces the old one atomically.
 
     @param news: The NEWS file to change.
     @type news: L{FilePath}
@@ -114,14 +168,179 @@ def _changeNewsVersion(news, name, oldVersion, newVersion, today):
     """
     newHeader = _formatHeader(
         "Twisted %s %s (%s)" % (name, newVersion.base(), today))
-    expectedHeaderRegex = re.compile(
-        r"Twisted %s %s \(\d{4}-\d\d-\d\d\)\n=+\n\n" % (
-            re.escape(name), re.escape(oldVersion.base())))
-    oldNews = news.getContent()
-    match = expectedHeaderRegex.search(oldNews)
-    if match:
-        oldHeader = match.group()
-        replaceInFile(news.path, {oldHeader: newHeader})
+    expectedHeaderRegex = _newsHeaderPattern(name, oldVersion)
+    index = NewsIndex.load(news)
+    searchedFrom = 0
+    if index is not None:
+        section = index.find(name, oldVersion.base())
+        if section is None:
+            return
+        searchedFrom = section.offset
+    with news.open() as oldNews:
+        oldNews.seek(searchedFrom)
+        searched = oldNews.read(_HEADER_SEARCH_SIZE)
+        match = expectedHeaderRegex.search(searched)
+        if match is None:
+            # The header is further on, or straddles the end of what was read.
+            oldNews.seek(0)
+            searchedFrom = 0
+            searched = oldNews.read()
+            match = expectedHeaderRegex.search(searched)
+        if match is None:
+            return
+        start = searchedFrom + match.start()
+        end = searchedFrom + match.end()
+        with atomicReplacement(news) as newNews:
+            copyFileRange(oldNews, newNews, 0, start)
+            newNews.write(newHeader)
+            copyFileRange(oldNews, newNews, end)
+    if index is not None:
+        index.spliced(start, end, newHeader).save(news)
+
+
+
+# The version assignment written by generateVersionFileData.
+_VERSION_ASSIGNMENT = re.compile(
+    r"^version = versions\.Version\("
+    r"(?P<package>'[^'\\\n]*'|\"[^\"\\\n]*\"), "
+    r"(?P<major>\d+), (?P<minor>\d+), (?P<micro>\d+)"
+    r"(?:, prerelease=(?P<prerelease>\d+))?\)$",
+    re.MULTILINE)
+
+# A cache of the versions read by _readVersionFile.  It maps the path of a
+# version file to a two-tuple of the identity of the file (see
+# _fileIdentity) and the version read from it.
+_versionCache = {}
+
+# The age, in seconds, below which the modification time of a file is not
+# trusted to identify its contents.
+_RACY_SECONDS = 2
+
+
+
+def _fileIdentity(path):
+    """
+    Identify the current contents of a file by its metadata.
+
+    @param path: The path of the file.
+    @type path: C{str}
+
+    @return: A C{tuple} which changes whenever the file is replaced or
+        modified, or C{None} if the file was modified so recently that a
+        further modification might not change its metadata.
+    """
+    st = os.stat(path)
+    if st.st_mtime >= time.time() - _RACY_SECONDS:
+        return None
+    return (st.st_dev, st.st_ino, st.st_size, st.st_mtime)
+
+
+
+def _parseVersion(source):
+    """
+    Find the version assigned by the source of a I{_version.py} file without
+    executing it.
+
+    The format written by L{generateVersionFileData} is recognised directly.
+    Otherwise, the module is parsed and the first top-level assignment of a
+    call to C{Version} or C{versions.Version} with literal arguments to
+    C{version} is used.
+
+    @param source: The contents of the file.
+    @type source: C{str}
+
+    @return: A L{Version}, or C{None} if no version assignment was found.
+    """
+    match = _VERSION_ASSIGNMENT.search(source)
+    if match is not None:
+        prerelease = match.group('prerelease')
+        if prerelease is not None:
+            prerelease = int(prerelease)
+        return Version(
+            match.group('package')[1:-1],
+            int(match.group('major')), int(match.group('minor')),
+            int(match.group('micro')), prerelease=prerelease)
+
+    try:
+        module = ast.parse(source)
+    except SyntaxError:
+        return None
+    for statement in module.body:
+        if not (isinstance(statement, ast.Assign) and
+                isinstance(statement.value, ast.Call)):
+            continue
+        if not any(isinstance(target, ast.Name) and target.id == 'version'
+                   for target in statement.targets):
+            continue
+        call = statement.value
+        function = call.func
+        if isinstance(function, ast.Attribute):
+            functionName = function.attr
+        elif isinstance(function, ast.Name):
+            functionName = function.id
+        else:
+            continue
+        if functionName != 'Version':
+            continue
+        if getattr(call, 'starargs', None) or getattr(call, 'kwargs', None):
+            continue
+        try:
+            args = [ast.literal_eval(arg) for arg in call.args]
+            kwargs = dict((keyword.arg, ast.literal_eval(keyword.value))
+                          for keyword in call.keywords)
+            return Version(*args, **kwargs)
+        except (ValueError, TypeError):
+            continue
+    return None
+
+
+
+def _versionFromSource(source, filename):
+    """
+    Get the version assigned by the source of a I{_version.py} file, which is
+    only executed if its version assignment cannot be found by
+    L{_parseVersion}.
+
+    @param source: The contents of the file.
+    @type source: C{str}
+
+    @param filename: The name of the file, for tracebacks.
+    @type filename: C{str}
+
+    @return: The L{Version} assigned to C{version} by the file.
+    """
+    version = _parseVersion(source)
+    if version is None:
+        namespace = {}
+        exec(compile(source, filename, 'exec'), namespace)
+        version = namespace["version"]
+    return version
+
+
+
+def _readVersionFile(path):
+    """
+    Read the version from a I{_version.py} file.
+
+    The file is only executed if its version assignment cannot be found by
+    L{_parseVersion}.  Versions are cached for as long as the identity of the
+    file (see L{_fileIdentity}) is unchanged.
+
+    @param path: The path of the I{_version.py} file.
+    @type path: C{str}
+
+    @return: The L{Version} assigned to C{version} by the file.
+    """
+    identity = _fileIdentity(path)
+    cached = _versionCache.get(path)
+    if identity is not None and cached is not None and cached[0] == identity:
+        return cached[1]
+
+    with open(path) as versionFile:
+        version = _versionFromSource(versionFile.read(), path)
+    if identity is not None:
+        _versionCache[path] = (identity, version)
+    return version
 
 
 
@@ -149,9 +368,7 @@ class Project(object):
         @return: A L{Version} specifying the version number of the project
         based on live python modules.
         """
-        namespace = {}
-        execfile(self.directory.child("_version.py").path, namespace)
-        return namespace["version"]
+        return _readVersionFile(self.directory.child("_version.py").path)
 
 
     def updateVersion(self, version):
@@ -168,18 +385,35 @@ class Project(object):
 
 
 
-def findTwistedProjects(baseDirectory):
+def findTwistedProjects(baseDirectory, exclude=(), jobs=1, manifest=None,
+                        updateManifest=True):
     """
     Find all Twisted-style projects beneath a base directory.
 
+    Directories matching L{newsbuilder._discovery.DEFAULT_EXCLUDES}, such as
+    version control metadata and virtualenvs, are not searched.
+
     @param baseDirectory: A L{twisted.python.filepath.FilePath} to look inside.
+    @param exclude: Basename patterns of further directories not to search.
+    @param jobs: The number of threads over which to spread the search.
+    @param manifest: A L{twisted.python.filepath.FilePath} of a file in which
+        to keep a L{DiscoveryManifest} between searches, or C{None}.  Only
+        the directories modified since the previous search are listed.
+    @param updateManifest: If C{False}, C{manifest} is only read, and is not
+        created or replaced with the results of this search.
     @return: A list of L{Project}.
     """
-    projects = []
-    for filePath in baseDirectory.walk():
-        if filePath.basename() == 'topfiles':
-            projectDirectory = filePath.parent()
-            projects.append(Project(projectDirectory))
+    exclude = tuple(exclude)
+    discoveryManifest = None
+    if manifest is not None:
+        discoveryManifest = DiscoveryManifest.load(
+            manifest, baseDirectory.path, exclude)
+    finder = ProjectFinder(
+        exclude=exclude, jobs=jobs, manifest=discoveryManifest)
+    projects = [Project(FilePath(path))
+                for path in finder.find(baseDirectory.path)]
+    if discoveryManifest is not None and updateManifest:
+        discoveryManifest.save(manifest)
     return projects
 
 
@@ -221,30 +455,39 @@ def replaceProjectVersion(filename, newversion):
     @param filename: A filename which is most likely a "_version.py"
         under some Twisted project.
     @param newversion: A version object.
+
+    @return: C{True} if the file was written, C{False} if it was left alone
+        because it already set that version.
     """
     # XXX - this should be moved to Project and renamed to writeVersionFile.
     # jml, 2007-11-15.
+    data = generateVersionFileData(newversion)
+    try:
+        with open(filename) as f:
+            if f.read(len(data) + 1) == data:
+                return False
+    except IOError:
+        pass
+    _versionCache.pop(filename, None)
     f = open(filename, 'w')
-    f.write(generateVersionFileData(newversion))
+    f.write(data)
     f.close()
+    return True
 
 
 
 def replaceInFile(filename, oldToNew):
     """
     I replace the text `oldstr' with `newstr' in `filename' using science.
+
+    All of the keys of C{oldToNew} are replaced in a single pass over the
+    file, longest first where several start at the same place (see
+    L{replaceStrings}).  The new contents are written to a temporary file
+    next to C{filename}, which then replaces it atomically.
     """
-    os.rename(filename, filename + '.bak')
-    f = open(filename + '.bak')
-    d = f.read()
-    f.close()
-    for k, v in oldToNew.items():
-        d = d.replace(k, v)
-    f = open(filename + '.new', 'w')
-    f.write(d)
-    f.close()
-    os.rename(filename + '.new', filename)
-    os.unlink(filename + '.bak')
+    path = FilePath(filename)
+    with path.open() as old, atomicReplacement(path) as new:
+        replaceStrings(old, new, oldToNew)
 
 
 
@@ -267,6 +510,9 @@ class NewsBuilder(object):
         each news file and which should be kept at the top, not shifted down
         with all the other content.  Put another way, this is the text after
         which the new news text is inserted.
+
+    @ivar tracer: The L{Tracer} recording the phases of the build, or a
+        L{NullTracer}.
     """
 
     _FEATURE = ".feature"
@@ -289,6 +535,16 @@ class NewsBuilder(object):
         'http://twistedmatrix.com/trac/ticket/<number>\n'
         '\n')
 
+    def __init__(self, tracer=None):
+        """
+        @param tracer: A L{Tracer} with which to record the phases of the
+            build, or C{None}.
+        """
+        if tracer is None:
+            tracer = NullTracer()
+        self.tracer = tracer
+
+
     def _today(self):
         """
         Return today's date as a string in YYYY-MM-DD format.
@@ -322,6 +578,42 @@ class NewsBuilder(object):
         return results
 
 
+    def _indexChanges(self, path, fragments=None):
+        """
+        Load the ticket summaries of every type with a single listing of
+        C{path}.
+
+        This is equivalent to calling L{NewsBuilder._findChanges} once for
+        each of the news entry types, but the directory is only listed and
+        each news entry only read once.
+
+        @param path: A L{FilePath} the direct children of which to search
+            for news entries.
+
+        @param fragments: The L{FilePath}s of the news entries in C{path}, as
+            found by L{NewsBuilder._findFragments}, or C{None} to list
+            C{path}.
+
+        @return: A C{dict} mapping each of the news entry types to a C{list}
+            of ticket information of the sort returned by
+            L{NewsBuilder._findChanges}.
+        """
+        index = dict((ticketType, []) for ticketType in self._headings)
+        if fragments is None:
+            fragments = path.children()
+        for child in fragments:
+            base, ext = os.path.splitext(child.basename())
+            tickets = index.get(ext)
+            if tickets is not None:
+                tickets.append((
+                    int(base),
+                    ' '.join(child.getContent().splitlines())))
+                self.tracer.count('filesRead')
+        for tickets in index.values():
+            tickets.sort()
+        return index
+
+
     def _writeHeader(self, fileObj, header):
         """
         Write a version header to the given file.
@@ -361,7 +653,7 @@ class NewsBuilder(object):
             ticketList = ', '.join([
                 '#' + str(ticket) for ticket in relatedTickets])
             entry = ' - %s (%s)' % (description, ticketList)
-            entry = textwrap.fill(entry, subsequent_indent='   ')
+            entry = fill(entry)
             fileObj.write(entry + '\n')
         fileObj.write('\n')
 
@@ -386,10 +678,163 @@ class NewsBuilder(object):
         for (ticket, ignored) in tickets:
             formattedTickets.append('#' + str(ticket))
         entry = ' - ' + ', '.join(formattedTickets)
-        entry = textwrap.fill(entry, subsequent_indent='   ')
+        entry = fill(entry)
         fileObj.write(entry + '\n\n')
 
 
+    def _renderNews(self, path, header, fragments=None):
+        """
+        Render the news for one release from the change information in the
+        given directory.
+
+        @param path: A directory (probably a I{topfiles} directory) containing
+            change information in the form of <ticket>.<change type> files.
+        @type path: L{FilePath}
+
+        @param header: The top-level header to use when writing the news.
+        @type header: L{str}
+
+        @param fragments: The L{FilePath}s of the change information files,
+            as found by L{NewsBuilder._findFragments}, or C{None} to list
+            C{path}.
+
+        @return: The news, as a C{str} to be prepended to a I{NEWS} file.
+        """
+        with self.tracer.span('fragment scan', path=path.path):
+            index = self._indexChanges(path, fragments)
+
+        with self.tracer.span('render', path=path.path):
+            changes = []
+            for part in (self._FEATURE, self._BUGFIX, self._DOC,
+                         self._REMOVAL):
+                tickets = index[part]
+                if tickets:
+                    changes.append((part, tickets))
+            misc = index[self._MISC]
+
+            news = StringIO()
+            self._writeHeader(news, header)
+            if changes:
+                for (part, tickets) in changes:
+                    self._writeSection(
+                        news, self._headings.get(part), tickets)
+            else:
+                news.write(self._NO_CHANGES)
+                news.write('\n')
+            self._writeMisc(news, self._headings.get(self._MISC), misc)
+            news.write('\n')
+            return news.getvalue()
+
+
+    def _prependNews(self, output, news, transaction=None):
+        """
+        Insert news at the top of a I{NEWS} file, below the ticket hint if the
+        file starts with it.
+
+        The L{NewsIndex} of the file is updated with the new sections, or
+        created by reading the file through if it has none.
+
+        @param output: The NEWS file to which the news will be prepended.
+        @type output: L{FilePath}
+
+        @param news: The news, as rendered by L{NewsBuilder._renderNews}.
+        @type news: C{str}
+
+        @param transaction: The L{Transaction} in which to stage the new
+            contents of C{output}, which is then only replaced when the
+            transaction is committed, or C{None} to replace it now.
+
+        @return: C{True} if the file was written (or staged), C{False} if it
+            was left alone because its contents would not have changed.
+        """
+        with self.tracer.span('NEWS write', path=output.path):
+            index = NewsIndex.load(output)
+            if index is None:
+                index = NewsIndex.scan(output)
+                self.tracer.count('filesRead')
+            newNewsPath = Transaction.stagingPath(output)
+            with output.open() as oldNews, newNewsPath.open('w') as newNews:
+                # Only the start of the old news is needed to find the ticket
+                # hint; the rest is copied over without being read into
+                # memory.
+                oldNewsStart = 0
+                if oldNews.read(len(self._TICKET_HINT)) == self._TICKET_HINT:
+                    newNews.write(self._TICKET_HINT)
+                    oldNewsStart = len(self._TICKET_HINT)
+                newNews.write(news)
+                copyFileRange(oldNews, newNews, oldNewsStart)
+                self.tracer.count('filesRead')
+                self.tracer.count('bytesWritten', newNews.tell())
+            def saveIndex():
+                index.spliced(oldNewsStart, oldNewsStart, news).save(output)
+            if transaction is None:
+                if not replaceIfChanged(newNewsPath, output):
+                    return False
+                saveIndex()
+            elif sameContents(newNewsPath, output):
+                newNewsPath.remove()
+                return False
+            else:
+                transaction.add(newNewsPath, output, saveIndex)
+            return True
+
+
+    def _insertNews(self, oldNews, news):
+        """
+        Insert news at the top of the contents of a I{NEWS} file, below the
+        ticket hint if they start with it, as L{NewsBuilder._prependNews}
+        does to the file itself.
+
+        @param oldNews: The contents of the I{NEWS} file.
+        @type oldNews: C{str}
+
+        @param news: The news, as rendered by L{NewsBuilder._renderNews}.
+        @type news: C{str}
+
+        @return: The new contents of the I{NEWS} file, as a C{str}.
+        """
+        if oldNews.startswith(self._TICKET_HINT):
+            hint = len(self._TICKET_HINT)
+            return oldNews[:hint] + news + oldNews[hint:]
+        return news + oldNews
+
+
+    def _previewNews(self, output, news, diff=False):
+        """
+        Describe what L{NewsBuilder._prependNews} would do to a I{NEWS} file,
+        without changing it.
+
+        @param output: The NEWS file to which the news would be prepended.
+        @type output: L{FilePath}
+
+        @param news: The news, as rendered by L{NewsBuilder._renderNews}.
+        @type news: C{str}
+
+        @param diff: If C{True}, describe the change as a unified diff against
+            the current contents of C{output}, of which only the lines around
+            the news are read.  Otherwise, give the news under the path of
+            C{output}, without reading it.
+
+        @return: The description, as a C{str}.
+        """
+        if not diff:
+            return '==> %s <==\n%s' % (output.path, news)
+        with self.tracer.span('NEWS preview', path=output.path):
+            with output.open() as oldNews:
+                hint = []
+                if oldNews.read(len(self._TICKET_HINT)) == self._TICKET_HINT:
+                    hint = self._TICKET_HINT.splitlines(True)
+                else:
+                    oldNews.seek(0)
+                # As much context as a unified diff shows by default.
+                context = [oldNews.readline() for _ in range(3)]
+                self.tracer.count('filesRead')
+        context = [line for line in context if line]
+        return ''.join(difflib.unified_diff(
+            hint + context, hint + news.splitlines(True) + context,
+            output.path, output.path))
+
+
     def build(self, path, output, header):
         """
         Load all of the change information from the given directory and write
@@ -406,32 +851,63 @@ class NewsBuilder(object):
         @type header: L{str}
 
         @raise NotWorkingDirectory: If the C{path} is not an SVN checkout.
+
+        @return: C{True} if C{output} was written, C{False} if it was left
+            alone because its contents would not have changed.
         """
-        changes = []
-        for part in (self._FEATURE, self._BUGFIX, self._DOC, self._REMOVAL):
-            tickets = self._findChanges(path, part)
-            if tickets:
-                changes.append((part, tickets))
-        misc = self._findChanges(path, self._MISC)
+        return self._prependNews(output, self._renderNews(path, header))
 
-        oldNews = output.getContent()
-        newNews = output.sibling('NEWS.new').open('w')
-        if oldNews.startswith(self._TICKET_HINT):
-            newNews.write(self._TICKET_HINT)
-            oldNews = oldNews[len(self._TICKET_HINT):]
 
-        self._writeHeader(newNews, header)
-        if changes:
-            for (part, tickets) in changes:
-                self._writeSection(newNews, self._headings.get(part), tickets)
-        else:
-            newNews.write(self._NO_CHANGES)
-            newNews.write('\n')
-        self._writeMisc(newNews, self._headings.get(self._MISC), misc)
-        newNews.write('\n')
-        newNews.write(oldNews)
-        newNews.close()
-        output.sibling('NEWS.new').moveTo(output)
+    def _findFragments(self, path, names=None):
+        """
+        Find the change information files in a directory.
+
+        @param path: A directory (probably a I{topfiles} directory) containing
+            change information in the form of <ticket>.<change type> files.
+        @type path: L{FilePath}
+
+        @param names: The basenames of the files in C{path} among which to
+            look, or C{None} to list C{path}.
+
+        @return: A C{list} of L{FilePath}s of the change information files.
+        """
+        ticketTypes = self._headings.keys()
+        if names is None:
+            names = path.listdir()
+        fragments = []
+        for name in names:
+            base, ext = os.path.splitext(name)
+            if ext in ticketTypes:
+                fragments.append(path.child(name))
+        return fragments
+
+
+    def _removeFragments(self, fragments, backend=None, unversioned=()):
+        """
+        Delete change information files with as few version control commands
+        as the limit on the size of a command line allows.
+
+        @param fragments: The change information files to delete.
+        @type fragments: C{list} of L{FilePath}
+
+        @param backend: The L{IVersionControlBackend} with which to delete
+            them, or C{None} to run C{svn rm}, in which case the files must be
+            in a SVN directory.
+
+        @param unversioned: The paths of the files, among C{fragments}, which
+            are not under version control, and which are deleted from the
+            disk instead, since the version control system would refuse to.
+        """
+        if backend is None:
+            backend = SubversionBackend(_runVersionControl, self.tracer)
+        versioned = [fragment.path for fragment in fragments
+                     if fragment.path not in unversioned]
+        if versioned:
+            backend.remove(versioned)
+        unversioned = [fragment.path for fragment in fragments
+                       if fragment.path in unversioned]
+        if unversioned:
+            FilesystemBackend(None, self.tracer).remove(unversioned)
 
 
     def _deleteFragments(self, path):
@@ -444,11 +920,7 @@ class NewsBuilder(object):
             change information in the form of <ticket>.<change type> files.
         @type path: L{FilePath}
         """
-        ticketTypes = self._headings.keys()
-        for child in path.children():
-            base, ext = os.path.splitext(child.basename())
-            if ext in ticketTypes:
-                runCommand(["svn", "rm", child.path])
+        self._removeFragments(self._findFragments(path))
 
 
     def _getNewsName(self, project):
@@ -467,7 +939,8 @@ class NewsBuilder(object):
 
 class NotWorkingDirectory(Exception):
     """
-    Raised when a directory does not appear to be an SVN working directory.
+    Raised when a directory does not appear to be in a version control
+    working copy.
     """
 
 
@@ -480,9 +953,58 @@ class NewsBuilderOptions(usage.Options):
 
     longdesc = """\
     REPOSITORY_PATH: The path to the root of your project.
-                     Must be a subversion repository.
+                     Must be a Subversion or Git working copy,
+                     unless --vcs=filesystem is given, or a Git
+                     repository when --revision is given.
     """
 
+    optFlags = [
+        ['dry-run', 'n',
+         'Print the news which would be written to each NEWS file instead '
+         'of writing it, and do not run any version control commands.'],
+        ['diff', None,
+         'Print the changes which would be made to each NEWS file as a '
+         'unified diff.  Implies --dry-run.'],
+        ['resume', None,
+         'Resume a build which failed, reusing the news it rendered for the '
+         'projects whose fragments did not change since.'],
+        ['roll-back', None,
+         'Undo a build which failed after replacing the news files, '
+         'restoring them from their backups, instead of finishing it.'],
+    ]
+
+    optParameters = [
+        ['manifest', None, None,
+         'A file in which to remember the project directories between runs, '
+         'so that only modified directories are searched again.'],
+        ['trace', None, None,
+         'A file to which to write the time taken by each phase of the run, '
+         'in the Chrome trace event format.'],
+        ['jobs', 'j', 1,
+         'The number of projects whose news to build at the same time.', int],
+        ['command-timeout', None, None,
+         'The number of seconds after which to kill a version control '
+         'command which is still running.', float],
+        ['max-processes', None, 8,
+         'The number of version control commands which may run at the same '
+         'time.', int],
+        ['vcs', None, None,
+         'The version control system with which to remove the news '
+         'fragments: svn, git, or filesystem to delete them without any.  '
+         'By default, it is found from the working copy.'],
+        ['discovery', None, 'walk',
+         'How to find the projects and their news fragments: walk, to '
+         'search the directories, or index, to list the files under '
+         'version control with a single command, ignoring any others.'],
+        ['revision', None, None,
+         'A revision of the Git repository at REPOSITORY_PATH from which to '
+         'build the news, without checking it out.  The news files are '
+         'written to --output-directory and no fragment is removed.'],
+        ['output-directory', None, None,
+         'The directory to which to write the news files built with '
+         '--revision.'],
+    ]
+
     def __init__(self,  stdout=None, stderr=None):
         """
         @param stdout: A file to which stdout messages will be written.
@@ -496,6 +1018,55 @@ class NewsBuilderOptions(usage.Options):
         if stderr is None:
             stderr = sys.stderr
         self.stderr = stderr
+        self['exclude'] = []
+
+
+    def opt_exclude(self, pattern):
+        """
+        Do not search directories whose name matches the given glob pattern
+        for projects (may be given multiple times).
+        """
+        self['exclude'].append(pattern)
+
+
+    def opt_preview(self):
+        """
+        An alias for --dry-run.
+        """
+        self['dry-run'] = True
+
+
+    def postOptions(self):
+        """
+        Check that the number of jobs, the time limit of commands, the
+        number of commands run at once, the version control system, the
+        discovery mode, the revision and the roll back make sense.
+        """
+        if self['jobs'] < 1:
+            raise usage.UsageError("--jobs must be at least 1")
+        if self['max-processes'] < 1:
+            raise usage.UsageError("--max-processes must be at least 1")
+        if self['vcs'] is not None and self['vcs'] not in BACKENDS:
+            raise usage.UsageError(
+                "--vcs must be one of: " + ", ".join(sorted(BACKENDS)))
+        if self['discovery'] not in ('walk', 'index'):
+            raise usage.UsageError("--discovery must be walk or index")
+        timeout = self['command-timeout']
+        if timeout is not None and timeout <= 0:
+            raise usage.UsageError("--command-timeout must be positive")
+        if (self['revision'] is None) != (self['output-directory'] is None):
+            raise usage.UsageError(
+                "--revision and --output-directory must be given together")
+        if self['revision'] is not None and (
+                self['dry-run'] or self['diff']):
+            raise usage.UsageError("--revision cannot be used with --dry-run")
+        if self['roll-back'] and (
+                self['dry-run'] or self['diff'] or
+                self['revision'] is not None):
+            raise usage.UsageError(
+                "--roll-back cannot be used with --dry-run or --revision")
+        if self['diff']:
+            self['dry-run'] = True
 
 
     def opt_version(self):
@@ -523,13 +1094,17 @@ class NewsBuilderScript(object):
     def __init__(self, buildStrategy=None, newsBuilder=None,
                  stdout=None, stderr=None):
         """
-        @param buildStrategy: A L{TwistedBuildStrategy} like instance.
+        @param buildStrategy: A L{TwistedBuildStrategy} like instance.  If
+            C{None}, a L{TwistedBuildStrategy} configured from the command
+            line options is used.
+        @param newsBuilder: The L{NewsBuilder} like instance to use when
+            C{buildStrategy} is C{None}.  If C{None}, a L{NewsBuilder} is
+            created.
         @param stdout: A file to which stdout messages will be written.
         @param stderr: A file to which stderr messages will be written.
         """
-        if buildStrategy is None:
-            buildStrategy = TwistedBuildStrategy(newsBuilder=NewsBuilder())
         self.buildStrategy = buildStrategy
+        self.newsBuilder = newsBuilder
 
         if stdout is None:
             stdout = sys.stdout
@@ -552,16 +1127,150 @@ class NewsBuilderScript(object):
             self.stderr.write(message.encode('utf-8'))
             raise SystemExit(1)
 
-        self.buildStrategy.buildAll(options['repositoryPath'])
+        tracer = None
+        if options['trace'] is not None:
+            tracer = Tracer()
+        _processRunner.timeout = options['command-timeout']
+        _processRunner.maxProcesses = options['max-processes']
+        secondsBefore = _processRunner.seconds
+        timedOutBefore = _processRunner.timedOut
+
+        buildStrategy = self.buildStrategy
+        if buildStrategy is None:
+            buildStrategy = self._makeBuildStrategy(options, tracer)
+        try:
+            if options['revision'] is not None:
+                buildStrategy.buildRevision(
+                    options['repositoryPath'], options['revision'],
+                    FilePath(options['output-directory']))
+            elif options['dry-run']:
+                buildStrategy.previewAll(
+                    options['repositoryPath'], self.stdout,
+                    diff=options['diff'])
+            elif options['roll-back']:
+                self._rollBack(buildStrategy, options['repositoryPath'])
+            else:
+                try:
+                    buildStrategy.buildAll(options['repositoryPath'])
+                except:
+                    self._reportUnfinished(
+                        buildStrategy, options['repositoryPath'])
+                    raise
+        finally:
+            if tracer is not None:
+                tracer.count('subprocessMilliseconds', int(round(
+                    (_processRunner.seconds - secondsBefore) * 1000)))
+                tracer.count('subprocessesTimedOut',
+                             _processRunner.timedOut - timedOutBefore)
+                tracer.write(FilePath(options['trace']))
+
+
+    def _rollBack(self, buildStrategy, repositoryPath):
+        """
+        Undo the build of C{repositoryPath} which failed after replacing the
+        news files.
+
+        @param buildStrategy: A L{TwistedBuildStrategy} like instance.
+        @param repositoryPath: The L{FilePath} of the repository.
+
+        @raise SystemExit: With status C{1}, if there is no such build.
+        """
+        if not buildStrategy.rollBack(repositoryPath):
+            message = u'ERROR: There is no unfinished build of {}.\n'.format(
+                repositoryPath.path.decode(sys.getfilesystemencoding()))
+            self.stderr.write(message.encode('utf-8'))
+            raise SystemExit(1)
+
+
+    def _reportUnfinished(self, buildStrategy, repositoryPath):
+        """
+        Tell the user how to finish or undo a build which failed after
+        replacing the news files, if the build of C{repositoryPath} did.
+
+        @param buildStrategy: A L{TwistedBuildStrategy} like instance.
+        @param repositoryPath: The L{FilePath} of the repository.
+        """
+        journal = buildStrategy.unfinishedBuild(repositoryPath)
+        if journal is None:
+            return
+        encoding = sys.getfilesystemencoding()
+        message = (
+            u'ERROR: The news files beneath {} were replaced, but not all of '
+            u'the news fragments were removed.  Run newsbuilder again to '
+            u'remove them, or with --roll-back to restore the news files from '
+            u'their backups (NEWS.old).  The build is recorded in {}.\n'
+            ).format(repositoryPath.path.decode(encoding),
+                     journal.path.decode(encoding))
+        self.stderr.write(message.encode('utf-8'))
+
+
+    def _makeBuildStrategy(self, options, tracer=None):
+        """
+        Create the L{TwistedBuildStrategy} described by the command line
+        options.
+
+        @param options: The parsed L{NewsBuilderOptions}.
+        @param tracer: The L{Tracer} with which to record the phases of the
+            build, or C{None}.
+        @return: A L{TwistedBuildStrategy}.
+        """
+        newsBuilder = self.newsBuilder
+        if newsBuilder is None:
+            newsBuilder = NewsBuilder(tracer=tracer)
+        manifest = options['manifest']
+        if manifest is not None:
+            manifest = FilePath(manifest)
+        return TwistedBuildStrategy(
+            newsBuilder=newsBuilder, exclude=options['exclude'],
+            manifest=manifest, tracer=tracer, jobs=options['jobs'],
+            resume=options['resume'], vcs=options['vcs'],
+            discovery=options['discovery'])
 
 
 
 class TwistedBuildStrategy(object):
     """
     A strategy for using newsbuilder in the Twisted project.
+
+    @ivar exclude: Basename patterns of directories which are not searched
+        for projects, in addition to the default ones (see
+        L{findTwistedProjects}).
+
+    @ivar manifest: A L{FilePath} in which to remember the project
+        directories found between runs, or C{None}.
+
+    @ivar tracer: The L{Tracer} recording the phases of the build, or a
+        L{NullTracer}.
+
+    @ivar jobs: The number of threads over which to spread the search for
+        projects and the building of their news.
+
+    @ivar resume: If C{True}, the news recorded by a previous build which
+        failed is reused for the projects whose fragments did not change (see
+        L{Progress}).
+
+    @ivar vcs: The name of the backend in L{newsbuilder._vcs.BACKENDS} with
+        which to remove the fragments, or C{None} to choose it from the
+        working copy.
+
+    @ivar discovery: C{"walk"} to find the projects and their fragments by
+        listing directories, or C{"index"} to find them among the files
+        under version control (see L{TrackedFiles}) when building, in which
+        case C{manifest} is not used.  Previews always list directories, as
+        they run no version control commands.
     """
-    def __init__(self, newsBuilder):
+    def __init__(self, newsBuilder, exclude=(), manifest=None, tracer=None,
+                 jobs=1, resume=False, vcs=None, discovery='walk'):
         self.newsBuilder = newsBuilder
+        self.exclude = tuple(exclude)
+        self.manifest = manifest
+        self.jobs = jobs
+        self.resume = resume
+        self.vcs = vcs
+        self.discovery = discovery
+        if tracer is None:
+            tracer = NullTracer()
+        self.tracer = tracer
 
 
     def _today(self):
@@ -571,7 +1280,7 @@ class TwistedBuildStrategy(object):
         return date.today().strftime('%Y-%m-%d')
 
 
-    def _iterProjects(self, baseDirectory):
+    def _iterProjects(self, baseDirectory, tracked=None, updateManifest=True):
         """
         Iterate through the Twisted projects in C{baseDirectory}, yielding
         everything we need to know to build news for them.
@@ -586,9 +1295,22 @@ class TwistedBuildStrategy(object):
             beneath which to find Twisted projects for which to generate
             news (see L{findTwistedProjects}).
         @type baseDirectory: L{FilePath}
+
+        @param tracked: The L{TrackedFiles} beneath C{baseDirectory} among
+            which to find the projects, or C{None} to search the directories.
+
+        @param updateManifest: If C{False}, L{TwistedBuildStrategy.manifest}
+            is only read (see L{findTwistedProjects}).
         """
         # Get all the subprojects to generate news for
-        projects = findTwistedProjects(baseDirectory)
+        with self.tracer.span('discovery'):
+            if tracked is None:
+                projects = findTwistedProjects(
+                    baseDirectory, exclude=self.exclude, jobs=self.jobs,
+                    manifest=self.manifest, updateManifest=updateManifest)
+            else:
+                projects = [Project(FilePath(path))
+                            for path in tracked.findProjects()]
         # And order them alphabetically for ease of reading
         projects.sort(key=lambda proj: proj.directory.path)
         # And generate them backwards since we write news by prepending to
@@ -598,7 +1320,9 @@ class TwistedBuildStrategy(object):
         for project in projects:
             topfiles = project.directory.child("topfiles")
             name = self.newsBuilder._getNewsName(project)
-            version = project.getVersion()
+            with self.tracer.span('getVersion', project=name):
+                version = project.getVersion()
+            self.tracer.count('filesRead')
             yield topfiles, name, version
 
 
@@ -609,25 +1333,550 @@ class TwistedBuildStrategy(object):
         I{topfiles} directories and update the news file in C{baseDirectory}
         with all of the news.
 
+        The news of each subproject is rendered once and used for both its
+        own news file and the news file in C{baseDirectory}, which is
+        rewritten only once.  With more than one job, the subprojects are
+        built in a pool of threads, but the news in C{baseDirectory} is in the
+        same order as when they are built one after another.
+
+        The news files are only replaced once all of them are built, and
+        then together (see L{Transaction}).  If a previous build was
+        interrupted while they were being replaced, or before its fragments
+        were removed, that build is finished instead of a new one being done,
+        unless it is undone first with L{TwistedBuildStrategy.rollBack}.
+        The news rendered for each subproject is recorded until the news
+        files are replaced, so that a build which fails before then can be
+        resumed (see L{TwistedBuildStrategy.resume}).
+
+        @param baseDirectory: A L{FilePath} representing the root directory
+            beneath which to find Twisted projects for which to generate
+            news (see L{findTwistedProjects}).
+        """
+        with self.tracer.span('buildAll', path=baseDirectory.path):
+            self._buildAll(baseDirectory)
+
+
+    def previewAll(self, baseDirectory, output, diff=False):
+        """
+        Print the news which L{TwistedBuildStrategy.buildAll} would write,
+        without changing any news files, fragments or
+        L{TwistedBuildStrategy.manifest}, or running any version control
+        commands.
+
+        The news of each subproject is printed as soon as it is rendered, in
+        alphabetical order, followed by the news of the top-level I{NEWS}
+        file.
+
+        @param baseDirectory: A L{FilePath} representing the root directory
+            beneath which to find Twisted projects for which to generate
+            news (see L{findTwistedProjects}).
+
+        @param output: A file-like object to which to write the news.
+
+        @param diff: If C{True}, print the changes to each I{NEWS} file as a
+            unified diff (see L{NewsBuilder._previewNews}).
+        """
+        with self.tracer.span('previewAll', path=baseDirectory.path):
+            today = self._today()
+            aggregateNews = []
+            projects = list(self._iterProjects(
+                baseDirectory, updateManifest=False))
+            projects.reverse()
+            for topfiles, name, version in projects:
+                header = "Twisted %s %s (%s)" % (name, version.base(), today)
+                news = self.newsBuilder._renderNews(topfiles, header)
+                output.write(self.newsBuilder._previewNews(
+                    topfiles.child("NEWS"), news, diff))
+                aggregateNews.append(news)
+            output.write(self.newsBuilder._previewNews(
+                baseDirectory.child("NEWS"), ''.join(aggregateNews), diff))
+
+
+    def _buildProject(self, transaction, progress, tracked, today, topfiles,
+                      name, version):
+        """
+        Build the news file of one subproject, unless its news was recorded
+        by the build being resumed.
+
+        @param transaction: The L{Transaction} in which to stage the news
+            file.
+        @param progress: The L{Progress} in which to record the news.
+        @param tracked: The L{TrackedFiles} among which to find the
+            fragments, or C{None}.
+        @param today: Today's date, for the header of the news.
+        @param topfiles: The L{FilePath} of the I{topfiles} directory of the
+            subproject.
+        @param name: The name of the subproject, as it appears in the news.
+        @param version: The current L{Version} of the subproject.
+
+        @return: The news of the subproject, as a C{str}.
+        """
+        with self.tracer.span('project', project=name):
+            header = "Twisted %s %s (%s)" % (name, version.base(), today)
+            fragments = self._findFragments(topfiles, tracked)
+            key = fragmentsKey(header, fragments)
+            news = progress.find(topfiles, key)
+            if news is None:
+                news = self.newsBuilder._renderNews(
+                    topfiles, header, fragments)
+                progress.record(topfiles, key, news)
+            else:
+                self.tracer.count('projectsResumed')
+            self.newsBuilder._prependNews(
+                topfiles.child("NEWS"), news, transaction)
+        return news
+
+
+    def _buildAll(self, baseDirectory):
+        """
+        Do the work of L{TwistedBuildStrategy.buildAll}.
+        """
+        backend = self._backend(baseDirectory, _runVersionControl)
+        transaction, unversioned = self._commitNews(baseDirectory, backend)
+        self.newsBuilder._removeFragments(
+            self._pendingFragments(transaction), backend, unversioned)
+        transaction.finish()
+
+
+    def unfinishedBuild(self, baseDirectory):
+        """
+        Find whether a build of the news files beneath C{baseDirectory}
+        failed after replacing them, which the next
+        L{TwistedBuildStrategy.buildAll} finishes, or
+        L{TwistedBuildStrategy.rollBack} undoes.
+
+        @param baseDirectory: A L{FilePath} representing the root directory
+            beneath which to find Twisted projects.
+
+        @return: The L{FilePath} of the journal of the build, or C{None} if
+            there is no such build.
+        """
+        journal = self._journal(baseDirectory)
+        if journal.exists():
+            return journal
+        return None
+
+
+    def rollBack(self, baseDirectory):
+        """
+        Undo a build of the news files beneath C{baseDirectory} which failed
+        after replacing them, restoring them from their backups.
+
+        The fragments which the build removed already are not restored; their
+        removal can be reverted with the version control system.
+
+        @param baseDirectory: A L{FilePath} representing the root directory
+            beneath which to find Twisted projects.
+
+        @return: C{True} if there was such a build, C{False} otherwise.
+        """
+        transaction = Transaction.load(self._journal(baseDirectory))
+        if transaction is None:
+            return False
+        with self.tracer.span('rollBack', path=baseDirectory.path):
+            transaction.rollBack()
+        return True
+
+
+    def buildAllAsync(self, baseDirectory, reactor=None, threadPool=None):
+        """
+        Do what L{TwistedBuildStrategy.buildAll} does without blocking the
+        reactor.
+
+        The version control commands are run with C{reactor.spawnProcess}, and
+        the news files are read and written in a thread pool, so that several
+        repositories can be built at the same time.
+
         @param baseDirectory: A L{FilePath} representing the root directory
             beneath which to find Twisted projects for which to generate
             news (see L{findTwistedProjects}).
+
+        @param reactor: The reactor with which to run the commands, or
+            C{None} to use the global reactor.
+
+        @param threadPool: The L{twisted.python.threadpool.ThreadPool} in
+            which to read and write files, or C{None} to use the reactor's.
+
+        @return: A L{Deferred} which fires with C{None} once the build is
+            done, or fails with L{NotWorkingDirectory} or L{CommandFailed}.
+        """
+        from ._deferred import buildAllAsync
+        return buildAllAsync(self, baseDirectory, reactor, threadPool)
+
+
+    def buildRevision(self, repository, revision, outputDirectory):
+        """
+        Build the news of a revision of a Git repository without checking it
+        out, and write the news files to C{outputDirectory} instead of
+        replacing them in the repository.
+
+        The files of the revision are listed with a single C{git ls-tree},
+        among which the projects and their fragments are found (see
+        L{TrackedFiles}), and the I{_version.py}, fragments and news files
+        are read through a single C{git cat-file --batch} process.  No
+        fragment is removed, and L{TwistedBuildStrategy.vcs},
+        L{TwistedBuildStrategy.discovery} and
+        L{TwistedBuildStrategy.manifest} are not used.
+
+        @param repository: A L{FilePath} of the repository, or of a working
+            tree of it.
+
+        @param revision: The revision, such as a branch name or a commit
+            hash, or a tree such as C{"HEAD:twisted"} to build the projects
+            beneath a directory of the revision, as C{buildAll} would given
+            that directory.
+        @type revision: C{str}
+
+        @param outputDirectory: A L{FilePath} of the directory to which to
+            write the news files, at the same paths as in the revision.  The
+            news of all the projects is written to I{NEWS} in it.
+
+        @raise CommandFailed: If the revision cannot be read.
         """
+        # The files of the revision are found as if it was checked out in
+        # the repository, so that TrackedFiles sees ordinary paths and the
+        # projects are named after their directories as by buildAll.
+        baseDirectory = repository
+        tree = revision.partition(':')[2]
+        if tree:
+            baseDirectory = repository.preauthChild(tree)
+        with self.tracer.span('buildRevision', path=baseDirectory.path):
+            with self.tracer.span('discovery'):
+                files = GitRevision.open(
+                    repository.path, revision, _runVersionControl,
+                    self.tracer, _processRunner.timeout)
+            try:
+                self._buildRevision(baseDirectory, files, outputDirectory)
+            finally:
+                files.close()
+
+
+    def _buildRevision(self, baseDirectory, files, outputDirectory):
+        """
+        Do the work of L{TwistedBuildStrategy.buildRevision}.
+
+        @param baseDirectory: A L{FilePath} of the directory at which the
+            tree of the revision would be checked out.
+        @param files: The L{GitRevision} from which to read the files.
+        @param outputDirectory: A L{FilePath} of the directory to which to
+            write the news files.
+        """
+        def fromTree(treePath):
+            return os.path.join(baseDirectory.path, *treePath.split('/'))
+
+        def toTree(path):
+            relative = os.path.relpath(path, baseDirectory.path)
+            if relative == os.curdir:
+                return ''
+            return '/'.join(relative.split(os.sep))
+
+        def readNews(treePath):
+            if not files.exists(treePath):
+                return ''
+            self.tracer.count('filesRead')
+            return files.read(treePath)
+
+        def writeNews(treePath, news):
+            output = outputDirectory.descendant(treePath.split('/'))
+            with self.tracer.span('NEWS write', path=output.path):
+                output.parent().makedirs(ignoreExistingDirectory=True)
+                output.setContent(news)
+                self.tracer.count('bytesWritten', len(news))
+
+        tracked = TrackedFiles(
+            baseDirectory.path, [fromTree(path) for path in files.paths],
+            self.exclude)
+        today = self._today()
+        aggregateNews = []
+        for path in tracked.findProjects():
+            directory = RevisionPath(files, toTree(path))
+            topfiles = directory.child("topfiles")
+            name = self.newsBuilder._getNewsName(Project(FilePath(path)))
+            with self.tracer.span('project', project=name):
+                versionFile = directory.child("_version.py")
+                version = _versionFromSource(
+                    versionFile.getContent(), versionFile.path)
+                self.tracer.count('filesRead')
+                header = "Twisted %s %s (%s)" % (name, version.base(), today)
+                fragments = self.newsBuilder._findFragments(
+                    topfiles, tracked.children(fromTree(topfiles.path)))
+                news = self.newsBuilder._renderNews(
+                    topfiles, header, fragments)
+                newsFile = topfiles.child("NEWS").path
+                writeNews(newsFile, self.newsBuilder._insertNews(
+                    readNews(newsFile), news))
+            aggregateNews.append(news)
+        writeNews("NEWS", self.newsBuilder._insertNews(
+            readNews("NEWS"), ''.join(aggregateNews)))
+
+
+    def _backend(self, baseDirectory, run):
+        """
+        Get the backend with which to run the version control commands of a
+        build, and check that C{baseDirectory} is in a working copy of its
+        version control system, without running any command if possible (see
+        L{newsbuilder._vcs.detectWorkingCopy}).
+
+        @param baseDirectory: A L{FilePath} representing the root directory
+            beneath which to find Twisted projects.
+
+        @param run: A callable which runs a command, given its argument
+            vector, and returns its output or raises L{CommandFailed}.
+
+        @return: An L{IVersionControlBackend} from
+            L{newsbuilder._vcs.BACKENDS}, as named by
+            L{TwistedBuildStrategy.vcs} or chosen from the working copy.
+
+        @raise NotWorkingDirectory: If C{baseDirectory} is not in a working
+            copy.
+        """
+        name = self.vcs
+        if name is None:
+            name = chooseBackend(baseDirectory.path)
+            if name is None:
+                raise self._notWorkingDirectory(baseDirectory, "SVN or Git")
+        backend = BACKENDS[name](run, self.tracer)
         try:
-            runCommand(["svn", "info", baseDirectory.path])
+            backend.verify(baseDirectory.path)
         except CommandFailed:
-            raise NotWorkingDirectory(
-                "%s does not appear to be an SVN working directory."
-                % (baseDirectory.path,))
+            raise self._notWorkingDirectory(
+                baseDirectory, backend.description)
+        return backend
+
+
+    def _trackedFiles(self, baseDirectory, backend):
+        """
+        List the files under version control beneath C{baseDirectory} if
+        L{TwistedBuildStrategy.discovery} asks for it.
+
+        @param baseDirectory: A L{FilePath} representing the root directory
+            beneath which to find Twisted projects.
+
+        @param backend: The backend returned by
+            L{TwistedBuildStrategy._backend}.
+
+        @return: The L{TrackedFiles}, or C{None} if the directories are to be
+            searched instead, which they are if the backend does not know
+            which files are under version control.
+        """
+        if self.discovery != 'index':
+            return None
+        paths = backend.trackedFiles(baseDirectory.path)
+        if paths is None:
+            return None
+        return TrackedFiles(baseDirectory.path, paths, self.exclude)
+
+
+    def _findFragments(self, topfiles, tracked=None):
+        """
+        Find the fragments of a subproject.
+
+        @param topfiles: The L{FilePath} of the I{topfiles} directory of the
+            subproject.
+
+        @param tracked: The L{TrackedFiles} among which to find the
+            fragments, or C{None} to list C{topfiles}.
+
+        @return: A C{list} of the L{FilePath}s of the fragments.
+        """
+        if tracked is None:
+            return self.newsBuilder._findFragments(topfiles)
+        fragments = self.newsBuilder._findFragments(
+            topfiles, tracked.children(topfiles.path))
+        # Fragments deleted from the working copy are still under version
+        # control until the deletion is committed.
+        return [fragment for fragment in fragments
+                if os.path.exists(fragment.path)]
+
+
+    def _notWorkingDirectory(self, baseDirectory, description):
+        """
+        Make the exception raised when C{baseDirectory} is not a working
+        directory.
+
+        @param description: The name of the version control system expected.
+
+        @return: A L{NotWorkingDirectory}.
+        """
+        return NotWorkingDirectory(
+            "%s does not appear to be a working directory of %s."
+            % (baseDirectory.path, description))
+
+
+    def _journal(self, baseDirectory):
+        """
+        Get the journal of the L{Transaction} in which the news files beneath
+        C{baseDirectory} are replaced.
+
+        @return: A L{FilePath} in the user's cache (see
+            L{newsbuilder._cache}), named after the absolute path of
+            C{baseDirectory}.
+        """
+        return cachePath('journal', baseDirectory.path)
+
+
+    def _progressPath(self, baseDirectory):
+        """
+        Get the file in which the L{Progress} of the build of the news files
+        beneath C{baseDirectory} is recorded if the build fails.
+
+        @return: A L{FilePath} in the user's cache (see
+            L{newsbuilder._cache}), named after the absolute path of
+            C{baseDirectory}.
+        """
+        return cachePath('progress', baseDirectory.path)
+
+
+    def _commitNews(self, baseDirectory, backend=None):
+        """
+        Build the news files beneath C{baseDirectory} and replace them all at
+        once, or finish replacing them if a previous build was interrupted
+        while doing so, in which case no news is built.
+
+        @param baseDirectory: A L{FilePath} representing the root directory
+            beneath which to find Twisted projects.
+
+        @param backend: The backend returned by
+            L{TwistedBuildStrategy._backend}, with which to list the files
+            under version control if L{TwistedBuildStrategy.discovery} asks
+            for it, or C{None} to search the directories.
+
+        @return: A C{tuple} of the committed L{Transaction}, whose removals
+            are the fragments of the news, and whose journal is kept until
+            L{Transaction.finish} is called once they are removed, and of the
+            C{set} of the paths of the fragments which are not under version
+            control (see L{TwistedBuildStrategy._unversionedFragments}).
+        """
+        journal = self._journal(baseDirectory)
+        transaction = Transaction.load(journal)
+        if transaction is not None:
+            with self.tracer.span('recover', path=journal.path):
+                transaction.rollForward()
+            return transaction, self._unversionedFragments(
+                backend, self._pendingFragments(transaction))
+
+        tracked = None
+        if backend is not None:
+            tracked = self._trackedFiles(baseDirectory, backend)
+        transaction = Transaction(journal)
+        progress = Progress.open(
+            self._progressPath(baseDirectory), self.resume)
+        try:
+            built = self._buildNews(
+                baseDirectory, transaction, progress, tracked)
+            fragments = self._collectFragments(built, tracked)
+            # The version control system is asked about the fragments before
+            # the news files are replaced, so that a failing command leaves
+            # no journal behind.
+            unversioned = set()
+            if tracked is None:
+                unversioned = self._unversionedFragments(backend, fragments)
+            with self.tracer.span('commit'):
+                transaction.commit(fragments)
+        except:
+            transaction.abort()
+            progress.close()
+            raise
+        # From now on, the build is resumed from the journal.
+        progress.remove()
+        return transaction, unversioned
+
+
+    def _unversionedFragments(self, backend, fragments):
+        """
+        Find which fragments are not under version control, such as those
+        written but not added yet, which the version control system would
+        refuse to remove.
+
+        @param backend: The backend returned by
+            L{TwistedBuildStrategy._backend}, or C{None}.
+
+        @param fragments: The L{FilePath}s of the fragments.
+
+        @return: A C{set} of the paths of the fragments, among C{fragments},
+            which are not under version control, which is empty if
+            C{backend} is C{None}.
+        """
+        if backend is None or not fragments:
+            return set()
+        return backend.unversioned([fragment.path for fragment in fragments])
+
+
+    def _pendingFragments(self, transaction):
+        """
+        Find the fragments of a committed transaction which were not removed
+        yet.
+
+        @param transaction: A L{Transaction} committed by
+            L{TwistedBuildStrategy._commitNews}.
+
+        @return: A C{list} of the L{FilePath}s of the fragments.
+        """
+        return [fragment for fragment in transaction.removals
+                if os.path.exists(fragment.path)]
+
+
+    def _buildNews(self, baseDirectory, transaction, progress, tracked=None):
+        """
+        Build the news files of the subprojects beneath C{baseDirectory} and
+        the one in C{baseDirectory}, leaving the fragments in place.
+
+        @param baseDirectory: A L{FilePath} representing the root directory
+            beneath which to find Twisted projects.
+
+        @param transaction: The L{Transaction} in which to stage the news
+            files.
+
+        @param progress: The L{Progress} in which to record the news of each
+            subproject.
 
+        @param tracked: The L{TrackedFiles} among which to find the
+            subprojects and their fragments, or C{None}.
+
+        @return: A C{list} of the L{FilePath}s of the I{topfiles} directories
+            of the subprojects.
+        """
         today = self._today()
-        for topfiles, name, version in self._iterProjects(baseDirectory):
-            # We first build for the subproject
-            news = topfiles.child("NEWS")
-            header = "Twisted %s %s (%s)" % (name, version.base(), today)
-            self.newsBuilder.build(topfiles, news, header)
-            # Then for the global NEWS file
-            news = baseDirectory.child("NEWS")
-            self.newsBuilder.build(topfiles, news, header)
-            # Finally, delete the fragments
-            self.newsBuilder._deleteFragments(topfiles)
+        projects = list(self._iterProjects(baseDirectory, tracked))
+        built = [topfiles for topfiles, name, version in projects]
+
+        # We first build for each subproject
+        def buildProject(project):
+            return self._buildProject(
+                transaction, progress, tracked, today, *project)
+        if self.jobs > 1 and len(projects) > 1:
+            pool = ThreadPool(min(self.jobs, len(projects)))
+            try:
+                aggregateNews = pool.map(buildProject, projects)
+            finally:
+                pool.close()
+                pool.join()
+        else:
+            aggregateNews = map(buildProject, projects)
+
+        # Then the global NEWS file gets the news of every subproject in a
+        # single write.  The subprojects were visited in reverse order, so
+        # that prepending them one by one would put them in order.
+        aggregateNews.reverse()
+        self.newsBuilder._prependNews(
+            baseDirectory.child("NEWS"), ''.join(aggregateNews), transaction)
+        return built
+
+
+    def _collectFragments(self, built, tracked=None):
+        """
+        Find the fragments of all the subprojects, so that they can be
+        deleted together.
+
+        @param built: The L{FilePath}s of the I{topfiles} directories of the
+            subprojects.
+
+        @param tracked: The L{TrackedFiles} among which to find the
+            fragments, or C{None}.
+
+        @return: A C{list} of the L{FilePath}s of the fragments.
+        """
+        fragments = []
+        for topfiles in built:
+            fragments.extend(self._findFragments(topfiles, tracked))
+        return fragments
@@ -0,0 +1,245 @@
+# -*- test-case-name: newsbuilder.test.test_newsindex -*-
+# Copyright (c) Twisted Matrix Laboratories.
+# See LICENSE for details.
+
+"""
+An index of the release sections of NEWS files, kept in the user's cache, so
+that the news of one release can be found with a seek instead of a parse.
+"""
+
+from collections import namedtuple
+import json
+import os
+import re
+
+from ._cache import cachePath
+
+# The header of a release section: a title underlined with '='.
+_HEADER = re.compile(
+    r"^Twisted (?P<name>.+) (?P<version>\S+) "
+    r"\((?P<date>\d{4}-\d\d-\d\d)\)\r?\n=+\r?$",
+    re.MULTILINE)
+
+# The number of bytes of a NEWS file scanned at once by NewsIndex.scan.
+_SCAN_SIZE = 2 ** 20
+
+
+
+class Section(namedtuple('Section', ['offset', 'name', 'version', 'date'])):
+    """
+    The header of the news of one release of a project.
+
+    @ivar offset: The offset in bytes of the header in the NEWS file.
+    @ivar name: The name of the project, such as C{"Core"}.
+    @ivar version: The version released, as a C{str}.
+    @ivar date: The date of the release, as a YYYY-MM-DD C{str}.
+    """
+    __slots__ = ()
+
+
+
+def _scanSections(text, offset=0, end=None):
+    """
+    Find the release section headers in part of a NEWS file.
+
+    @param text: Some complete lines of the file.
+    @type text: C{str}
+    @param offset: The offset in bytes of C{text} in the file.
+    @param end: The position in C{text} before which the headers must
+        start, or C{None} for no limit.
+
+    @return: A C{list} of L{Section}s.
+    """
+    return [
+        Section(offset + match.start(), *match.group(
+            'name', 'version', 'date'))
+        for match in _HEADER.finditer(text)
+        if end is None or match.start() < end]
+
+
+
+class NewsIndex(object):
+    """
+    The offsets of the release sections of a NEWS file.
+
+    The index of a file is saved in the user's cache (see
+    L{newsbuilder._cache}) rather than in the working copy, where it would
+    show up as a file unknown to the version control system.  It is saved
+    along with the path, size and modification time of the file, so that the
+    index is not used if the file was changed without the index being
+    updated.
+
+    @cvar _FORMAT: The version of the on-disk format of the index.
+
+    @ivar sections: A C{list} of L{Section}s, in the order they appear in the
+        file.
+    """
+
+    _FORMAT = 1
+
+    def __init__(self, sections=()):
+        self.sections = list(sections)
+
+
+    @staticmethod
+    def _indexPath(news):
+        """
+        Get the file in which the index of a NEWS file is saved, named after
+        the absolute path of the NEWS file.
+
+        @param news: The NEWS file.
+        @type news: L{twisted.python.filepath.FilePath}
+
+        @return: A L{twisted.python.filepath.FilePath}.
+        """
+        return cachePath('news-index', news.path)
+
+
+    @classmethod
+    def scan(cls, news):
+        """
+        Index a NEWS file by reading it through.
+
+        @param news: The NEWS file.
+        @type news: L{twisted.python.filepath.FilePath}
+
+        @return: A L{NewsIndex}.
+        """
+        sections = []
+        offset = 0
+        pending = ''
+        with news.open() as newsFile:
+            while True:
+                chunk = newsFile.read(_SCAN_SIZE)
+                if not chunk:
+                    sections.extend(_scanSections(pending, offset))
+                    return cls(sections)
+                text = pending + chunk
+                complete = text.rfind('\n') + 1
+                # A header on the last complete line may be underlined on the
+                # next one, so that line is scanned again with the next chunk.
+                lastLine = text.rfind('\n', 0, complete - 1) + 1
+                sections.extend(
+                    _scanSections(text[:complete], offset, lastLine))
+                pending = text[lastLine:]
+                offset += lastLine
+
+
+    @classmethod
+    def load(cls, news):
+        """
+        Read the index saved for a NEWS file by L{NewsIndex.save}.
+
+        @param news: The NEWS file.
+        @type news: L{twisted.python.filepath.FilePath}
+
+        @return: A L{NewsIndex}, or C{None} if there is no index for C{news},
+            it cannot be read, or the size or modification time of C{news}
+            has changed since it was saved.
+        """
+        try:
+            data = json.loads(cls._indexPath(news).getContent())
+            status = os.stat(news.path)
+        except (IOError, OSError, ValueError):
+            return None
+        if (not isinstance(data, dict) or
+                data.get('format') != cls._FORMAT or
+                data.get('path') != os.path.abspath(news.path) or
+                data.get('size') != status.st_size or
+                data.get('mtime') != status.st_mtime):
+            return None
+        return cls(
+            Section(offset, *[value.encode('utf-8') for value in details])
+            for offset, details in data['sections'])
+
+
+    def save(self, news):
+        """
+        Save this index for a NEWS file, along with its current size and
+        modification time, unless the cache cannot be written to.
+
+        @param news: The NEWS file, which this index describes.
+        @type news: L{twisted.python.filepath.FilePath}
+        """
+        status = os.stat(news.path)
+        data = {
+            'format': self._FORMAT,
+            'path': os.path.abspath(news.path),
+            'size': status.st_size,
+            'mtime': status.st_mtime,
+            'sections': [
+                [section.offset,
+                 [section.name, section.version, section.date]]
+                for section in self.sections],
+        }
+        index = self._indexPath(news)
+        try:
+            index.parent().makedirs(ignoreExistingDirectory=True)
+            temporary = index.temporarySibling()
+            temporary.setContent(json.dumps(data))
+            temporary.moveTo(index)
+        except (IOError, OSError):
+            # The index only saves reading the file, which is done again
+            # when there is no index.
+            pass
+
+
+    def spliced(self, start, end, text):
+        """
+        Describe the file after replacing some of its bytes.
+
+        @param start: The offset of the first byte replaced.
+        @param end: The offset following the last byte replaced, which is
+            C{start} for an insertion.
+        @param text: The text replacing the bytes, which starts at the
+            beginning of a line.
+        @type text: C{str}
+
+        @return: A new L{NewsIndex}, in which the sections which started
+            within the replaced bytes are replaced by those in C{text}, and
+            those following them are moved by the change in length.
+        """
+        shift = len(text) - (end - start)
+        before = [section for section in self.sections
+                  if section.offset < start]
+        after = [section._replace(offset=section.offset + shift)
+                 for section in self.sections if section.offset >= end]
+        inserted = _scanSections(text, start)
+        return self.__class__(before + inserted + after)
+
+
+    def find(self, name, version=None):
+        """
+        Find the section of a release of a project.
+
+        @param name: The name of the project.
+        @param version: The version released, as a C{str}, or C{None} for
+            the latest release.
+
+        @return: The first L{Section} in the file for C{name} and C{version},
+            or C{None} if there is none.
+        """
+        for section in self.sections:
+            if section.name == name and version in (None, section.version):
+                return section
+        return None
+
+
+    def readSection(self, news, section):
+        """
+        Read the news of one release, up to the header of the next section.
+
+        @param news: The NEWS file described by this index.
+        @type news: L{twisted.python.filepath.FilePath}
+
+        @param section: One of the L{Section}s of this index.
+
+        @return: The header and news of the release, as a C{str}.
+        """
+        following = [other.offset for other in self.sections
+                     if other.offset > section.offset]
+        with news.open() as newsFile:
+            newsFile.seek(section.offset)
+            if following:
+                return newsFile.read(min(following) - section.offset)
+            return newsFile.read()
@@ -0,0 +1,329 @@
+# -*- test-case-name: newsbuilder.test.test_process -*-
+# Copyright (c) Twisted Matrix Laboratories.
+# See LICENSE for details.
+
+"""
+Running commands with a time limit, without holding an unbounded amount of
+their output in memory, and with a limit on how many run at once.
+"""
+
+from collections import deque
+import errno
+import os
+import select
+import signal
+from subprocess import PIPE, STDOUT, Popen
+from threading import BoundedSemaphore, Lock
+import time
+
+# The number of bytes of output read from a command at once.
+_READ_SIZE = 2 ** 16
+
+# How long to wait between checks that a command which closed its output has
+# exited, when it has a time limit.
+_POLL_INTERVAL = 0.01
+
+
+
+class CommandFailed(Exception):
+    """
+    Raised when a child process exits unsuccessfully.
+
+    @type exitStatus: C{int}
+    @ivar exitStatus: The exit status for the child process.
+
+    @type exitSignal: C{int}
+    @ivar exitSignal: The exit signal for the child process.
+
+    @type output: C{str}
+    @ivar output: The bytes read from stdout and stderr of the child process.
+    """
+    def __init__(self, exitStatus, exitSignal, output):
+        Exception.__init__(self, exitStatus, exitSignal, output)
+        self.exitStatus = exitStatus
+        self.exitSignal = exitSignal
+        self.output = output
+
+
+
+class CommandTimedOut(CommandFailed):
+    """
+    Raised when a child process is killed for running for too long.
+
+    @type timeout: C{float}
+    @ivar timeout: The number of seconds after which it was killed.
+    """
+    def __init__(self, timeout, output):
+        CommandFailed.__init__(self, None, signal.SIGKILL, output)
+        self.timeout = timeout
+
+
+
+class _Timeout(Exception):
+    """
+    Raised internally when the time limit of a command is reached.
+    """
+
+
+
+def _waitReadable(fd, deadline):
+    """
+    Wait until a file descriptor can be read from.
+
+    @param fd: The file descriptor.
+    @param deadline: The time, as given by L{time.time}, after which to stop
+        waiting, or C{None} to wait for ever.
+
+    @raise _Timeout: If the deadline is reached first.
+    """
+    if deadline is None:
+        return
+    while True:
+        remaining = deadline - time.time()
+        if remaining <= 0:
+            raise _Timeout()
+        try:
+            if select.select([fd], [], [], remaining)[0]:
+                return
+        except select.error as e:
+            if e.args[0] != errno.EINTR:
+                raise
+
+
+
+class _TailBuffer(object):
+    """
+    Keep the last bytes of some output.
+
+    @ivar size: The number of bytes kept.
+    """
+    def __init__(self, size):
+        self.size = size
+        self._chunks = deque()
+        self._length = 0
+
+
+    def append(self, chunk):
+        """
+        Add a chunk of output, dropping the oldest bytes beyond the limit.
+        """
+        self._chunks.append(chunk)
+        self._length += len(chunk)
+        while (len(self._chunks) > 1 and
+               self._length - len(self._chunks[0]) >= self.size):
+            self._length -= len(self._chunks.popleft())
+        if self._length > self.size:
+            self._chunks[0] = self._chunks[0][self._length - self.size:]
+            self._length = self.size
+
+
+    def getvalue(self):
+        """
+        Get the bytes kept.
+        """
+        return ''.join(self._chunks)
+
+
+
+def _argumentLimit():
+    """
+    Determine how many bytes of command line arguments can be passed to a new
+    process.
+
+    @return: The number of bytes available for arguments, allowing for the
+        current environment (which is passed to the new process as well) and
+        some headroom.
+    """
+    try:
+        limit = os.sysconf('SC_ARG_MAX')
+    except (AttributeError, ValueError, OSError):
+        limit = -1
+    if limit <= 0:
+        # The minimum required by POSIX.
+        limit = 4096
+    environment = sum(len(key) + len(value) + 2 + 8
+                      for key, value in os.environ.items())
+    return max(limit - environment - 4096, 1024)
+
+
+
+def _batchArguments(command, arguments, limit=None):
+    """
+    Split a long list of arguments over as few invocations of a command as
+    fit within the limit on the size of a command line.
+
+    @param command: The executable and any leading arguments, which start
+        each invocation.
+    @type command: C{list} of C{str}
+
+    @param arguments: The arguments to spread over the invocations.
+    @type arguments: C{list} of C{str}
+
+    @param limit: The number of bytes available for the arguments of each
+        invocation, or C{None} to use L{_argumentLimit}.
+
+    @return: A C{list} of argument vectors, one for each invocation.  It is
+        empty if C{arguments} is.
+    """
+    if limit is None:
+        limit = _argumentLimit()
+
+    def size(argument):
+        # Each argument is stored with its terminating NUL, and the argument
+        # vector holds a pointer to it.
+        return len(argument) + 1 + 8
+
+    base = sum(size(argument) for argument in command)
+    batches = []
+    batch = None
+    batchSize = 0
+    for argument in arguments:
+        if batch is None or batchSize + size(argument) > limit:
+            batch = list(command)
+            batchSize = base
+            batches.append(batch)
+        batch.append(argument)
+        batchSize += size(argument)
+    return batches
+
+
+
+class ProcessRunner(object):
+    """
+    Run commands, and count how many were run and for how long.
+
+    Commands may be run from several threads at once, up to
+    C{maxProcesses} of them, beyond which L{ProcessRunner.run} waits for one
+    to finish.
+
+    @ivar maxProcesses: The number of commands which may run at once, which
+        may only be changed while no command is running.
+
+    @ivar timeout: The number of seconds after which a command is killed,
+        unless another time limit is given to L{ProcessRunner.run}, or
+        C{None} for no limit.
+
+    @ivar maxOutput: The number of bytes of output kept from each command.
+
+    @ivar spawned: The number of commands run.
+
+    @ivar timedOut: The number of commands killed for running for too long.
+
+    @ivar seconds: The total number of seconds for which the commands ran.
+    """
+    def __init__(self, maxProcesses=8, timeout=None, maxOutput=2 ** 24):
+        self.maxProcesses = maxProcesses
+        self.timeout = timeout
+        self.maxOutput = maxOutput
+        self.spawned = 0
+        self.timedOut = 0
+        self.seconds = 0.0
+        self._lock = Lock()
+
+
+    @property
+    def maxProcesses(self):
+        return self._maxProcesses
+
+
+    @maxProcesses.setter
+    def maxProcesses(self, maxProcesses):
+        self._maxProcesses = maxProcesses
+        self._slots = BoundedSemaphore(maxProcesses)
+
+
+    def run(self, args, timeout=None, output=None):
+        """
+        Run a command and wait for it to exit.
+
+        @type args: C{list} of C{str}
+        @param args: A list of arguments, the first of which will be used as
+            the executable to run.
+
+        @param timeout: The number of seconds after which to kill the command,
+            or C{None} to use L{ProcessRunner.timeout}.
+
+        @param output: A callable to which to give each chunk of the standard
+            output and error of the command as it is read, instead of keeping
+            it, or C{None}.
+
+        @rtype: C{str}
+        @return: The standard output and error of the command, of which only
+            the last L{ProcessRunner.maxOutput} bytes are kept, or an empty
+            string if C{output} was given.
+
+        @raise CommandFailed: When the command exits with a non-0 exit code.
+        @raise CommandTimedOut: When the command is killed for running for
+            too long.
+        """
+        if timeout is None:
+            timeout = self.timeout
+        with self._slots:
+            started = time.time()
+            process = Popen(args, stdout=PIPE, stderr=STDOUT)
+            with self._lock:
+                self.spawned += 1
+            kept = _TailBuffer(self.maxOutput)
+            try:
+                self._read(process, started, timeout, output or kept.append)
+                exitCode = self._wait(process, started, timeout)
+            except _Timeout:
+                with self._lock:
+                    self.timedOut += 1
+                raise CommandTimedOut(timeout, kept.getvalue())
+            finally:
+                if process.poll() is None:
+                    process.kill()
+                    process.wait()
+                process.stdout.close()
+                with self._lock:
+                    self.seconds += time.time() - started
+        stdout = kept.getvalue()
+        if exitCode < 0:
+            raise CommandFailed(None, -exitCode, stdout)
+        elif exitCode > 0:
+            raise CommandFailed(exitCode, None, stdout)
+        return stdout
+
+
+    def _read(self, process, started, timeout, output):
+        """
+        Read the output of a command until it closes it.
+
+        @param process: The L{Popen} of the command.
+        @param started: The time at which the command was started.
+        @param timeout: Its time limit in seconds, or C{None}.
+        @param output: A callable to which to give each chunk of output.
+
+        @raise _Timeout: If the command does not close its output in time.
+        """
+        deadline = None if timeout is None else started + timeout
+        fd = process.stdout.fileno()
+        while True:
+            _waitReadable(fd, deadline)
+            chunk = os.read(fd, _READ_SIZE)
+            if not chunk:
+                return
+            output(chunk)
+
+
+    def _wait(self, process, started, timeout):
+        """
+        Wait for a command to exit.
+
+        @param process: The L{Popen} of the command.
+        @param started: The time at which the command was started.
+        @param timeout: Its time limit in seconds, or C{None}.
+
+        @return: The exit code of the command, as given by L{Popen.wait}.
+
+        @raise _Timeout: If the command does not exit in time.
+        """
+        if timeout is None:
+            return process.wait()
+        deadline = started + timeout
+        while process.poll() is None:
+            if time.time() >= deadline:
+                raise _Timeout()
+            time.sleep(_POLL_INTERVAL)
+        return process.returncode
@@ -0,0 +1,172 @@
+# -*- test-case-name: newsbuilder.test.test_progress -*-
+# Copyright (c) Twisted Matrix Laboratories.
+# See LICENSE for details.
+
+"""
+A record of the news rendered by a build, from which a build which failed
+part of the way through can be resumed without rendering again the news of
+the projects it had finished.
+"""
+
+from hashlib import sha1
+import json
+import os
+from threading import Lock
+
+
+
+def fragmentsKey(header, fragments):
+    """
+    Identify the news which would be rendered for a project.
+
+    @param header: The header of the news.
+    @type header: C{str}
+    @param fragments: The L{FilePath}s of the fragments from which the news
+        is rendered.
+
+    @return: A C{str} which changes whenever the header changes or any
+        fragment is added, removed or modified.
+    """
+    digest = sha1(header)
+    for fragment in sorted(fragments):
+        status = os.stat(fragment.path)
+        digest.update('\0%s\0%d\0%r' % (
+            fragment.basename(), status.st_size, status.st_mtime))
+    return digest.hexdigest()
+
+
+
+class Progress(object):
+    """
+    The news rendered so far by a build, keyed by the directory of each
+    project and by the L{fragmentsKey} of its fragments.
+
+    The news is kept in memory while the build runs, and only written to a
+    file, one JSON object per line, if the build fails, since the record is
+    of no use to a build which succeeded.
+
+    @cvar _FORMAT: The version of the format of the file.
+
+    @ivar path: The L{FilePath} of the file.
+    """
+
+    _FORMAT = 1
+
+    def __init__(self, path, rendered):
+        self.path = path
+        self._rendered = rendered
+        self._lock = Lock()
+
+
+    @classmethod
+    def open(cls, path, resume=False):
+        """
+        Start recording the progress of a build.
+
+        @param path: The L{FilePath} of the file in which to record it.
+        @param resume: If C{True}, keep the news recorded by a previous build
+            in C{path}, so that it can be found with L{Progress.find}.
+            Otherwise, start a new record.
+
+        @return: A L{Progress}.
+        """
+        rendered = None
+        if resume and path.exists():
+            with path.open() as progressFile:
+                rendered = cls._read(progressFile)
+        return cls(path, rendered or {})
+
+
+    @classmethod
+    def _read(cls, progressFile):
+        """
+        Read the news recorded in a file.
+
+        @param progressFile: The file, open for reading.
+
+        @return: A C{dict} mapping the paths of the project directories to
+            two-tuples of the key and the news of each project, or C{None} if
+            the file is not in a format this can read.  A line which is not
+            complete is ignored, along with any following it.
+        """
+        try:
+            header = json.loads(progressFile.readline())
+        except ValueError:
+            return None
+        if not isinstance(header, dict) or header.get('format') != cls._FORMAT:
+            return None
+        rendered = {}
+        for line in progressFile:
+            if not line.endswith('\n'):
+                break
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                break
+            rendered[entry['project']] = (
+                entry['key'].encode('ascii'),
+                entry['news'].encode('latin-1'))
+        return rendered
+
+
+    def find(self, directory, key):
+        """
+        Find the news recorded for a project.
+
+        @param directory: The L{FilePath} of the directory of the project.
+        @param key: The L{fragmentsKey} of the news which would be rendered
+            now.
+
+        @return: The news, as a C{str}, or C{None} if no news was recorded
+            with the same key.
+        """
+        recorded = self._rendered.get(directory.path)
+        if recorded is not None and recorded[0] == key:
+            return recorded[1]
+        return None
+
+
+    def record(self, directory, key, news):
+        """
+        Record the news rendered for a project.
+
+        This may be called from several threads at once.
+
+        @param directory: The L{FilePath} of the directory of the project.
+        @param key: The L{fragmentsKey} of the news.
+        @param news: The news, as a C{str}.
+        """
+        with self._lock:
+            self._rendered[directory.path] = (key, news)
+
+
+    def close(self):
+        """
+        Stop recording, and write the record so that the build can be
+        resumed, unless the file cannot be written to.
+        """
+        lines = [json.dumps({'format': self._FORMAT})]
+        for directory, (key, news) in sorted(self._rendered.items()):
+            # The news is not necessarily UTF-8, so its bytes are stored as
+            # the code points of the same values.
+            lines.append(json.dumps({
+                'project': directory,
+                'key': key,
+                'news': news.decode('latin-1')}))
+        try:
+            self.path.parent().makedirs(ignoreExistingDirectory=True)
+            temporary = self.path.temporarySibling()
+            temporary.setContent('\n'.join(lines) + '\n')
+            temporary.moveTo(self.path)
+        except (IOError, OSError):
+            # Not being able to resume the build is no reason to hide why it
+            # failed.
+            pass
+
+
+    def remove(self):
+        """
+        Stop recording and remove the record, once the build is done.
+        """
+        if self.path.exists():
+            self.path.remove()
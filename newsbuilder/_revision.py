@@ -0,0 +1,333 @@
+# -*- test-case-name: newsbuilder.test.test_revision -*-
+# Copyright (c) Twisted Matrix Laboratories.
+# See LICENSE for details.
+
+"""
+Reading the files of a revision of a Git repository without checking it
+out, so that news can be built on a machine which only has a bare mirror of
+the repository.
+"""
+
+import os
+import posixpath
+from subprocess import PIPE, Popen
+import time
+
+from ._process import (
+    _READ_SIZE, CommandFailed, CommandTimedOut, _Timeout, _waitReadable)
+from ._trace import NullTracer
+
+
+
+class _CatFile(object):
+    """
+    A C{git cat-file --batch} process, from which any number of objects are
+    read one after another.
+
+    @ivar timeout: The number of seconds after which to kill the process if
+        it has not finished sending an object, or C{None}.
+    """
+    def __init__(self, repository, timeout=None):
+        """
+        @param repository: The path of the repository, or of a working tree
+            of it.
+        @type repository: C{str}
+        """
+        self.timeout = timeout
+        self._process = Popen(
+            ['git', '-C', repository, 'cat-file', '--batch'],
+            stdin=PIPE, stdout=PIPE)
+        # The output read from the process but not returned yet.  It is read
+        # with os.read rather than through the buffer of the file, so that
+        # select can tell whether more is coming.
+        self._buffer = ''
+
+
+    def read(self, objectName):
+        """
+        Read the contents of an object.
+
+        @param objectName: The name of the object, such as its hash.
+        @type objectName: C{str}
+
+        @return: The contents of the object, as a C{str}.
+
+        @raise KeyError: If there is no such object.
+        @raise CommandFailed: If the process exited.
+        @raise CommandTimedOut: If the process is killed for taking more
+            than L{_CatFile.timeout} seconds to send the object.
+        """
+        deadline = None
+        if self.timeout is not None:
+            deadline = time.time() + self.timeout
+        self._process.stdin.write(objectName + '\n')
+        self._process.stdin.flush()
+        try:
+            header = self._readLine(deadline)
+            if not header.endswith('\n'):
+                raise CommandFailed(self._process.wait(), None, header)
+            fields = header.split()
+            if fields[-1] == 'missing':
+                raise KeyError(objectName)
+            size = int(fields[2])
+            contents = self._readExactly(size, deadline)
+            # Each object is followed by a newline.
+            self._readExactly(1, deadline)
+        except _Timeout:
+            self._process.kill()
+            self._process.wait()
+            raise CommandTimedOut(self.timeout, '')
+        if len(contents) != size:
+            raise CommandFailed(self._process.wait(), None, contents)
+        return contents
+
+
+    def _readChunk(self, deadline):
+        """
+        Read the next chunk of output of the process.
+
+        @param deadline: The time, as given by L{time.time}, after which to
+            stop waiting, or C{None} to wait for ever.
+
+        @return: The chunk, or an empty C{str} if the process closed its
+            output.
+
+        @raise _Timeout: If the deadline is reached first.
+        """
+        fd = self._process.stdout.fileno()
+        _waitReadable(fd, deadline)
+        return os.read(fd, _READ_SIZE)
+
+
+    def _readLine(self, deadline):
+        """
+        Read a line of output.
+
+        @return: The line, ending with a newline unless the process closed
+            its output first.
+        """
+        while '\n' not in self._buffer:
+            chunk = self._readChunk(deadline)
+            if not chunk:
+                break
+            self._buffer += chunk
+        line, newline, self._buffer = self._buffer.partition('\n')
+        return line + newline
+
+
+    def _readExactly(self, size, deadline):
+        """
+        Read a number of bytes of output.
+
+        @return: The bytes, fewer than C{size} only if the process closed
+            its output first.
+        """
+        chunks = [self._buffer[:size]]
+        self._buffer = self._buffer[size:]
+        missing = size - len(chunks[0])
+        while missing:
+            chunk = self._readChunk(deadline)
+            if not chunk:
+                break
+            chunks.append(chunk[:missing])
+            self._buffer = chunk[missing:]
+            missing -= len(chunks[-1])
+        return ''.join(chunks)
+
+
+    def close(self):
+        """
+        Stop the process.
+        """
+        # Closing its input makes it exit, unless it was killed already.
+        self._process.stdin.close()
+        self._process.wait()
+        self._process.stdout.close()
+
+
+
+class GitRevision(object):
+    """
+    The files of a revision of a Git repository, which are listed once with
+    C{git ls-tree} and read through a single C{git cat-file --batch}
+    process.
+
+    Call L{GitRevision.close} once done with it.
+
+    @ivar repository: The path of the repository, or of a working tree of
+        it, as C{str}.
+
+    @ivar revision: The revision, as given to C{git}.
+
+    @ivar paths: A C{dict} mapping the path of each file of the revision,
+        relative to the root of its tree and with C{/} as separator, to the
+        name of its object.
+
+    @ivar tracer: The L{Tracer} counting the processes started, or a
+        L{NullTracer}.
+
+    @ivar timeout: The number of seconds after which to kill the C{git
+        cat-file} process if it has not finished sending a file, or C{None}.
+    """
+
+    def __init__(self, repository, revision, paths, tracer=None,
+                 timeout=None):
+        self.repository = repository
+        self.revision = revision
+        self.paths = paths
+        if tracer is None:
+            tracer = NullTracer()
+        self.tracer = tracer
+        self.timeout = timeout
+        self._catFile = None
+
+
+    @classmethod
+    def open(cls, repository, revision, run, tracer=None, timeout=None):
+        """
+        List the files of a revision.
+
+        @param repository: The path of the repository, or of a working tree
+            of it.
+        @type repository: C{str}
+
+        @param revision: The revision, such as a branch name or a commit
+            hash.
+        @type revision: C{str}
+
+        @param run: A callable which runs a command, like the C{run}
+            attribute of the backends in L{newsbuilder._vcs}.
+
+        @param tracer: The L{Tracer} with which to record the commands, or
+            C{None}.
+
+        @param timeout: The time limit of the C{git cat-file} process (see
+            L{GitRevision.timeout}).  That of C{git ls-tree} is up to C{run}.
+
+        @return: A L{GitRevision}.
+
+        @raise CommandFailed: If the revision cannot be listed.
+        """
+        if tracer is None:
+            tracer = NullTracer()
+        chunks = []
+        with tracer.span('ls-tree', 'vcs'):
+            tracer.count('subprocesses')
+            run(['git', '-C', repository, 'ls-tree', '-r', '-z',
+                 '--full-tree', revision], output=chunks.append)
+        paths = {}
+        for entry in ''.join(chunks).split('\0'):
+            if not entry:
+                continue
+            description, path = entry.split('\t', 1)
+            mode, kind, objectName = description.split(' ')
+            # Submodules are listed as commits, and are not read.
+            if kind == 'blob':
+                paths[path] = objectName
+        return cls(repository, revision, paths, tracer, timeout)
+
+
+    def exists(self, path):
+        """
+        Decide whether a file is part of the revision.
+
+        @param path: The path of the file, relative to the root of the tree.
+        @type path: C{str}
+        """
+        return path in self.paths
+
+
+    def read(self, path):
+        """
+        Read a file of the revision.
+
+        The C{git cat-file} process is started the first time a file is
+        read.
+
+        @param path: The path of the file, relative to the root of the tree.
+        @type path: C{str}
+
+        @return: The contents of the file, as a C{str}.
+
+        @raise KeyError: If there is no such file in the revision.
+        """
+        objectName = self.paths[path]
+        if self._catFile is None:
+            self.tracer.count('subprocesses')
+            self._catFile = _CatFile(self.repository, self.timeout)
+        return self._catFile.read(objectName)
+
+
+    def close(self):
+        """
+        Stop the C{git cat-file} process, if it was started.
+        """
+        if self._catFile is not None:
+            self._catFile.close()
+            self._catFile = None
+
+
+
+class RevisionPath(object):
+    """
+    A file or directory of a L{GitRevision}, with the few methods of
+    L{twisted.python.filepath.FilePath} which are used to read news
+    fragments, so that it can be given to L{NewsBuilder._renderNews}.
+
+    @ivar revision: The L{GitRevision}.
+
+    @ivar path: The path of the file, relative to the root of the tree, or
+        C{""} for the root itself.
+    """
+
+    def __init__(self, revision, path):
+        self.revision = revision
+        self.path = path
+
+
+    def __repr__(self):
+        return '%s(%r)' % (self.__class__.__name__, self.path)
+
+
+    def __eq__(self, other):
+        if not isinstance(other, RevisionPath):
+            return NotImplemented
+        return (self.revision, self.path) == (other.revision, other.path)
+
+
+    def __ne__(self, other):
+        if not isinstance(other, RevisionPath):
+            return NotImplemented
+        return not self == other
+
+
+    def __hash__(self):
+        return hash(self.path)
+
+
+    def child(self, name):
+        """
+        Get a child of this directory.
+        """
+        return RevisionPath(self.revision, posixpath.join(self.path, name))
+
+
+    def basename(self):
+        """
+        Get the name of this file.
+        """
+        return posixpath.basename(self.path)
+
+
+    def exists(self):
+        """
+        Decide whether this is a file of the revision.
+        """
+        return self.revision.exists(self.path)
+
+
+    def getContent(self):
+        """
+        Read this file from the revision.
+        """
+        return self.revision.read(self.path)
@@ -0,0 +1,163 @@
+# -*- test-case-name: newsbuilder.test.test_trace -*-
+# Copyright (c) Twisted Matrix Laboratories.
+# See LICENSE for details.
+
+"""
+Timing and counting of the phases of a newsbuilder run.
+
+A L{Tracer} records how long each phase took, in wall clock and CPU time,
+along with counters such as the number of files read, and writes them out in
+the Chrome trace event format, which can be loaded into a trace viewer such
+as I{chrome://tracing} or Perfetto.
+"""
+
+from contextlib import contextmanager
+import json
+import os
+import threading
+import time
+
+
+
+def _cpuTime():
+    """
+    Return the user and system CPU time used by this process so far, in
+    seconds.
+    """
+    times = os.times()
+    return times[0] + times[1]
+
+
+
+class NullTracer(object):
+    """
+    A tracer which records nothing, used when no trace was asked for.
+    """
+
+    @contextmanager
+    def span(self, name, category='phase', **args):
+        """
+        Do not time anything.
+        """
+        yield
+
+
+    def count(self, counter, amount=1):
+        """
+        Do not count anything.
+        """
+
+
+
+class Tracer(object):
+    """
+    A recorder of the phases of a newsbuilder run.
+
+    @ivar events: A C{list} of trace events, as C{dict}s in the Chrome trace
+        event format.
+
+    @ivar counters: A C{dict} mapping counter names to their totals.
+    """
+
+    def __init__(self, clock=time.time, cpuClock=_cpuTime):
+        """
+        @param clock: A function returning the current wall clock time in
+            seconds.
+        @param cpuClock: A function returning the CPU time used so far in
+            seconds.
+        """
+        self._clock = clock
+        self._cpuClock = cpuClock
+        self._start = clock()
+        self._lock = threading.Lock()
+        self.events = []
+        self.counters = {}
+
+
+    def _timestamp(self, when):
+        """
+        Convert a wall clock time into microseconds since the tracer was
+        created.
+        """
+        return int(round((when - self._start) * 1000000))
+
+
+    @contextmanager
+    def span(self, name, category='phase', **args):
+        """
+        Time the code run inside a C{with} statement.
+
+        @param name: The name of the phase.
+        @param category: The category of the phase, such as C{"phase"} or
+            C{"vcs"}.
+        @param args: Further details about the phase to record with it, such
+            as the name of the project it concerns.
+        """
+        start = self._clock()
+        cpuStart = self._cpuClock()
+        try:
+            yield
+        finally:
+            end = self._clock()
+            args['cpu_ms'] = round((self._cpuClock() - cpuStart) * 1000, 3)
+            event = {
+                'name': name,
+                'cat': category,
+                'ph': 'X',
+                'ts': self._timestamp(start),
+                'dur': self._timestamp(end) - self._timestamp(start),
+                'pid': os.getpid(),
+                'tid': threading.current_thread().ident,
+                'args': args,
+            }
+            with self._lock:
+                self.events.append(event)
+
+
+    def count(self, counter, amount=1):
+        """
+        Add to a counter.
+
+        @param counter: The name of the counter, such as C{"filesRead"}.
+        @param amount: The amount to add.
+        """
+        with self._lock:
+            self.counters[counter] = self.counters.get(counter, 0) + amount
+
+
+    def toChromeTrace(self):
+        """
+        Describe everything recorded so far in the Chrome trace event format.
+
+        @return: A C{dict} in the JSON object format of Chrome traces, with
+            the events sorted by start time and the final values of the
+            counters as a counter event and under C{otherData}.
+        """
+        with self._lock:
+            events = list(self.events)
+            counters = dict(self.counters)
+        # Enclosing phases start no later than the phases inside them, and
+        # last at least as long.
+        events.sort(key=lambda event: (event['ts'], -event['dur']))
+        events.append({
+            'name': 'counters',
+            'ph': 'C',
+            'ts': self._timestamp(self._clock()),
+            'pid': os.getpid(),
+            'args': counters,
+        })
+        return {
+            'traceEvents': events,
+            'displayTimeUnit': 'ms',
+            'otherData': {'counters': counters},
+        }
+
+
+    def write(self, path):
+        """
+        Write the trace to a file.
+
+        @param path: The file to write.
+        @type path: L{twisted.python.filepath.FilePath}
+        """
+        path.setContent(json.dumps(self.toChromeTrace(), sort_keys=True))
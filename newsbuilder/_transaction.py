@@ -0,0 +1,267 @@
+# -*- test-case-name: newsbuilder.test.test_transaction -*-
+# Copyright (c) Twisted Matrix Laboratories.
+# See LICENSE for details.
+
+"""
+Replacement of several files at once, through a journal from which an
+interrupted replacement can be finished, or undone, by a later run.
+"""
+
+import errno
+import json
+import os
+import shutil
+from threading import Lock
+
+from twisted.python.filepath import FilePath
+
+
+
+def _fsync(path):
+    """
+    Flush a file or directory to disk.
+
+    @param path: The path of the file or directory.
+    @type path: C{str}
+    """
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+
+def _backUp(path, backup):
+    """
+    Keep the current contents of a file under another name, by linking the
+    name to them if possible, or by copying them otherwise.
+
+    @param path: The file to back up.
+    @type path: L{FilePath}
+    @param backup: The name of the backup, which is replaced if it exists.
+    @type backup: L{FilePath}
+    """
+    if os.path.lexists(backup.path):
+        os.remove(backup.path)
+    try:
+        os.link(path.path, backup.path)
+    except OSError as e:
+        if e.errno not in (errno.EPERM, errno.EXDEV, errno.ENOSYS,
+                           errno.EMLINK):
+            raise
+        shutil.copy2(path.path, backup.path)
+
+
+
+class Transaction(object):
+    """
+    A set of files whose new contents are staged next to them, and which are
+    all replaced together.
+
+    Committing a transaction flushes the staged files to disk, links the
+    current contents of each file to a backup next to it and writes a
+    journal listing the files before renaming the staged files over them.  If
+    the process dies while the files are being renamed, L{Transaction.load}
+    reads the journal back, from which the renames can be finished with
+    L{Transaction.rollForward} or undone with L{Transaction.rollBack}.
+
+    @ivar journal: The L{FilePath} of the journal.
+
+    @ivar removals: The L{FilePath}s of files which were to be removed once
+        the files were replaced, as given to L{Transaction.commit}.
+    """
+
+    _FORMAT = 1
+
+    def __init__(self, journal):
+        self.journal = journal
+        self.removals = []
+        # A list of (staged, target, backup) tuples, where backup is None
+        # until the transaction is committed, and for files which did not
+        # exist.
+        self._files = []
+        self._callbacks = []
+        self._lock = Lock()
+
+
+    @staticmethod
+    def stagingPath(target):
+        """
+        Get the path at which to stage the new contents of a file.
+
+        @param target: The file to replace.
+        @type target: L{FilePath}
+
+        @return: A L{FilePath} next to C{target}.
+        """
+        return target.sibling(target.basename() + '.new')
+
+
+    def add(self, staged, target, committed=None):
+        """
+        Replace a file as part of this transaction.
+
+        This may be called from several threads at once.
+
+        @param staged: The file holding the new contents of C{target}.
+        @type staged: L{FilePath}
+        @param target: The file to replace.
+        @type target: L{FilePath}
+        @param committed: A callable run without arguments once C{target} is
+            replaced by L{Transaction.commit}, or C{None}.  It is not run if
+            the replacement is finished by L{Transaction.rollForward} in
+            another run.
+        """
+        with self._lock:
+            self._files.append((staged, target, None))
+            if committed is not None:
+                self._callbacks.append(committed)
+
+
+    def abort(self):
+        """
+        Remove the staged files of a transaction which is not committed.
+        """
+        for staged, target, backup in self._files:
+            if os.path.exists(staged.path):
+                staged.remove()
+
+
+    @classmethod
+    def load(cls, journal):
+        """
+        Read the journal of a transaction which was being committed.
+
+        @param journal: The L{FilePath} of the journal.
+
+        @return: A L{Transaction}, or C{None} if there is no journal.
+        """
+        try:
+            content = journal.getContent()
+        except IOError as e:
+            if e.errno != errno.ENOENT:
+                raise
+            return None
+        data = json.loads(content)
+        if data.get('format') != cls._FORMAT:
+            raise ValueError(
+                "Unknown format of journal %s: %r"
+                % (journal.path, data.get('format')))
+        transaction = cls(journal)
+        for staged, target, backup in data['files']:
+            transaction._files.append((
+                FilePath(staged), FilePath(target),
+                None if backup is None else FilePath(backup)))
+        transaction.removals = [FilePath(path) for path in data['removals']]
+        return transaction
+
+
+    def commit(self, removals=()):
+        """
+        Replace all the files of this transaction.
+
+        If a file cannot be replaced, those already replaced are restored
+        before the exception is raised.  Otherwise, the journal and the
+        backups are kept until L{Transaction.finish} is called.
+
+        @param removals: The L{FilePath}s of files to remove once the files
+            are replaced, which are recorded in the journal so that they can
+            be removed by a later run if this one is interrupted.
+        """
+        self.removals = list(removals)
+        for staged, target, backup in self._files:
+            _fsync(staged.path)
+        files = []
+        for staged, target, backup in self._files:
+            if os.path.exists(target.path):
+                backup = target.sibling(target.basename() + '.old')
+                _backUp(target, backup)
+            files.append((staged, target, backup))
+        self._files = files
+        self._writeJournal()
+        try:
+            self.rollForward()
+        except:
+            self.rollBack()
+            raise
+        for callback in self._callbacks:
+            callback()
+
+
+    def _writeJournal(self):
+        """
+        Write the journal of this transaction, replacing any previous one at
+        once, and flush it to disk.
+        """
+        data = {
+            'format': self._FORMAT,
+            'files': [
+                [staged.path, target.path,
+                 None if backup is None else backup.path]
+                for staged, target, backup in self._files],
+            'removals': [path.path for path in self.removals],
+        }
+        self.journal.parent().makedirs(ignoreExistingDirectory=True)
+        temporary = self.journal.temporarySibling()
+        temporary.setContent(json.dumps(data))
+        _fsync(temporary.path)
+        temporary.moveTo(self.journal)
+        self._syncDirectories([self.journal])
+
+
+    def _syncDirectories(self, paths):
+        """
+        Flush the directories containing some files to disk, so that renames
+        in them are not lost.
+
+        @param paths: The L{FilePath}s of the files.
+        """
+        for directory in sorted(set(path.dirname() for path in paths)):
+            _fsync(directory)
+
+
+    def rollForward(self):
+        """
+        Rename the staged files which are still there over the files they
+        replace.
+        """
+        for staged, target, backup in self._files:
+            if os.path.exists(staged.path):
+                staged.moveTo(target)
+        self._syncDirectories([target for staged, target, backup
+                               in self._files])
+
+
+    def rollBack(self):
+        """
+        Restore the files of this transaction from their backups, remove the
+        staged files and the journal.
+        """
+        for staged, target, backup in self._files:
+            if os.path.exists(staged.path):
+                staged.remove()
+            if backup is None:
+                if os.path.exists(target.path):
+                    target.remove()
+            elif os.path.exists(backup.path):
+                backup.moveTo(target)
+                # Renaming a link over another link to the same file leaves
+                # both in place.
+                if os.path.exists(backup.path):
+                    backup.remove()
+        self._syncDirectories([target for staged, target, backup
+                               in self._files])
+        if os.path.exists(self.journal.path):
+            self.journal.remove()
+
+
+    def finish(self):
+        """
+        Remove the backups and the journal of a committed transaction.
+        """
+        for staged, target, backup in self._files:
+            if backup is not None and os.path.exists(backup.path):
+                backup.remove()
+        if os.path.exists(self.journal.path):
+            self.journal.remove()
@@ -0,0 +1,393 @@
+# -*- test-case-name: newsbuilder.test.test_vcs -*-
+# Copyright (c) Twisted Matrix Laboratories.
+# See LICENSE for details.
+
+"""
+Recognizing the version control working copy containing a directory, and
+the backends through which the version control commands of a build are run.
+"""
+
+import errno
+import os
+from xml.etree import ElementTree
+
+from zope.interface import Attribute, Interface, implementer
+
+from ._process import _batchArguments
+from ._trace import NullTracer
+
+# The version control systems recognized by detectWorkingCopy.
+SVN = 'svn'
+GIT = 'git'
+HG = 'hg'
+
+# The backend which does not use any version control system.
+FILESYSTEM = 'filesystem'
+
+# Returned by detectWorkingCopy when only svn itself can tell whether a
+# directory is in a working copy.
+UNKNOWN = 'unknown'
+
+
+
+def detectWorkingCopy(directory):
+    """
+    Find out which version control system manages a directory, without
+    running it, by looking for the administrative directory of a working
+    copy in the directory and its parents.
+
+    Subversion keeps a single I{.svn} directory holding a I{wc.db} database
+    at the root of working copies since its version 1.7.  Older working
+    copies have a I{.svn} directory without that database in each of their
+    directories, as do working copies whose checkout was interrupted, and
+    only svn can tell whether those are usable.
+
+    @param directory: The path of the directory.
+    @type directory: C{str}
+
+    @return: L{SVN}, L{GIT} or L{HG} for the nearest working copy containing
+        C{directory}, L{UNKNOWN} if the nearest one is a Subversion working
+        copy in another format, or C{None} if C{directory} is in no working
+        copy.
+    """
+    directory = os.path.abspath(directory)
+    while True:
+        svn = os.path.join(directory, '.svn')
+        if os.path.isfile(os.path.join(svn, 'wc.db')):
+            return SVN
+        if os.path.isdir(svn):
+            return UNKNOWN
+        # In linked worktrees and submodules, .git is a file.
+        if os.path.exists(os.path.join(directory, '.git')):
+            return GIT
+        if os.path.isdir(os.path.join(directory, '.hg')):
+            return HG
+        parent = os.path.dirname(directory)
+        if parent == directory:
+            return None
+        directory = parent
+
+
+
+def chooseBackend(directory):
+    """
+    Choose the backend for the working copy containing a directory.
+
+    @param directory: The path of the directory.
+    @type directory: C{str}
+
+    @return: The name of the backend in L{BACKENDS}, or C{None} if
+        C{directory} is in no working copy which has a backend.
+    """
+    workingCopy = detectWorkingCopy(directory)
+    if workingCopy in (SVN, UNKNOWN):
+        return SVN
+    if workingCopy == GIT:
+        return GIT
+    return None
+
+
+
+class IVersionControlBackend(Interface):
+    """
+    The version control commands of a build.
+
+    Each method acting on a list of paths runs as few commands as the limit
+    on the size of a command line allows, one after another, as they all
+    change the same working copy.
+    """
+    name = Attribute("The name of the backend in L{BACKENDS}.")
+
+    description = Attribute(
+        "The name of the version control system, as shown to users.")
+
+    def verify(directory):
+        """
+        Check that a directory is in a working copy of this version control
+        system.
+
+        @param directory: The path of the directory.
+        @type directory: C{str}
+
+        @raise CommandFailed: If it is not.
+        """
+
+
+    def remove(paths):
+        """
+        Remove files from the working copy and from the disk.
+
+        @param paths: The paths of the files, as C{str}s.
+        """
+
+
+    def unversioned(paths):
+        """
+        Find which of some files are not under version control.
+
+        @param paths: The paths of the files, as C{str}s.
+
+        @return: A C{set} of the paths, among C{paths}, of the files which
+            are not under version control, including ignored files.
+        """
+
+
+    def trackedFiles(directory):
+        """
+        List the files under version control beneath a directory, with a
+        single command.
+
+        @param directory: The path of the directory.
+        @type directory: C{str}
+
+        @return: A C{list} of the paths of the files, and possibly of the
+            directories, under version control, or C{None} if this backend
+            does not know which files are.
+        """
+
+
+
+class _Backend(object):
+    """
+    The running of commands shared by the implementations of
+    L{IVersionControlBackend}.
+
+    @ivar run: A callable which runs a command, given its argument vector,
+        and returns its output, or raises L{CommandFailed}.  If it is given
+        a callable as its C{output} keyword argument, the output is given to
+        that callable as it is read instead, so that it is not truncated.
+    @ivar tracer: The L{Tracer} recording the commands, or a L{NullTracer}.
+    """
+    def __init__(self, run, tracer=None):
+        self.run = run
+        if tracer is None:
+            tracer = NullTracer()
+        self.tracer = tracer
+
+
+    def _runOnce(self, span, args, output=None):
+        """
+        Run a command which does not act on a list of paths.
+
+        @param span: The name of the span recording the command.
+        @param args: Its argument vector.
+        @param output: A callable to which to give the output as it is read,
+            or C{None} to return it.
+
+        @return: The output of the command, if C{output} is C{None}.
+        """
+        with self.tracer.span(span, 'vcs'):
+            self.tracer.count('subprocesses')
+            if output is None:
+                return self.run(args)
+            return self.run(args, output=output)
+
+
+    def _readAll(self, span, args):
+        """
+        Run a command and read all of its output, however long it is.
+
+        @param span: The name of the span recording the command.
+        @param args: Its argument vector.
+
+        @return: The output of the command.
+        """
+        chunks = []
+        self._runOnce(span, args, chunks.append)
+        return ''.join(chunks)
+
+
+    def _runBatched(self, span, command, paths):
+        """
+        Run a command on a list of paths.
+
+        @param span: The name of the span recording each command.
+        @param command: The argument vector of the command, to which the
+            paths are appended.
+        @param paths: The paths, as C{str}s.
+
+        @return: A C{list} of the output of each command.
+        """
+        outputs = []
+        for args in _batchArguments(command, paths):
+            with self.tracer.span(span, 'vcs',
+                                  files=len(args) - len(command)):
+                self.tracer.count('subprocesses')
+                outputs.append(self.run(args))
+        return outputs
+
+
+
+@implementer(IVersionControlBackend)
+class SubversionBackend(_Backend):
+    """
+    Run the version control commands of a build with svn.
+    """
+    name = SVN
+    description = 'SVN'
+
+    def verify(self, directory):
+        """
+        Check that a directory is in a Subversion working copy, running
+        C{svn info} only when L{detectWorkingCopy} cannot tell.
+        """
+        if detectWorkingCopy(directory) != SVN:
+            self._runOnce('svn info', ['svn', 'info', directory])
+
+
+    def remove(self, paths):
+        """
+        Remove files with C{svn rm}, even if they were modified since they
+        were committed.
+        """
+        self._runBatched('svn rm', ['svn', 'rm', '--force'], paths)
+
+
+    def unversioned(self, paths):
+        """
+        Find the files which are not under version control with
+        C{svn status}.
+        """
+        found = set()
+        for output in self._runBatched(
+                'svn status', ['svn', 'status', '--xml'], paths):
+            for entry in ElementTree.fromstring(output).iter('entry'):
+                status = entry.find('wc-status')
+                if (status is not None and
+                        status.get('item') in ('unversioned', 'ignored')):
+                    found.add(entry.get('path'))
+        return found
+
+
+    def trackedFiles(self, directory):
+        """
+        List the files and directories under version control with
+        C{svn status}, which reads the working copy only.
+        """
+        output = self._readAll(
+            'svn status', ['svn', 'status', '--verbose', '--xml', directory])
+        tracked = []
+        for entry in ElementTree.fromstring(output).iter('entry'):
+            status = entry.find('wc-status')
+            if status is not None and status.get('item') not in (
+                    'unversioned', 'ignored', 'deleted', 'missing'):
+                tracked.append(os.path.join(directory, entry.get('path')))
+        return tracked
+
+
+
+@implementer(IVersionControlBackend)
+class GitBackend(_Backend):
+    """
+    Run the version control commands of a build with git.
+
+    Every command is run in the directory of the first path it is given, so
+    that the paths are within the working tree whatever the current
+    directory is.
+    """
+    name = GIT
+    description = 'Git'
+
+    def verify(self, directory):
+        """
+        Check that a directory is in a Git working tree, running
+        C{git rev-parse} only when L{detectWorkingCopy} cannot tell.
+        """
+        if detectWorkingCopy(directory) != GIT:
+            self._runOnce('git rev-parse', [
+                'git', '-C', directory, 'rev-parse', '--git-dir'])
+
+
+    def remove(self, paths):
+        """
+        Remove files with C{git rm}, even if they were modified or staged
+        since they were committed.
+        """
+        if paths:
+            self._runBatched('git rm', [
+                'git', '-C', os.path.dirname(paths[0]), 'rm', '-q', '-f',
+                '--'], paths)
+
+
+    def unversioned(self, paths):
+        """
+        Find the files which are not under version control with
+        C{git ls-files}.
+        """
+        if not paths:
+            return set()
+        directory = os.path.dirname(paths[0])
+        found = set()
+        for output in self._runBatched('git ls-files', [
+                'git', '-C', directory, 'ls-files', '-z', '--others', '--'],
+                paths):
+            # The files are listed relative to the directory the command was
+            # run in.
+            for path in output.split('\0'):
+                if path:
+                    found.add(os.path.normpath(os.path.join(directory, path)))
+        return found
+
+
+    def trackedFiles(self, directory):
+        """
+        List the files under version control with C{git ls-files}, which
+        reads the index only.
+        """
+        output = self._readAll(
+            'git ls-files', ['git', '-C', directory, 'ls-files', '-z'])
+        # The files are listed relative to the directory.
+        return [os.path.join(directory, path)
+                for path in output.split('\0') if path]
+
+
+
+@implementer(IVersionControlBackend)
+class FilesystemBackend(_Backend):
+    """
+    Build without any version control system, removing files from the disk
+    directly and running no commands.
+    """
+    name = FILESYSTEM
+    description = 'filesystem'
+
+    def verify(self, directory):
+        """
+        Accept any directory.
+        """
+
+
+    def remove(self, paths):
+        """
+        Remove files from the disk, ignoring those which are already gone.
+        """
+        with self.tracer.span('remove', 'vcs', files=len(paths)):
+            for path in paths:
+                try:
+                    os.remove(path)
+                except OSError as e:
+                    if e.errno != errno.ENOENT:
+                        raise
+
+
+    def unversioned(self, paths):
+        """
+        Report every file as not under version control.
+        """
+        return set(paths)
+
+
+    def trackedFiles(self, directory):
+        """
+        Know nothing about which files are under version control.
+        """
+        return None
+
+
+
+# The backends, by name.
+BACKENDS = {
+    SVN: SubversionBackend,
+    GIT: GitBackend,
+    FILESYSTEM: FilesystemBackend,
+}
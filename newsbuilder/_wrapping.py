@@ -0,0 +1,114 @@
+# -*- test-case-name: newsbuilder.test.test_wrapping -*-
+# Copyright (c) Twisted Matrix Laboratories.
+# See LICENSE for details.
+
+"""
+Wrapping of news entries.
+
+The entries of a NEWS file are wrapped at 70 columns with a hanging indent of
+three spaces, exactly as C{textwrap.fill(entry, subsequent_indent='   ')}
+wraps them.  Most entries are plain ASCII, with no hyphens but the one
+introducing them, which L{textwrap} would only split at runs of spaces;
+those are wrapped here without the general machinery of
+L{textwrap.TextWrapper}.
+"""
+
+import re
+import textwrap
+
+# The width of the wrapped lines.
+WIDTH = 70
+
+# The indentation of every wrapped line but the first.
+INDENT = '   '
+
+# The wrapper used for the entries which are not handled by the fast path.
+_wrapper = textwrap.TextWrapper(width=WIDTH, subsequent_indent=INDENT)
+
+# Text which TextWrapper treats specially: whitespace other than spaces
+# (which it replaces by spaces), hyphens following anything but a space
+# (after which it may break a line) and anything beyond printable ASCII.
+_SPECIAL = re.compile(r'[^\x20-\x7e]|[^ ]-')
+
+_SPACES = re.compile(r' +')
+_NOT_SPACE = re.compile(r'[^ ]')
+_LAST_NOT_SPACE = re.compile(r'[^ ](?= *$)')
+
+
+
+def fill(text):
+    """
+    Wrap a news entry.
+
+    @param text: The entry to wrap.
+    @type text: C{str}
+
+    @return: The same C{str} as C{textwrap.fill(text, width=WIDTH,
+        subsequent_indent=INDENT)}.
+    """
+    if not isinstance(text, str) or _SPECIAL.search(text):
+        return _wrapper.fill(text)
+
+    # Without special characters, TextWrapper splits the text into chunks
+    # which are either runs of spaces or the words between them, and fills
+    # each line with as many chunks as fit.  The same lines are found here
+    # by looking for the last chunk boundary within each line.
+    length = len(text)
+    lines = []
+    start = 0
+    while start < length:
+        if lines:
+            indent = INDENT
+            # Spaces at the start of any line but the first are dropped.
+            if text[start] == ' ':
+                start = _SPACES.match(text, start).end()
+                if start == length:
+                    break
+        else:
+            indent = ''
+        width = WIDTH - len(indent)
+        end = start + width
+
+        if end >= length:
+            # The rest of the text fits, apart from any trailing spaces.
+            line = text[start:].rstrip(' ')
+            start = length
+        else:
+            if (text[end - 1] == ' ') != (text[end] == ' '):
+                boundary = end
+            elif text[end] == ' ':
+                match = _LAST_NOT_SPACE.search(text, start, end)
+                boundary = match.end() if match else start
+            else:
+                boundary = text.rfind(' ', start, end) + 1 or start
+
+            # The chunk following the boundary is too long for any line if
+            # it does not end within the next line.
+            following = boundary + width + 1
+            if following > length:
+                tooLong = False
+            elif text[boundary] == ' ':
+                tooLong = _NOT_SPACE.search(text, boundary, following) is None
+            else:
+                tooLong = text.find(' ', boundary, following) == -1
+
+            if not tooLong:
+                # Spaces at the end of a line are dropped.
+                line = text[start:boundary].rstrip(' ')
+                start = boundary
+            elif boundary == end:
+                # TextWrapper adds an empty piece of the chunk which is too
+                # long, and drops it instead of the spaces before it.
+                line = text[start:boundary]
+                start = boundary
+            else:
+                # A chunk too long for any line is broken to fill this one,
+                # unless it is made of spaces, which are dropped.
+                if text[boundary] == ' ':
+                    line = text[start:boundary]
+                else:
+                    line = text[start:end]
+                start = end
+        if line:
+            lines.append(indent + line)
+    return '\n'.join(lines)
@@ -0,0 +1,84 @@
+# Copyright (c) Twisted Matrix Laboratories.
+# See LICENSE for details.
+
+"""
+Tests for L{newsbuilder._cache}.
+"""
+
+import os
+
+from twisted.trial.unittest import TestCase
+from twisted.python.filepath import FilePath
+
+from newsbuilder import _cache
+from newsbuilder._cache import cachePath
+
+
+
+def useTemporaryCache(testCase):
+    """
+    Keep the files written in the user's cache during a test in a temporary
+    directory instead.
+
+    @param testCase: The running L{TestCase}.
+
+    @return: The L{FilePath} of the directory.
+    """
+    cache = FilePath(testCase.mktemp())
+    testCase.patch(_cache, 'cacheDirectory', lambda: cache)
+    return cache
+
+
+
+class CacheDirectoryTests(TestCase):
+    """
+    Tests for L{_cache.cacheDirectory}.
+    """
+    def test_cacheDirectory(self):
+        """
+        The files are kept in the I{newsbuilder} directory of
+        C{$XDG_CACHE_HOME}, or of I{~/.cache} when it is not set.
+        """
+        environ = {'HOME': '/home/alice'}
+        self.patch(os, 'environ', environ)
+        self.assertEqual(
+            FilePath('/home/alice/.cache/newsbuilder'),
+            _cache.cacheDirectory())
+        environ['XDG_CACHE_HOME'] = '/var/cache/alice'
+        self.assertEqual(
+            FilePath('/var/cache/alice/newsbuilder'),
+            _cache.cacheDirectory())
+
+
+
+class CachePathTests(TestCase):
+    """
+    Tests for L{cachePath}.
+    """
+    def setUp(self):
+        """
+        Keep the files in a temporary directory.
+        """
+        self.cache = useTemporaryCache(self)
+
+
+    def test_kind(self):
+        """
+        L{cachePath} gives a file in the directory of the given kind.
+        """
+        self.assertEqual(
+            self.cache.child('news-index'),
+            cachePath('news-index', '/repo/NEWS').parent())
+
+
+    def test_absolutePath(self):
+        """
+        L{cachePath} gives the same file for a relative path as for the
+        absolute path it stands for, and different files for different
+        paths or kinds.
+        """
+        path = cachePath('progress', 'NEWS')
+        self.assertEqual(
+            path, cachePath('progress', os.path.abspath('NEWS')))
+        self.assertNotEqual(path, cachePath('progress', 'topfiles/NEWS'))
+        self.assertNotEqual(path, cachePath('news-index', 'NEWS'))
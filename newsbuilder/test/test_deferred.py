@@ -0,0 +1,377 @@
+# Copyright (c) Twisted Matrix Laboratories.
+# See LICENSE for details.
+
+"""
+Tests for L{newsbuilder._deferred}.
+"""
+
+import os
+import signal
+import sys
+
+from twisted.internet.defer import Deferred, fail, gatherResults, succeed
+from twisted.internet.error import ProcessDone
+from twisted.internet.task import Clock
+from twisted.python.failure import Failure
+from twisted.trial.unittest import TestCase
+from twisted.python.filepath import FilePath
+
+from newsbuilder import (
+    NewsBuilder, NotWorkingDirectory, TwistedBuildStrategy)
+from newsbuilder import _deferred, _newsbuilder
+from newsbuilder._newsbuilder import CommandFailed
+from newsbuilder._deferred import _CommandProtocol, runCommandAsync
+from newsbuilder._process import CommandTimedOut, ProcessRunner
+from newsbuilder.test.test_newsbuilder import (
+    createFakeTwistedProject, fakeVersionControl)
+from newsbuilder.test.test_cache import useTemporaryCache
+
+
+
+class RunCommandAsyncTests(TestCase):
+    """
+    Tests for L{runCommandAsync}.
+    """
+    def test_output(self):
+        """
+        L{runCommandAsync} returns a L{Deferred} which fires with the standard
+        output and standard error of the command.
+        """
+        d = runCommandAsync([
+            sys.executable, '-c',
+            'import sys; sys.stdout.write("out"); sys.stdout.flush(); '
+            'sys.stderr.write("err")'])
+        d.addCallback(self.assertEqual, 'outerr')
+        return d
+
+
+    def test_searchPath(self):
+        """
+        L{runCommandAsync} looks for executables without a slash in their name
+        on the I{PATH}.
+        """
+        d = runCommandAsync(['env'])
+        d.addCallback(self.assertIsInstance, str)
+        return d
+
+
+    def test_notFound(self):
+        """
+        The L{Deferred} returned by L{runCommandAsync} fails with L{OSError}
+        if the executable cannot be found.
+        """
+        return self.assertFailure(
+            runCommandAsync(['newsbuilder-does-not-exist']), OSError)
+
+
+    def test_exitStatus(self):
+        """
+        The L{Deferred} returned by L{runCommandAsync} fails with
+        L{CommandFailed} giving the exit status and the output when the
+        command exits with a non-0 exit status.
+        """
+        d = runCommandAsync([
+            sys.executable, '-c',
+            'import sys; sys.stdout.write("oops"); sys.exit(3)'])
+        d = self.assertFailure(d, CommandFailed)
+
+        def check(error):
+            self.assertEqual(3, error.exitStatus)
+            self.assertIdentical(None, error.exitSignal)
+            self.assertEqual('oops', error.output)
+        return d.addCallback(check)
+
+
+    def test_exitSignal(self):
+        """
+        The L{Deferred} returned by L{runCommandAsync} fails with
+        L{CommandFailed} giving the signal when the command is killed by one.
+        """
+        d = runCommandAsync([
+            sys.executable, '-c',
+            'import os, signal; os.kill(os.getpid(), signal.SIGTERM)'])
+        d = self.assertFailure(d, CommandFailed)
+
+        def check(error):
+            self.assertIdentical(None, error.exitStatus)
+            self.assertEqual(signal.SIGTERM, error.exitSignal)
+        return d.addCallback(check)
+
+
+    def test_timeout(self):
+        """
+        The L{Deferred} returned by L{runCommandAsync} fails with
+        L{CommandTimedOut}, giving the output read so far, when the command
+        is killed for running for longer than its time limit.
+        """
+        d = runCommandAsync([
+            sys.executable, '-c',
+            'import sys, time; sys.stdout.write("started"); '
+            'sys.stdout.flush(); time.sleep(30)'], timeout=0.5)
+        d = self.assertFailure(d, CommandTimedOut)
+
+        def check(error):
+            self.assertEqual(0.5, error.timeout)
+            self.assertEqual(signal.SIGKILL, error.exitSignal)
+            self.assertEqual('started', error.output)
+        return d.addCallback(check)
+
+
+    def test_timeoutCancelled(self):
+        """
+        The time limit of a command which exits in time is cancelled.
+        """
+        clock = Clock()
+        protocol = _CommandProtocol(Deferred(), 100)
+        protocol.timeoutCall = clock.callLater(1, protocol.timeOut, 1)
+        protocol.processEnded(Failure(ProcessDone(0)))
+        self.assertEqual([], clock.getDelayedCalls())
+
+
+    def test_maxOutput(self):
+        """
+        L{runCommandAsync} only keeps the last C{maxOutput} bytes of the
+        output of the command.
+        """
+        d = runCommandAsync([
+            sys.executable, '-c',
+            'import sys; sys.stdout.write("x" * 100000 + "end")'],
+            maxOutput=1000)
+        d.addCallback(self.assertEqual, 'x' * 997 + 'end')
+        return d
+
+
+    def test_outputCallable(self):
+        """
+        L{runCommandAsync} gives all of the output of the command to the
+        C{output} callable instead of keeping it.
+        """
+        chunks = []
+        d = runCommandAsync([
+            sys.executable, '-c',
+            'import sys; sys.stdout.write("x" * 100000)'],
+            maxOutput=1000, output=chunks.append)
+
+        def check(result):
+            self.assertEqual('', result)
+            self.assertEqual('x' * 100000, ''.join(chunks))
+        return d.addCallback(check)
+
+
+
+class BuildAllAsyncTests(TestCase):
+    """
+    Tests for L{TwistedBuildStrategy.buildAllAsync}.
+    """
+    def setUp(self):
+        useTemporaryCache(self)
+        self.commands = []
+        self.patch(_deferred, 'runCommandAsync', self.runCommandAsync)
+
+
+    def runCommandAsync(self, args, reactor, timeout, maxOutput, output):
+        """
+        Record the commands run instead of running them, showing every file
+        as under version control.
+        """
+        return succeed(fakeVersionControl(self.commands)(args, output))
+
+
+    def newsFiles(self, project):
+        """
+        Read the news files of the fake project.
+        """
+        return [
+            path.getContent() for path in [
+                project.child("NEWS"),
+                project.child("topfiles").child("NEWS"),
+                project.child("conch").child("topfiles").child("NEWS")]]
+
+
+    def test_buildAll(self):
+        """
+        L{TwistedBuildStrategy.buildAllAsync} writes the same news as
+        L{TwistedBuildStrategy.buildAll}, runs the same commands and fires
+        with C{None} once done.
+        """
+        commands = []
+        self.patch(_newsbuilder, 'runCommand', fakeVersionControl(commands))
+        expected = createFakeTwistedProject(
+            FilePath(self.mktemp()), workingCopy=True)
+        TwistedBuildStrategy(NewsBuilder()).buildAll(expected)
+
+        project = createFakeTwistedProject(
+            FilePath(self.mktemp()), workingCopy=True)
+        d = TwistedBuildStrategy(NewsBuilder()).buildAllAsync(project)
+
+        def built(result):
+            self.assertIdentical(None, result)
+            self.assertEqual(self.newsFiles(expected), self.newsFiles(project))
+            self.assertEqual(
+                [command[:2] for command in commands],
+                [command[:2] for command in self.commands])
+            self.assertEqual(
+                sorted(path[len(project.path):]
+                       for path in self.commands[-1][2:]),
+                sorted(path[len(expected.path):]
+                       for path in commands[-1][2:]))
+        return d.addCallback(built)
+
+
+    def test_concurrent(self):
+        """
+        Several repositories can be built at the same time.
+        """
+        projects = [
+            createFakeTwistedProject(
+                FilePath(self.mktemp()), workingCopy=True)
+            for _ in range(3)]
+        d = gatherResults([
+            TwistedBuildStrategy(NewsBuilder()).buildAllAsync(project)
+            for project in projects])
+
+        def built(ignored):
+            news = [self.newsFiles(project) for project in projects]
+            self.assertEqual([news[0]] * 3, news)
+            self.assertIn("Fixed that bug", news[0][0])
+            # Each build runs svn status and svn rm.
+            self.assertEqual(6, len(self.commands))
+        return d.addCallback(built)
+
+
+    def test_processLimits(self):
+        """
+        L{TwistedBuildStrategy.buildAllAsync} runs the commands with the time
+        limit and output limit of those run by L{runCommand}.
+        """
+        limits = []
+        def runCommandAsync(args, reactor, timeout, maxOutput, output):
+            limits.append((timeout, maxOutput))
+            return self.runCommandAsync(
+                args, reactor, timeout, maxOutput, output)
+        self.patch(_deferred, 'runCommandAsync', runCommandAsync)
+        self.patch(_newsbuilder, '_processRunner',
+                   ProcessRunner(timeout=30, maxOutput=1000))
+        project = createFakeTwistedProject(
+            FilePath(self.mktemp()), workingCopy=True)
+        d = TwistedBuildStrategy(NewsBuilder()).buildAllAsync(project)
+
+        def built(ignored):
+            self.assertEqual([(30, 1000)] * 2, limits)
+        return d.addCallback(built)
+
+
+    def test_notWorkingDirectory(self):
+        """
+        The L{Deferred} returned by L{TwistedBuildStrategy.buildAllAsync}
+        fails with L{NotWorkingDirectory}, having written nothing, when
+        C{svn info} fails for a directory which looks like it is in an old
+        Subversion working copy.
+        """
+        def runCommandAsync(args, reactor, *ignored):
+            self.commands.append(args)
+            return fail(CommandFailed(1, None, ''))
+        self.patch(_deferred, 'runCommandAsync', runCommandAsync)
+
+        project = createFakeTwistedProject(FilePath(self.mktemp()))
+        project.child(".svn").makedirs()
+        d = TwistedBuildStrategy(NewsBuilder()).buildAllAsync(project)
+        d = self.assertFailure(d, NotWorkingDirectory)
+
+        def failed(ignored):
+            self.assertEqual(1, len(self.commands))
+            self.assertEqual(
+                'Old boring stuff from the past.\n',
+                project.child("NEWS").getContent())
+        return d.addCallback(failed)
+
+
+    def test_notWorkingCopy(self):
+        """
+        The L{Deferred} returned by L{TwistedBuildStrategy.buildAllAsync}
+        fails with L{NotWorkingDirectory} without running any command when
+        the directory is in no working copy with a backend.
+        """
+        self.patch(_newsbuilder, 'chooseBackend', lambda directory: None)
+        project = createFakeTwistedProject(FilePath(self.mktemp()))
+        d = TwistedBuildStrategy(NewsBuilder()).buildAllAsync(project)
+        d = self.assertFailure(d, NotWorkingDirectory)
+        return d.addCallback(lambda ignored: self.assertEqual(
+            [], self.commands))
+
+
+    def test_git(self):
+        """
+        L{TwistedBuildStrategy.buildAllAsync} removes the fragments of a Git
+        working copy with C{git rm}, once C{git ls-files} found that they are
+        under version control.
+        """
+        project = createFakeTwistedProject(FilePath(self.mktemp()))
+        project.child(".git").makedirs()
+        d = TwistedBuildStrategy(NewsBuilder()).buildAllAsync(project)
+
+        def built(ignored):
+            self.assertEqual(2, len(self.commands))
+            self.assertEqual(["ls-files", "-z", "--others", "--"],
+                             self.commands[0][3:7])
+            self.assertEqual(["git", "-C"], self.commands[1][:2])
+            self.assertEqual(["rm", "-q", "-f", "--"], self.commands[1][3:7])
+            self.assertEqual(3, len(self.commands[1]) - 7)
+        return d.addCallback(built)
+
+
+    def test_gitUnversionedFragment(self):
+        """
+        L{TwistedBuildStrategy.buildAllAsync} removes the fragments which are
+        not under version control from the disk instead of with C{git rm}.
+        """
+        project = createFakeTwistedProject(FilePath(self.mktemp()))
+        project.child(".git").makedirs()
+        untracked = project.descendant(["topfiles", "5.misc"])
+
+        def runCommandAsync(args, reactor, *ignored):
+            self.commands.append(args)
+            if args[3:5] == ["ls-files", "-z"]:
+                return succeed(
+                    os.path.relpath(untracked.path, args[2]) + "\0")
+            return succeed("")
+        self.patch(_deferred, 'runCommandAsync', runCommandAsync)
+        d = TwistedBuildStrategy(NewsBuilder()).buildAllAsync(project)
+
+        def built(ignored):
+            self.assertEqual(2, len(self.commands))
+            self.assertEqual(["rm", "-q", "-f", "--"], self.commands[1][3:7])
+            self.assertNotIn(untracked.path, self.commands[1])
+            self.assertEqual(2, len(self.commands[1]) - 7)
+            self.assertFalse(untracked.exists())
+        return d.addCallback(built)
+
+
+    def test_indexDiscovery(self):
+        """
+        L{TwistedBuildStrategy.buildAllAsync} finds the projects among the
+        files under version control when L{TwistedBuildStrategy.discovery}
+        is C{"index"}.
+        """
+        def runCommandAsync(args, reactor, timeout, maxOutput, output):
+            self.commands.append(args)
+            if args[3:] == ["ls-files", "-z"]:
+                output("topfiles/NEWS\0topfiles/5.misc\0")
+            return succeed("")
+        self.patch(_deferred, 'runCommandAsync', runCommandAsync)
+
+        project = createFakeTwistedProject(FilePath(self.mktemp()))
+        project.child(".git").makedirs()
+        strategy = TwistedBuildStrategy(NewsBuilder(), discovery="index")
+        d = strategy.buildAllAsync(project)
+
+        def built(ignored):
+            self.assertEqual(2, len(self.commands))
+            self.assertEqual(
+                [project.descendant(["topfiles", "5.misc"]).path],
+                self.commands[1][7:])
+            # The conch project has no files under version control.
+            self.assertEqual(
+                "Old conch news.\n",
+                project.descendant(["conch", "topfiles", "NEWS"]).getContent())
+        return d.addCallback(built)
@@ -0,0 +1,303 @@
+# Copyright (c) Twisted Matrix Laboratories.
+# See LICENSE for details.
+
+"""
+Tests for L{newsbuilder._discovery}.
+"""
+
+import os
+import time
+
+from twisted.trial.unittest import TestCase
+from twisted.python.filepath import FilePath
+
+from newsbuilder import _discovery
+from newsbuilder._discovery import (
+    DiscoveryManifest, ProjectFinder, TrackedFiles)
+
+
+
+class ProjectFinderTests(TestCase):
+    """
+    Tests for L{ProjectFinder}.
+    """
+    def setUp(self):
+        """
+        Create a tree containing some projects, some of which are inside
+        directories that should not be searched.
+        """
+        self.base = FilePath(self.mktemp())
+        for segments in [
+                ('twisted', 'topfiles'),
+                ('twisted', 'conch', 'topfiles'),
+                ('twisted', 'web', 'topfiles'),
+                ('.svn', 'pristine', 'topfiles'),
+                ('.git', 'twisted', 'topfiles'),
+                ('build', 'lib', 'twisted', 'topfiles'),
+                ('Twisted.egg-info', 'topfiles'),
+                ('node_modules', 'thing', 'topfiles'),
+                ('env', 'lib', 'twisted', 'topfiles')]:
+            self.base.preauthChild(os.path.join(*segments)).makedirs()
+        self.base.child('env').child('pyvenv.cfg').setContent('')
+        self.base.child('twisted').child('topfiles').child(
+            '1.misc').setContent('')
+
+
+    def test_find(self):
+        """
+        L{ProjectFinder.find} returns the sorted paths of the directories
+        containing a I{topfiles} directory, without searching version control
+        metadata, build outputs and virtualenvs.
+        """
+        twisted = self.base.child('twisted')
+        self.assertEqual(
+            [twisted.path,
+             twisted.child('conch').path,
+             twisted.child('web').path],
+            ProjectFinder().find(self.base.path))
+
+
+    def test_exclude(self):
+        """
+        Directories matching any of the given C{exclude} patterns are not
+        searched either.
+        """
+        twisted = self.base.child('twisted')
+        self.assertEqual(
+            [twisted.path],
+            ProjectFinder(exclude=['c*', 'web']).find(self.base.path))
+
+
+    def test_jobs(self):
+        """
+        Spreading the search over several threads finds the same projects.
+        """
+        self.assertEqual(
+            ProjectFinder().find(self.base.path),
+            ProjectFinder(jobs=4).find(self.base.path))
+
+
+    def test_baseIsProject(self):
+        """
+        The base directory itself is found if it contains a I{topfiles}
+        directory.
+        """
+        twisted = self.base.child('twisted')
+        self.assertEqual(
+            [twisted.path,
+             twisted.child('conch').path,
+             twisted.child('web').path],
+            ProjectFinder(jobs=2).find(twisted.path))
+
+
+    def test_symlinkLoop(self):
+        """
+        A symbolic link to an ancestor directory is not followed.
+        """
+        conch = self.base.child('twisted').child('conch')
+        self.base.linkTo(conch.child('loop'))
+        self.assertEqual(
+            3, len(ProjectFinder().find(self.base.path)))
+
+
+
+class DiscoveryManifestTests(TestCase):
+    """
+    Tests for L{DiscoveryManifest}.
+    """
+    def setUp(self):
+        """
+        Create a tree containing some projects, with modification times far
+        enough in the past to be trusted, and record which directories are
+        listed.
+        """
+        self.base = FilePath(self.mktemp())
+        for segments in [
+                ('twisted', 'topfiles'),
+                ('twisted', 'conch', 'topfiles'),
+                ('twisted', 'web', 'static')]:
+            self.base.preauthChild(os.path.join(*segments)).makedirs()
+        self.age()
+        self.manifest = FilePath(self.mktemp())
+
+        self.listed = []
+        listDirectory = _discovery._listDirectory
+        def recordingListDirectory(path):
+            self.listed.append(path)
+            return listDirectory(path)
+        self.patch(_discovery, '_listDirectory', recordingListDirectory)
+
+
+    def age(self):
+        """
+        Set the modification time of every directory to an hour ago.
+        """
+        past = time.time() - 3600
+        for path in self.base.walk():
+            os.utime(path.path, (past, past))
+
+
+    def find(self, exclude=()):
+        """
+        Search C{self.base} using the manifest in C{self.manifest}, and save
+        the updated manifest.
+        """
+        manifest = DiscoveryManifest.load(
+            self.manifest, self.base.path, exclude)
+        found = ProjectFinder(exclude=exclude, manifest=manifest).find(
+            self.base.path)
+        manifest.save(self.manifest)
+        return found
+
+
+    def test_unmodified(self):
+        """
+        Directories which have not been modified since the manifest was
+        saved are not listed again.
+        """
+        found = self.find()
+        self.assertEqual(7, len(self.listed))
+        del self.listed[:]
+        self.assertEqual(found, self.find())
+        self.assertEqual([], self.listed)
+
+
+    def test_modified(self):
+        """
+        A directory which has been modified since the manifest was saved is
+        listed again, and so are its new subdirectories.
+        """
+        self.find()
+        web = self.base.child('twisted').child('web')
+        web.child('topfiles').createDirectory()
+        del self.listed[:]
+        self.assertEqual(
+            [self.base.child('twisted').path,
+             self.base.child('twisted').child('conch').path,
+             web.path],
+            self.find())
+        self.assertEqual(
+            sorted([web.path, web.child('topfiles').path]),
+            sorted(self.listed))
+
+
+    def test_racy(self):
+        """
+        A directory modified shortly before the manifest was saved is listed
+        again, as it could have been modified since without its modification
+        time changing.
+        """
+        now = time.time()
+        web = self.base.child('twisted').child('web')
+        os.utime(web.path, (now, now))
+        self.find()
+        del self.listed[:]
+        self.find()
+        self.assertEqual([web.path], self.listed)
+
+
+    def test_otherExclude(self):
+        """
+        A manifest saved by a search with different exclude patterns is not
+        used.
+        """
+        self.find()
+        del self.listed[:]
+        self.assertEqual(
+            [self.base.child('twisted').path], self.find(exclude=['conch']))
+        self.assertEqual(5, len(self.listed))
+
+
+    def test_corrupt(self):
+        """
+        An unreadable manifest is ignored.
+        """
+        self.manifest.setContent('{not json')
+        manifest = DiscoveryManifest.load(self.manifest, self.base.path)
+        self.assertEqual(None, manifest.lookup(self.base.path, 0))
+
+
+
+class TrackedFilesTests(TestCase):
+    """
+    Tests for L{TrackedFiles}.
+    """
+    def setUp(self):
+        """
+        List files under version control like those which
+        L{ProjectFinderTests} creates.
+        """
+        self.base = '/repository'
+        self.paths = [
+            os.path.join(self.base, path) for path in [
+                'setup.py',
+                'twisted/NEWS',
+                'twisted/topfiles/NEWS',
+                'twisted/topfiles/1.misc',
+                'twisted/conch/topfiles/2.feature',
+                'twisted/conch/topfiles/sub/3.bugfix',
+                'twisted/web/topfiles',
+                'twisted/words/notopfiles/4.misc',
+                'build/lib/twisted/topfiles/NEWS',
+                'Twisted.egg-info/topfiles/NEWS',
+                'env/pyvenv.cfg',
+                'env/lib/twisted/topfiles/NEWS']]
+
+
+    def test_findProjects(self):
+        """
+        L{TrackedFiles.findProjects} returns the sorted paths of the
+        directories containing a I{topfiles} directory, as
+        L{ProjectFinder.find} does, ignoring the same directories.
+        """
+        self.assertEqual(
+            ['/repository/twisted',
+             '/repository/twisted/conch',
+             '/repository/twisted/web'],
+            TrackedFiles(self.base, self.paths).findProjects())
+
+
+    def test_exclude(self):
+        """
+        Projects in directories matching any of the given C{exclude}
+        patterns are ignored too.
+        """
+        self.assertEqual(
+            ['/repository/twisted'],
+            TrackedFiles(self.base, self.paths,
+                         exclude=['c*', 'web']).findProjects())
+
+
+    def test_baseDirectory(self):
+        """
+        Only the projects beneath the base directory are found, including
+        the base directory itself and, if it is a I{topfiles} directory, its
+        parent.
+        """
+        self.assertEqual(
+            ['/repository/twisted',
+             '/repository/twisted/conch',
+             '/repository/twisted/web'],
+            TrackedFiles('/repository/twisted/', self.paths).findProjects())
+        self.assertEqual(
+            ['/repository/twisted'],
+            TrackedFiles(
+                '/repository/twisted/topfiles', self.paths).findProjects())
+
+
+    def test_children(self):
+        """
+        L{TrackedFiles.children} lists the basenames of the files under
+        version control directly in a I{topfiles} directory, and not those
+        in its subdirectories.
+        """
+        tracked = TrackedFiles(self.base, self.paths)
+        self.assertEqual(
+            ['NEWS', '1.misc'],
+            tracked.children('/repository/twisted/topfiles'))
+        self.assertEqual(
+            ['2.feature'],
+            tracked.children('/repository/twisted/conch/topfiles/'))
+        self.assertEqual(
+            [], tracked.children('/repository/twisted/web/topfiles'))
+        self.assertEqual([], tracked.children('/repository/twisted'))
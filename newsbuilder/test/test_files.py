@@ -0,0 +1,317 @@
+# Copyright (c) Twisted Matrix Laboratories.
+# See LICENSE for details.
+
+"""
+Tests for L{newsbuilder._files}.
+"""
+
+import errno
+import os
+
+from twisted.trial.unittest import TestCase
+from twisted.python.filepath import FilePath
+
+from newsbuilder import _files
+from newsbuilder._files import (
+    atomicReplacement, copyFileRange, replaceStrings, sameContents)
+
+
+
+class CopyFileRangeTests(TestCase):
+    """
+    Tests for L{copyFileRange}.
+    """
+    def setUp(self):
+        """
+        Create a source file several chunks long.
+        """
+        self.content = ''.join(
+            '%d\n' % (i,) for i in range(_files.CHUNK_SIZE // 2))
+        self.source = FilePath(self.mktemp())
+        self.source.setContent(self.content)
+        self.destination = FilePath(self.mktemp())
+
+
+    def copy(self, offset, end=None):
+        """
+        Write a prefix to the destination file, then copy the source file to
+        it from C{offset}, and to C{end} if it is not C{None}, followed by a
+        suffix.
+        """
+        with self.source.open() as source:
+            with self.destination.open('w') as destination:
+                destination.write('prefix\n')
+                if end is None:
+                    copyFileRange(source, destination, offset)
+                else:
+                    copyFileRange(source, destination, offset, end)
+                    destination.write('suffix\n')
+
+
+    def test_copy(self):
+        """
+        L{copyFileRange} appends the contents of the source file from the
+        given offset to the destination file.
+        """
+        self.copy(10)
+        self.assertEqual(
+            'prefix\n' + self.content[10:], self.destination.getContent())
+
+
+    def test_chunked(self):
+        """
+        When no system call for copying between files is available,
+        L{copyFileRange} copies the data in chunks.
+        """
+        self.patch(_files, '_copyFileRange', None)
+        self.patch(_files, '_sendfile', None)
+        self.copy(3)
+        self.assertEqual(
+            'prefix\n' + self.content[3:], self.destination.getContent())
+
+
+    def test_end(self):
+        """
+        L{copyFileRange} stops copying at the given end offset, after which
+        further data is written to the destination file.
+        """
+        self.patch(_files, '_copyFileRange', None)
+        self.patch(_files, '_sendfile', None)
+        self.patch(_files, 'CHUNK_SIZE', 1000)
+        self.copy(3, 2500)
+        self.assertEqual(
+            'prefix\n' + self.content[3:2500] + 'suffix\n',
+            self.destination.getContent())
+
+
+    def test_endWithKernel(self):
+        """
+        When the data is copied with a system call, L{copyFileRange} also
+        stops at the given end offset, and further data is written after it.
+        """
+        def sendfile(destinationFD, sourceFD, offset, count):
+            os.lseek(sourceFD, offset, os.SEEK_SET)
+            return os.write(destinationFD, os.read(sourceFD, min(count, 100)))
+        self.patch(_files, '_copyFileRange', None)
+        self.patch(_files, '_sendfile', sendfile)
+        self.copy(3, 2500)
+        self.assertEqual(
+            'prefix\n' + self.content[3:2500] + 'suffix\n',
+            self.destination.getContent())
+
+
+    def test_unsupported(self):
+        """
+        When a system call for copying between files fails because it does
+        not support the files, L{copyFileRange} copies the rest of the data
+        in another way.
+        """
+        calls = []
+        def unsupported(*args):
+            calls.append(args)
+            raise OSError(errno.EXDEV, 'Invalid cross-device link')
+        self.patch(_files, '_copyFileRange', unsupported)
+        self.patch(_files, '_sendfile', unsupported)
+        self.copy(0)
+        self.assertEqual(2, len(calls))
+        self.assertEqual(
+            'prefix\n' + self.content, self.destination.getContent())
+
+
+    def test_error(self):
+        """
+        Other errors from a system call for copying between files are raised.
+        """
+        def failing(*args):
+            raise OSError(errno.EIO, 'Input/output error')
+        self.patch(_files, '_copyFileRange', failing)
+        exception = self.assertRaises(OSError, self.copy, 0)
+        self.assertEqual(errno.EIO, exception.errno)
+
+
+
+class ReplaceStringsTests(TestCase):
+    """
+    Tests for L{replaceStrings}.
+    """
+    def replace(self, content, oldToNew):
+        """
+        Copy C{content} through L{replaceStrings}.
+
+        @return: The contents of the copy.
+        """
+        source = FilePath(self.mktemp())
+        source.setContent(content)
+        destination = FilePath(self.mktemp())
+        with source.open() as sourceFile:
+            with destination.open('w') as destinationFile:
+                replaceStrings(sourceFile, destinationFile, oldToNew)
+        return destination.getContent()
+
+
+    def test_replace(self):
+        """
+        L{replaceStrings} replaces every occurrence of each key of the
+        mapping by its value.
+        """
+        self.assertEqual(
+            'one 2.0 two 3.0 one 2.0\n',
+            self.replace(
+                'one $A two $B one $A\n', {'$A': '2.0', '$B': '3.0'}))
+
+
+    def test_longestFirst(self):
+        """
+        Where several keys start at the same place, L{replaceStrings}
+        replaces the longest.
+        """
+        self.assertEqual(
+            'long, short.',
+            self.replace('$AB, $A.', {'$A': 'short', '$AB': 'long'}))
+
+
+    def test_singlePass(self):
+        """
+        L{replaceStrings} does not search the replacements for keys.
+        """
+        self.assertEqual(
+            'b c', self.replace('a b', {'a': 'b', 'b': 'c'}))
+
+
+    def test_chunkBoundaries(self):
+        """
+        L{replaceStrings} finds the keys which straddle the chunks in which
+        it reads the file.
+        """
+        self.patch(_files, 'CHUNK_SIZE', 7)
+        content = 'x$VERSION-$V.' * 20
+        for oldToNew in [{'$VERSION': '1.0'},
+                         {'$VERSION': '1.0', '$V': '2.0'},
+                         {'$V': '2.0', '-': '!'}]:
+            expected = content
+            for old in sorted(oldToNew, key=len, reverse=True):
+                expected = expected.replace(old, oldToNew[old])
+            self.assertEqual(expected, self.replace(content, oldToNew))
+
+
+    def test_nothingToReplace(self):
+        """
+        With an empty mapping, L{replaceStrings} copies the file unchanged.
+        """
+        self.assertEqual('content\n', self.replace('content\n', {}))
+
+
+    def test_emptyKey(self):
+        """
+        L{replaceStrings} raises L{ValueError} if asked to replace the empty
+        string.
+        """
+        self.assertRaises(ValueError, self.replace, 'content', {'': 'x'})
+
+
+
+class SameContentsTests(TestCase):
+    """
+    Tests for L{sameContents}.
+    """
+    def setUp(self):
+        """
+        Create a file several chunks long.
+        """
+        self.patch(_files, 'CHUNK_SIZE', 10)
+        self.content = 'x' * 95
+        self.path = FilePath(self.mktemp())
+        self.path.setContent(self.content)
+        self.other = FilePath(self.mktemp())
+
+
+    def test_same(self):
+        """
+        L{sameContents} returns C{True} for files with the same contents.
+        """
+        self.other.setContent(self.content)
+        self.assertTrue(sameContents(self.path, self.other))
+
+
+    def test_differentSize(self):
+        """
+        L{sameContents} returns C{False} for files of different sizes.
+        """
+        self.other.setContent(self.content + 'x')
+        self.assertFalse(sameContents(self.path, self.other))
+
+
+    def test_different(self):
+        """
+        L{sameContents} returns C{False} for files of the same size which
+        differ anywhere.
+        """
+        for position in [0, 9, 10, 94]:
+            self.other.setContent(
+                self.content[:position] + 'y' + self.content[position + 1:])
+            self.assertFalse(sameContents(self.path, self.other))
+
+
+    def test_missing(self):
+        """
+        L{sameContents} returns C{False} if either file does not exist.
+        """
+        self.assertFalse(sameContents(self.path, self.other))
+        self.assertFalse(sameContents(self.other, self.path))
+
+
+
+class AtomicReplacementTests(TestCase):
+    """
+    Tests for L{atomicReplacement}.
+    """
+    def setUp(self):
+        """
+        Create a file to replace in a directory of its own.
+        """
+        self.directory = FilePath(self.mktemp())
+        self.directory.makedirs()
+        self.path = self.directory.child('file')
+        self.path.setContent('old\n')
+        self.path.chmod(0o640)
+
+
+    def test_replace(self):
+        """
+        The file written in the C{with} block using L{atomicReplacement}
+        replaces the original, with its permissions, once the block exits.
+        """
+        with atomicReplacement(self.path) as new:
+            new.write('new\n')
+            self.assertEqual('old\n', self.path.getContent())
+        self.assertEqual('new\n', self.path.getContent())
+        self.assertEqual(0o640, os.stat(self.path.path).st_mode & 0o777)
+        self.assertEqual(['file'], self.directory.listdir())
+
+
+    def test_unchanged(self):
+        """
+        If the contents written in the C{with} block using
+        L{atomicReplacement} are the same as the original ones, the original
+        file is left alone, modification time included.
+        """
+        os.utime(self.path.path, (1000000000, 1000000000))
+        with atomicReplacement(self.path) as new:
+            new.write('old\n')
+        self.assertEqual('old\n', self.path.getContent())
+        self.assertEqual(1000000000, os.stat(self.path.path).st_mtime)
+        self.assertEqual(['file'], self.directory.listdir())
+
+
+    def test_error(self):
+        """
+        If the C{with} block using L{atomicReplacement} raises an exception,
+        the original file is left alone and the new one removed.
+        """
+        def replace():
+            with atomicReplacement(self.path) as new:
+                new.write('new\n')
+                raise ZeroDivisionError()
+        self.assertRaises(ZeroDivisionError, replace)
+        self.assertEqual('old\n', self.path.getContent())
+        self.assertEqual(['file'], self.directory.listdir())
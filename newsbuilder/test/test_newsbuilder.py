@@ -11,32 +11,49 @@ only ever performed on Linux.
 
 import glob
 import io
+import json
 import operator
 import os
 from StringIO import StringIO
+import stat
+import subprocess
+import sys
 import tarfile
+import time
 from datetime import date
 
 from twisted.trial.unittest import TestCase
 
 from twisted.python.procutils import which
-from twisted.python import release
+from twisted.python import release, usage
 from twisted.python.filepath import FilePath
 from twisted.python.versions import Version
 
 from newsbuilder import (
     findTwistedProjects, replaceInFile,
     replaceProjectVersion, Project, generateVersionFileData,
-    runCommand, NewsBuilder, NotWorkingDirectory, TwistedBuildStrategy,
-    NewsBuilderOptions, NewsBuilderScript, __version__)
-
-from newsbuilder._newsbuilder import _changeNewsVersion, _formatHeader
+    CommandFailed, runCommand, NewsBuilder, NotWorkingDirectory,
+    TwistedBuildStrategy, NewsBuilderOptions, NewsBuilderScript,
+    __version__)
+
+from newsbuilder import _newsbuilder, _process
+from newsbuilder._newsindex import NewsIndex
+from newsbuilder.test.test_cache import useTemporaryCache
+from newsbuilder._process import ProcessRunner, _argumentLimit, _batchArguments
+from newsbuilder._trace import Tracer
+from newsbuilder._newsbuilder import (
+    _changeNewsVersion, _formatHeader, _newsHeaderPattern)
 
 if os.name != 'posix':
     skip = "Release toolchain only supported on POSIX."
 else:
     skip = None
 
+# The directory from which newsbuilder was imported, determined before trial
+# changes the working directory.
+_packageParent = os.path.dirname(os.path.dirname(os.path.abspath(
+    _newsbuilder.__file__)))
+
 if which("svn") and which("svnadmin"):
     svnSkip = skip
 else:
@@ -206,6 +223,66 @@ class ProjectTest(TestCase):
         self.assertEqual(project.getVersion(), version)
 
 
+    def test_getVersionWithoutExecuting(self):
+        """
+        L{Project.getVersion} reads the version from a I{_version.py} file in
+        the format written by L{generateVersionFileData}, including any
+        prerelease, without executing the file.
+        """
+        version = Version('foo', 2, 1, 0, prerelease=3)
+        project = self.makeProject(version)
+        versionFile = project.directory.child('_version.py')
+        versionFile.setContent(
+            versionFile.getContent() + 'raise RuntimeError()\n')
+        self.assertEqual(version, project.getVersion())
+
+
+    def test_getVersionOtherFormat(self):
+        """
+        L{Project.getVersion} parses I{_version.py} files which assign the
+        version in some other way than L{generateVersionFileData} without
+        executing them.
+        """
+        project = self.makeProject(Version('foo', 2, 1, 0))
+        project.directory.child('_version.py').setContent(
+            'from twisted.python.versions import Version\n'
+            'version = Version(\n'
+            '    "foo", 3, 2, 1)\n'
+            'raise RuntimeError()\n')
+        self.assertEqual(Version('foo', 3, 2, 1), project.getVersion())
+
+
+    def test_getVersionExecutes(self):
+        """
+        L{Project.getVersion} executes I{_version.py} files in which it cannot
+        find the version assignment.
+        """
+        project = self.makeProject(Version('foo', 2, 1, 0))
+        project.directory.child('_version.py').setContent(
+            'from twisted.python.versions import Version\n'
+            'arguments = ("foo", 4, 0, 0)\n'
+            'version = Version(*arguments)\n')
+        self.assertEqual(Version('foo', 4, 0, 0), project.getVersion())
+
+
+    def test_getVersionCached(self):
+        """
+        L{Project.getVersion} does not read a I{_version.py} file again while
+        its identity is unchanged, but does once it is modified.
+        """
+        project = self.makeProject(Version('foo', 2, 1, 0))
+        versionFile = project.directory.child('_version.py')
+        past = time.time() - 3600
+        os.utime(versionFile.path, (past, past))
+        self.assertEqual(Version('foo', 2, 1, 0), project.getVersion())
+
+        self.patch(_newsbuilder, '_parseVersion', lambda source: 1 // 0)
+        self.assertEqual(Version('foo', 2, 1, 0), project.getVersion())
+
+        os.utime(versionFile.path, (past + 1, past + 1))
+        self.assertRaises(ZeroDivisionError, project.getVersion)
+
+
     def test_updateVersion(self):
         """
         Project objects know how to update the version numbers in those
@@ -244,11 +321,61 @@ class ProjectTest(TestCase):
              Project(baseDirectory.child('foo').child('bar'))])
 
 
+    def test_findTwistedProjectsExclude(self):
+        """
+        L{findTwistedProjects} does not search version control metadata or
+        directories matching any of the C{exclude} patterns.
+        """
+        baseDirectory = self.makeProjects(
+            Version('foo', 2, 3, 0), Version('foo.bar', 0, 7, 4),
+            Version('foo.baz', 1, 0, 0))
+        baseDirectory.child('.svn').child('topfiles').makedirs()
+        projects = findTwistedProjects(baseDirectory, exclude=['ba?'])
+        self.assertProjectsEqual(
+            projects,
+            [Project(baseDirectory.child('foo'))])
+
+
+    def test_findTwistedProjectsManifest(self):
+        """
+        L{findTwistedProjects} saves the directories it searched to the given
+        C{manifest} file and finds the same projects when it is used again.
+        """
+        baseDirectory = self.makeProjects(
+            Version('foo', 2, 3, 0), Version('foo.bar', 0, 7, 4))
+        manifest = FilePath(self.mktemp())
+        expected = [Project(baseDirectory.child('foo')),
+                    Project(baseDirectory.child('foo').child('bar'))]
+
+        self.assertProjectsEqual(
+            findTwistedProjects(baseDirectory, manifest=manifest), expected)
+        self.assertTrue(manifest.exists())
+        self.assertProjectsEqual(
+            findTwistedProjects(baseDirectory, manifest=manifest), expected)
+
+
+    def test_findTwistedProjectsManifestReadOnly(self):
+        """
+        L{findTwistedProjects} does not create or replace the C{manifest}
+        file when C{updateManifest} is C{False}.
+        """
+        baseDirectory = self.makeProjects(Version('foo', 2, 3, 0))
+        manifest = FilePath(self.mktemp())
+        self.assertProjectsEqual(
+            findTwistedProjects(
+                baseDirectory, manifest=manifest, updateManifest=False),
+            [Project(baseDirectory.child('foo'))])
+        self.assertFalse(manifest.exists())
+
+
 
 class UtilityTest(TestCase):
     """
     Tests for various utility functions for releasing.
     """
+    def setUp(self):
+        useTemporaryCache(self)
+
 
     def test_chdir(self):
         """
@@ -289,6 +416,96 @@ class UtilityTest(TestCase):
         self.assertEqual(open('release.replace').read(), expected)
 
 
+    def test_replaceInFileAtomically(self):
+        """
+        L{replaceInFile} replaces the file with a new one with the same
+        permissions, leaving no other files behind.
+        """
+        directory = FilePath(self.mktemp())
+        directory.makedirs()
+        replace = directory.child('release.replace')
+        replace.setContent('version = $VER\n')
+        replace.chmod(0o751)
+        replaceInFile(replace.path, {'$VER': '2.0.0', '$VERSION': 'x'})
+        self.assertEqual('version = 2.0.0\n', replace.getContent())
+        self.assertEqual(0o751, stat.S_IMODE(os.stat(replace.path).st_mode))
+        self.assertEqual(['release.replace'], directory.listdir())
+
+
+    def test_replaceInFileUnchanged(self):
+        """
+        L{replaceInFile} leaves a file in which nothing was replaced alone,
+        modification time included.
+        """
+        directory = FilePath(self.mktemp())
+        directory.makedirs()
+        replace = directory.child('release.replace')
+        replace.setContent('version = 2.0.0\n')
+        os.utime(replace.path, (1000000000, 1000000000))
+        replaceInFile(replace.path, {'$VER': '3.0.0'})
+        self.assertEqual('version = 2.0.0\n', replace.getContent())
+        self.assertEqual(1000000000, os.stat(replace.path).st_mtime)
+        self.assertEqual(['release.replace'], directory.listdir())
+
+
+    def test_replaceProjectVersionUnchanged(self):
+        """
+        L{replaceProjectVersion} does not rewrite a version file which already
+        sets the given version, and returns whether it wrote the file.
+        """
+        versionFile = FilePath(self.mktemp())
+        self.assertTrue(
+            replaceProjectVersion(versionFile.path, Version('foo', 1, 2, 3)))
+        os.utime(versionFile.path, (1000000000, 1000000000))
+        self.assertFalse(
+            replaceProjectVersion(versionFile.path, Version('foo', 1, 2, 3)))
+        self.assertEqual(1000000000, os.stat(versionFile.path).st_mtime)
+        self.assertTrue(
+            replaceProjectVersion(versionFile.path, Version('foo', 1, 2, 4)))
+        self.assertEqual(
+            generateVersionFileData(Version('foo', 1, 2, 4)),
+            versionFile.getContent())
+
+
+    def test_batchArguments(self):
+        """
+        L{_batchArguments} spreads arguments over as few command lines as
+        fit in the given limit, each starting with the command.
+        """
+        # Each argument takes its length plus 9 bytes.
+        self.assertEqual(
+            [['rm', 'aaaa', 'bbbb'], ['rm', 'cccc', 'dddd'], ['rm', 'e']],
+            _batchArguments(
+                ['rm'], ['aaaa', 'bbbb', 'cccc', 'dddd', 'e'], limit=45))
+
+
+    def test_batchArgumentsTooLong(self):
+        """
+        An argument too long for the limit on its own is given a command
+        line to itself.
+        """
+        self.assertEqual(
+            [['rm', 'a'], ['rm', 'b' * 100], ['rm', 'c']],
+            _batchArguments(['rm'], ['a', 'b' * 100, 'c'], limit=30))
+
+
+    def test_batchArgumentsEmpty(self):
+        """
+        L{_batchArguments} returns no command lines when there are no
+        arguments.
+        """
+        self.assertEqual([], _batchArguments(['rm'], []))
+
+
+    def test_argumentLimit(self):
+        """
+        L{_argumentLimit} leaves room for the environment within the system
+        limit on the size of a command line.
+        """
+        limit = _argumentLimit()
+        self.assertTrue(1024 <= limit < os.sysconf('SC_ARG_MAX'))
+
+
     def test_formatHeader(self):
         """
         L{_formatHeader} accepts a title and underlines it with I{=} followed by
@@ -328,6 +545,107 @@ class UtilityTest(TestCase):
             expectedCore + 'Old core news.\n', coreNews.getContent())
 
 
+    def changeNewsVersion(self, content):
+        """
+        Change the version of I{Core} from 1.2.3 to 7.7.14 in a I{NEWS} file
+        with the given content.
+
+        @return: The L{FilePath} of the I{NEWS} file.
+        """
+        news = FilePath(self.mktemp())
+        news.makedirs()
+        news = news.child('NEWS')
+        news.setContent(content)
+        _changeNewsVersion(
+            news, "Core", Version("twisted", 1, 2, 3),
+            Version("twisted", 7, 7, 14), '2010-01-01')
+        return news
+
+
+    def test_changeNewsVersionOnly(self):
+        """
+        L{_changeNewsVersion} only changes the header of the news of the old
+        version, and leaves the rest of the file alone.
+        """
+        rest = 'Features\n--------\n - Twisted Core 1.2.3 is out. (#3)\n\n'
+        news = self.changeNewsVersion(
+            NewsBuilder._TICKET_HINT +
+            _formatHeader('Twisted Core 1.2.3 (2009-12-01)') + rest +
+            _formatHeader('Twisted Core 1.2.2 (2009-01-01)') + rest)
+        self.assertEqual(
+            NewsBuilder._TICKET_HINT +
+            _formatHeader('Twisted Core 7.7.14 (2010-01-01)') + rest +
+            _formatHeader('Twisted Core 1.2.2 (2009-01-01)') + rest,
+            news.getContent())
+        self.assertEqual(['NEWS'], news.parent().listdir())
+
+
+    def test_changeNewsVersionBeyondPrefix(self):
+        """
+        L{_changeNewsVersion} finds the header even if it is not within the
+        first L{_newsbuilder._HEADER_SEARCH_SIZE} bytes of the file.
+        """
+        self.patch(_newsbuilder, '_HEADER_SEARCH_SIZE', 40)
+        old = _formatHeader('Twisted Core 1.2.3 (2009-12-01)')
+        for prefix in ['x' * 20, 'x' * 100]:
+            news = self.changeNewsVersion(prefix + old + 'Old news.\n')
+            self.assertEqual(
+                prefix + _formatHeader('Twisted Core 7.7.14 (2010-01-01)') +
+                'Old news.\n',
+                news.getContent())
+
+
+    def test_changeNewsVersionMissing(self):
+        """
+        L{_changeNewsVersion} leaves a I{NEWS} file without the header of the
+        old version alone.
+        """
+        content = _formatHeader('Twisted Core 1.2.2 (2009-12-01)') + 'Old.\n'
+        news = self.changeNewsVersion(content)
+        self.assertEqual(content, news.getContent())
+        self.assertEqual(['NEWS'], news.parent().listdir())
+
+
+    def test_changeNewsVersionIndexed(self):
+        """
+        L{_changeNewsVersion} looks for the header where the index of the
+        I{NEWS} file says it is, and updates the index.
+        """
+        self.patch(_newsbuilder, '_HEADER_SEARCH_SIZE', 40)
+        news = FilePath(self.mktemp())
+        news.makedirs()
+        news = news.child('NEWS')
+        news.setContent(
+            _formatHeader('Twisted Core 1.2.4 (2009-12-02)') + 'x' * 100 +
+            '\n' + _formatHeader('Twisted Core 1.2.3 (2009-12-01)') +
+            'Old news.\n')
+        NewsIndex.scan(news).save(news)
+        _changeNewsVersion(
+            news, "Core", Version("twisted", 1, 2, 3),
+            Version("twisted", 7, 7, 14), '2010-01-01')
+        self.assertEqual(
+            _formatHeader('Twisted Core 1.2.4 (2009-12-02)') + 'x' * 100 +
+            '\n' + _formatHeader('Twisted Core 7.7.14 (2010-01-01)') +
+            'Old news.\n',
+            news.getContent())
+        self.assertEqual(
+            NewsIndex.scan(news).sections, NewsIndex.load(news).sections)
+
+
+    def test_newsHeaderPatternCached(self):
+        """
+        The header patterns used by L{_changeNewsVersion} are compiled once
+        per project name and version.
+        """
+        version = Version("twisted", 1, 2, 3)
+        self.assertIdentical(
+            _newsHeaderPattern("Core", version),
+            _newsHeaderPattern("Core", Version("twisted", 1, 2, 3)))
+        self.assertNotIdentical(
+            _newsHeaderPattern("Core", version),
+            _newsHeaderPattern("Conch", version))
+
+
 
 def svnCommit(project, repository):
     """
@@ -343,10 +661,16 @@ def svnCommit(project, repository):
 
 
 
-def createFakeTwistedProject(project):
+def createFakeTwistedProject(project, workingCopy=False):
     """
     Create a fake-looking Twisted project to build from.
+
+    @param workingCopy: If C{True}, make the project look like it is in a
+        Subversion working copy, which it is not.
     """
+    if workingCopy:
+        project.child(".svn").makedirs()
+        project.child(".svn").child("wc.db").setContent("")
     project = project.child("twisted")
     project.makedirs()
     createStructure(
@@ -366,6 +690,28 @@ def createFakeTwistedProject(project):
 
 
 
+def fakeVersionControl(commands):
+    """
+    Make a replacement for L{runCommand} which records the commands it is
+    given instead of running them, and whose output shows every file as under
+    version control.
+
+    @param commands: The C{list} to which to append the argument vector of
+        each command.
+    """
+    def runCommand(args, output=None):
+        commands.append(args)
+        result = ''
+        if args[:2] == ["svn", "status"]:
+            result = '<?xml version="1.0"?>\n<status>\n</status>\n'
+        if output is None:
+            return result
+        output(result)
+        return ''
+    return runCommand
+
+
+
 class NewsBuilderTests(TestCase, StructureAssertingMixin):
     """
     Tests for L{NewsBuilder}.
@@ -377,6 +723,7 @@ class NewsBuilderTests(TestCase, StructureAssertingMixin):
         Create a fake project and stuff some basic structure and content into
         it.
         """
+        useTemporaryCache(self)
         self.builder = NewsBuilder()
         self.project = FilePath(self.mktemp())
         self.project.createDirectory()
@@ -484,6 +831,219 @@ class NewsBuilderTests(TestCase, StructureAssertingMixin):
              (35, '')])
 
 
+    def test_indexChanges(self):
+        """
+        L{NewsBuilder._indexChanges} returns a C{dict} mapping each news entry
+        type to the same list of ticket information that
+        L{NewsBuilder._findChanges} returns for that type.
+        """
+        index = self.builder._indexChanges(self.project)
+        self.assertEqual(
+            dict((ticketType, self.builder._findChanges(
+                self.project, ticketType))
+                 for ticketType in self.builder._headings),
+            index)
+
+
+    def test_indexChangesGivenFragments(self):
+        """
+        L{NewsBuilder._indexChanges} reads only the given fragments, without
+        listing the directory, when it is given them.
+        """
+        self.project.children = None
+        fragments = self.builder._findFragments(
+            self.project, ['5.feature', '23.bugfix', 'NEWS', 'scratch'])
+        self.assertEqual(
+            [self.project.child('5.feature'), self.project.child('23.bugfix')],
+            fragments)
+        index = self.builder._indexChanges(self.project, fragments)
+        self.assertEqual(
+            [(5, 'We now support the web.')], index[self.builder._FEATURE])
+        self.assertEqual(
+            [(23, 'Broken stuff was fixed.')], index[self.builder._BUGFIX])
+        self.assertEqual([], index[self.builder._MISC])
+
+
+    def test_indexChangesListsOnce(self):
+        """
+        L{NewsBuilder.build} lists the children of the fragment directory only
+        once, no matter how many types of news entry are present.
+        """
+        listings = []
+        children = self.project.children
+        def countingChildren():
+            listings.append(self.project.path)
+            return children()
+        self.project.children = countingChildren
+
+        self.builder.build(
+            self.project, self.project.child('NEWS'), 'Project Name 5.0')
+        self.assertEqual([self.project.path], listings)
+
+
+    def test_deleteFragments(self):
+        """
+        L{NewsBuilder._deleteFragments} removes all of the news fragments in
+        a directory with a single C{svn rm} command.
+        """
+        commands = []
+        self.patch(_newsbuilder, 'runCommand', commands.append)
+        self.builder._deleteFragments(self.project)
+        self.assertEqual(1, len(commands))
+        self.assertEqual(['svn', 'rm', '--force'], commands[0][:3])
+        self.assertEqual(
+            sorted(child.path for child in self.project.children()
+                   if child.basename() != 'NEWS'),
+            sorted(commands[0][3:]))
+
+
+    def test_buildTraced(self):
+        """
+        L{NewsBuilder.build} records the fragment scan, the rendering and the
+        writing of the I{NEWS} file with its tracer, and counts the files it
+        read and the bytes it wrote.
+        """
+        tracer = Tracer()
+        builder = NewsBuilder(tracer=tracer)
+        news = self.project.child('NEWS')
+        builder.build(self.project, news, 'Some Thing 1.2')
+        self.assertEqual(
+            ['fragment scan', 'render', 'NEWS write'],
+            [event['name'] for event in tracer.events])
+        self.assertEqual(
+            {'filesRead': 12, 'bytesWritten': news.getsize()},
+            tracer.counters)
+
+
+    def test_buildReportsWrite(self):
+        """
+        L{NewsBuilder.build} returns C{True} when it writes the I{NEWS} file.
+        """
+        news = self.project.child('NEWS')
+        self.assertTrue(self.builder.build(self.project, news, 'Some Thing'))
+        self.assertNotEqual(self.existingText, news.getContent())
+
+
+    def test_prependNewsUnchanged(self):
+        """
+        L{NewsBuilder._prependNews} leaves a I{NEWS} file which it would not
+        change alone, modification time included, and returns C{False}.
+        """
+        news = self.project.child('NEWS')
+        os.utime(news.path, (1000000000, 1000000000))
+        self.assertFalse(self.builder._prependNews(news, ''))
+        self.assertEqual(self.existingText, news.getContent())
+        self.assertEqual(1000000000, os.stat(news.path).st_mtime)
+        self.assertFalse(self.project.child('NEWS.new').exists())
+
+
+    def test_buildIndex(self):
+        """
+        L{NewsBuilder.build} keeps an index of the release sections of the
+        I{NEWS} file.
+        """
+        news = self.project.child('NEWS')
+        self.builder.build(self.project, news, 'Twisted Core 1.2 (2015-01-01)')
+        self.builder.build(self.project, news, 'Twisted Core 1.3 (2015-02-01)')
+        index = NewsIndex.load(news)
+        self.assertEqual(
+            [('Core', '1.3', '2015-02-01'), ('Core', '1.2', '2015-01-01')],
+            [(section.name, section.version, section.date)
+             for section in index.sections])
+        self.assertEqual(NewsIndex.scan(news).sections, index.sections)
+
+
+    def test_previewNews(self):
+        """
+        L{NewsBuilder._previewNews} returns the news under the path of the
+        file to which it would be prepended, which it leaves alone.
+        """
+        news = self.project.child('NEWS')
+        self.assertEqual(
+            '==> %s <==\nSome news.\n' % (news.path,),
+            self.builder._previewNews(news, 'Some news.\n'))
+        self.assertEqual(self.existingText, news.getContent())
+
+
+    def test_insertNews(self):
+        """
+        L{NewsBuilder._insertNews} puts the news at the start of the old
+        contents of a I{NEWS} file, or below the ticket hint if they start
+        with it.
+        """
+        self.assertEqual(
+            'New news.\n' + self.existingText,
+            self.builder._insertNews(self.existingText, 'New news.\n'))
+        self.assertEqual(
+            self.builder._TICKET_HINT + 'New news.\n' + self.existingText,
+            self.builder._insertNews(
+                self.builder._TICKET_HINT + self.existingText,
+                'New news.\n'))
+        self.assertEqual(
+            'New news.\n', self.builder._insertNews('', 'New news.\n'))
+
+
+    def test_previewNewsDiff(self):
+        """
+        When asked for a diff, L{NewsBuilder._previewNews} returns a unified
+        diff showing the news inserted below the ticket hint of the I{NEWS}
+        file, with the following lines as context.
+        """
+        news = self.project.child('NEWS')
+        content = (
+            self.builder._TICKET_HINT + 'Old news.\n' + self.existingText +
+            'Older news.\nAncient news.\n')
+        news.setContent(content)
+        self.assertEqual(
+            '--- %(path)s\n'
+            '+++ %(path)s\n'
+            '@@ -1,6 +1,7 @@\n'
+            ' Ticket numbers in this file can be looked up by visiting\n'
+            ' http://twistedmatrix.com/trac/ticket/<number>\n'
+            ' \n'
+            '+New news.\n'
+            ' Old news.\n'
+            ' Here is stuff which was present previously.\n'
+            ' Older news.\n' % {'path': news.path},
+            self.builder._previewNews(news, 'New news.\n', diff=True))
+        self.assertEqual(content, news.getContent())
+
+
+    def test_previewNewsDiffWithoutHint(self):
+        """
+        L{NewsBuilder._previewNews} shows the news inserted at the top of a
+        I{NEWS} file which does not start with the ticket hint.
+        """
+        news = self.project.child('NEWS')
+        self.assertEqual(
+            '--- %(path)s\n'
+            '+++ %(path)s\n'
+            '@@ -1 +1,2 @@\n'
+            '+New news.\n'
+            ' Here is stuff which was present previously.\n' % {
+                'path': news.path},
+            self.builder._previewNews(news, 'New news.\n', diff=True))
+
+
+    def test_removeFragmentsBatched(self):
+        """
+        L{NewsBuilder._removeFragments} splits the fragments over several
+        C{svn rm} commands when they do not fit on one command line.
+        """
+        commands = []
+        self.patch(_newsbuilder, 'runCommand', commands.append)
+        self.patch(_process, '_argumentLimit', lambda: 100)
+        fragments = [self.project.child('%d.misc' % (i,))
+                     for i in range(1000)]
+        self.builder._removeFragments(fragments)
+        self.assertTrue(len(commands) > 1)
+        self.assertEqual(
+            [fragment.path for fragment in fragments],
+            [path for command in commands for path in command[3:]])
+        for command in commands:
+            self.assertEqual(['svn', 'rm', '--force'], command[:3])
+
+
     def test_writeHeader(self):
         """
         L{NewsBuilder._writeHeader} accepts a file-like object opened for
@@ -666,6 +1226,25 @@ class NewsBuilderTests(TestCase, StructureAssertingMixin):
             'Blah blah other stuff.\n')
 
 
+    def test_buildLargeNews(self):
+        """
+        L{NewsBuilder.build} prepends the new section to a I{NEWS} file much
+        larger than the chunks it is copied in, without changing the old
+        content.
+        """
+        news = self.project.child('NEWS')
+        oldNews = ''.join(
+            'Old news item number %d.\n' % (i,) for i in range(50000))
+        news.setContent(self.builder._TICKET_HINT + oldNews)
+
+        self.builder.build(self.project, news, 'Some Thing 1.2')
+
+        newNews = news.getContent()
+        self.assertTrue(newNews.startswith(
+            self.builder._TICKET_HINT + 'Some Thing 1.2\n'))
+        self.assertTrue(newNews.endswith(' - #30, #35\n\n\n' + oldNews))
+
+
     def test_emptySectionsOmitted(self):
         """
         If there are no changes of a particular type (feature, bugfix, etc), no
@@ -744,6 +1323,9 @@ class TwistedBuildStrategyTests(TestCase):
     """
     Tests for L{TwistedBuildStrategy}.
     """
+    def setUp(self):
+        self.cache = useTemporaryCache(self)
+
     def test_today(self):
         """
         L{TwistedBuildStrategy._today} returns today's date in YYYY-MM-DD form.
@@ -755,17 +1337,18 @@ class TwistedBuildStrategyTests(TestCase):
 
     def test_buildAll(self):
         """
-        L{TwistedBuildStrategy.buildAll} calls L{NewsBuilder.build} once for each
-        subproject, passing that subproject's I{topfiles} directory as C{path},
-        the I{NEWS} file in that directory as C{output}, and the subproject's
-        name as C{header}, and then again for each subproject with the
-        top-level I{NEWS} file for C{output}. Blacklisted subprojects are
-        skipped.
+        L{TwistedBuildStrategy.buildAll} renders the news of each subproject
+        once, from that subproject's I{topfiles} directory with the
+        subproject's name as header, and prepends it to the I{NEWS} file in
+        that directory.  It then prepends the news of all the subprojects to
+        the top-level I{NEWS} file at once.
         """
         builds = []
         builder = NewsBuilder()
-        builder.build = lambda path, output, header: builds.append((
-            path, output, header))
+        builder._renderNews = lambda path, header, fragments=None: (
+            '<%s>' % (header,))
+        builder._prependNews = lambda output, news, transaction: (
+            builds.append((output, news)))
 
         project = createFakeTwistedProject(FilePath(self.mktemp()))
         svnCommit(project, repository=FilePath(self.mktemp()))
@@ -773,22 +1356,19 @@ class TwistedBuildStrategyTests(TestCase):
         strategy._today = lambda: '2009-12-01'
         strategy.buildAll(project)
 
-        coreTopfiles = project.child("topfiles")
-        coreNews = coreTopfiles.child("NEWS")
+        coreNews = project.child("topfiles").child("NEWS")
         coreHeader = "Twisted Core 1.2.3 (2009-12-01)"
 
-        conchTopfiles = project.child("conch").child("topfiles")
-        conchNews = conchTopfiles.child("NEWS")
+        conchNews = project.child("conch").child("topfiles").child("NEWS")
         conchHeader = "Twisted Conch 3.4.5 (2009-12-01)"
 
         aggregateNews = project.child("NEWS")
 
         self.assertEqual(
             builds,
-            [(conchTopfiles, conchNews, conchHeader),
-             (conchTopfiles, aggregateNews, conchHeader),
-             (coreTopfiles, coreNews, coreHeader),
-             (coreTopfiles, aggregateNews, coreHeader)])
+            [(conchNews, '<%s>' % (conchHeader,)),
+             (coreNews, '<%s>' % (coreHeader,)),
+             (aggregateNews, '<%s><%s>' % (coreHeader, conchHeader))])
 
 
     def test_buildAllAggregate(self):
@@ -821,6 +1401,7 @@ class TwistedBuildStrategyTests(TestCase):
         strategy = TwistedBuildStrategy(newsBuilder=builder)
         strategy.buildAll(project)
 
+        # NEWS, _version.py, topfiles, conch and .svn
         self.assertEqual(5, len(project.children()))
         output = runCommand(["svn", "status", project.path])
         removed = [line for line in output.splitlines()
@@ -828,12 +1409,336 @@ class TwistedBuildStrategyTests(TestCase):
         self.assertEqual(3, len(removed))
 
 
+    def test_buildAllTraced(self):
+        """
+        L{TwistedBuildStrategy.buildAll} records the discovery of projects,
+        the reading of their versions, the build of each project and the
+        version control commands with its tracer.
+        """
+        commands = []
+        self.patch(_newsbuilder, 'runCommand', fakeVersionControl(commands))
+        tracer = Tracer()
+        project = createFakeTwistedProject(
+            FilePath(self.mktemp()), workingCopy=True)
+        strategy = TwistedBuildStrategy(
+            newsBuilder=NewsBuilder(tracer=tracer), tracer=tracer)
+        strategy.buildAll(project)
+
+        names = [event['name'] for event in tracer.toChromeTrace()[
+            'traceEvents']]
+        self.assertEqual(
+            ['buildAll', 'discovery', 'getVersion', 'getVersion',
+             'project', 'fragment scan', 'render', 'NEWS write',
+             'project', 'fragment scan', 'render', 'NEWS write',
+             'NEWS write', 'svn status', 'commit', 'svn rm', 'counters'],
+            names)
+        self.assertEqual(2, tracer.counters['subprocesses'])
+        self.assertEqual(len(commands), tracer.counters['subprocesses'])
+
+
+    def test_buildAllJobs(self):
+        """
+        With more than one job, L{TwistedBuildStrategy.buildAll} builds the
+        subprojects in a pool of threads, and writes the same news files in
+        the same order as when it builds them one after another, and removes
+        the same fragments at the end.
+        """
+        results = []
+        for jobs in [1, 4]:
+            commands = []
+            self.patch(
+                _newsbuilder, 'runCommand', fakeVersionControl(commands))
+            project = createFakeTwistedProject(
+                FilePath(self.mktemp()), workingCopy=True)
+            strategy = TwistedBuildStrategy(
+                newsBuilder=NewsBuilder(), jobs=jobs)
+            strategy._today = lambda: '2009-12-01'
+            strategy.buildAll(project)
+            news = [
+                project.child("NEWS"),
+                project.child("topfiles").child("NEWS"),
+                project.child("conch").child("topfiles").child("NEWS")]
+            results.append((
+                [path.getContent() for path in news],
+                [command[:2] + sorted(
+                    path[len(project.path):] for path in command[2:])
+                 for command in commands]))
+        self.assertEqual(results[0], results[1])
+        self.assertIn(
+            "Twisted Core 1.2.3 (2009-12-01)", results[1][0][0].split(
+                "Twisted Conch 3.4.5 (2009-12-01)")[0])
+
+
+    def test_buildAllFailure(self):
+        """
+        If the news of any subproject cannot be built,
+        L{TwistedBuildStrategy.buildAll} leaves every news file alone.
+        """
+        self.patch(_newsbuilder, 'runCommand', fakeVersionControl([]))
+        project = createFakeTwistedProject(
+            FilePath(self.mktemp()), workingCopy=True)
+        builder = NewsBuilder()
+        renderNews = builder._renderNews
+        def failingRenderNews(path, header, fragments=None):
+            if 'Core' in header:
+                raise ZeroDivisionError()
+            return renderNews(path, header, fragments)
+        builder._renderNews = failingRenderNews
+        news = [
+            project.child("NEWS"),
+            project.child("topfiles").child("NEWS"),
+            project.child("conch").child("topfiles").child("NEWS")]
+        before = [path.getContent() for path in news]
+        self.assertRaises(
+            ZeroDivisionError,
+            TwistedBuildStrategy(newsBuilder=builder).buildAll, project)
+        self.assertEqual(before, [path.getContent() for path in news])
+        self.assertEqual(
+            [], [path for path in news
+                 if path.sibling("NEWS.new").exists()])
+
+
+    def test_buildAllResumes(self):
+        """
+        If L{TwistedBuildStrategy.buildAll} is interrupted after replacing
+        the news files, the next build removes the fragments left over
+        without building the news again.
+        """
+        runCommand = fakeVersionControl([])
+        def failingRunCommand(args):
+            if args[:2] == ["svn", "rm"]:
+                raise CommandFailed(1, None, 'interrupted')
+            return runCommand(args)
+        self.patch(_newsbuilder, 'runCommand', failingRunCommand)
+        project = createFakeTwistedProject(
+            FilePath(self.mktemp()), workingCopy=True)
+        strategy = TwistedBuildStrategy(newsBuilder=NewsBuilder())
+        self.assertRaises(CommandFailed, strategy.buildAll, project)
+        news = project.child("NEWS").getContent()
+        self.assertIn("Fixed that bug", news)
+        self.assertEqual(
+            strategy._journal(project), strategy.unfinishedBuild(project))
+
+        commands = []
+        self.patch(_newsbuilder, 'runCommand', fakeVersionControl(commands))
+        strategy.buildAll(project)
+        self.assertEqual(news, project.child("NEWS").getContent())
+        self.assertEqual(
+            [["svn", "status"], ["svn", "rm"]],
+            [command[:2] for command in commands])
+        self.assertEqual(3, len(commands[1]) - 3)
+        self.assertIdentical(None, strategy.unfinishedBuild(project))
+
+
+    def test_journal(self):
+        """
+        L{TwistedBuildStrategy._journal} gives a file in the user's cache,
+        rather than in the working copy, named after the base directory.
+        """
+        project = FilePath(self.mktemp())
+        strategy = TwistedBuildStrategy(newsBuilder=NewsBuilder())
+        journal = strategy._journal(project)
+        self.assertEqual(self.cache.child("journal"), journal.parent())
+        self.assertNotEqual(
+            journal, strategy._journal(project.child("twisted")))
+
+
+    def test_rollBack(self):
+        """
+        L{TwistedBuildStrategy.rollBack} restores the news files replaced by
+        a build which failed before removing the fragments, and removes the
+        backups and the journal.
+        """
+        runCommand = fakeVersionControl([])
+        def failingRunCommand(args):
+            if args[:2] == ["svn", "rm"]:
+                raise CommandFailed(1, None, 'interrupted')
+            return runCommand(args)
+        self.patch(_newsbuilder, 'runCommand', failingRunCommand)
+        project = createFakeTwistedProject(
+            FilePath(self.mktemp()), workingCopy=True)
+        news = project.child("NEWS").getContent()
+        strategy = TwistedBuildStrategy(newsBuilder=NewsBuilder())
+        self.assertRaises(CommandFailed, strategy.buildAll, project)
+        self.assertTrue(project.child("NEWS.old").exists())
+
+        self.assertTrue(strategy.rollBack(project))
+        self.assertEqual(news, project.child("NEWS").getContent())
+        self.assertFalse(project.child("NEWS.old").exists())
+        self.assertIdentical(None, strategy.unfinishedBuild(project))
+        self.assertFalse(strategy.rollBack(project))
+
+
+    def test_buildAllResumesRendering(self):
+        """
+        With C{resume} set, L{TwistedBuildStrategy.buildAll} reuses the news
+        rendered by a build which failed for the subprojects whose fragments
+        did not change, and writes the same news as a build which did not
+        fail.
+        """
+        self.patch(_newsbuilder, 'runCommand', fakeVersionControl([]))
+        expected = createFakeTwistedProject(
+            FilePath(self.mktemp()), workingCopy=True)
+        strategy = TwistedBuildStrategy(newsBuilder=NewsBuilder())
+        strategy._today = lambda: '2009-12-01'
+        strategy.buildAll(expected)
+
+        project = createFakeTwistedProject(
+            FilePath(self.mktemp()), workingCopy=True)
+        builder = NewsBuilder()
+        renderNews = builder._renderNews
+        rendered = []
+        def failingRenderNews(path, header, fragments=None):
+            rendered.append(header)
+            if 'Core' in header:
+                raise ZeroDivisionError()
+            return renderNews(path, header, fragments)
+        builder._renderNews = failingRenderNews
+        tracer = Tracer()
+        strategy = TwistedBuildStrategy(
+            newsBuilder=builder, tracer=tracer, resume=True)
+        strategy._today = lambda: '2009-12-01'
+        self.assertRaises(ZeroDivisionError, strategy.buildAll, project)
+        self.assertTrue(strategy._progressPath(project).exists())
+
+        del rendered[:]
+        builder._renderNews = lambda path, header, fragments=None: (
+            rendered.append(header) or renderNews(path, header, fragments))
+        strategy.buildAll(project)
+        self.assertEqual(["Twisted Core 1.2.3 (2009-12-01)"], rendered)
+        self.assertEqual(1, tracer.counters['projectsResumed'])
+        for path in [[], ["topfiles"], ["conch", "topfiles"]]:
+            self.assertEqual(
+                expected.descendant(path + ["NEWS"]).getContent(),
+                project.descendant(path + ["NEWS"]).getContent())
+        self.assertFalse(strategy._progressPath(project).exists())
+
+
+    def test_progressPath(self):
+        """
+        L{TwistedBuildStrategy._progressPath} gives a file in the user's
+        cache, rather than in the working copy, named after the base
+        directory.
+        """
+        project = FilePath(self.mktemp())
+        strategy = TwistedBuildStrategy(newsBuilder=NewsBuilder())
+        path = strategy._progressPath(project)
+        self.assertEqual(self.cache.child("progress"), path.parent())
+        self.assertNotEqual(
+            path, strategy._progressPath(project.child("twisted")))
+
+
+    def test_buildAllRecordsNoProgress(self):
+        """
+        L{TwistedBuildStrategy.buildAll} does not write the progress of a
+        build which succeeds, since no build would resume from it.
+        """
+        self.patch(_newsbuilder, 'runCommand', fakeVersionControl([]))
+        project = createFakeTwistedProject(
+            FilePath(self.mktemp()), workingCopy=True)
+        strategy = TwistedBuildStrategy(newsBuilder=NewsBuilder(), resume=True)
+        strategy.buildAll(project)
+        self.assertFalse(self.cache.child("progress").exists())
+
+
+    def test_buildAllWithoutResume(self):
+        """
+        Without C{resume} set, L{TwistedBuildStrategy.buildAll} renders the
+        news of every subproject again after a build which failed.
+        """
+        self.patch(_newsbuilder, 'runCommand', fakeVersionControl([]))
+        project = createFakeTwistedProject(
+            FilePath(self.mktemp()), workingCopy=True)
+        builder = NewsBuilder()
+        renderNews = builder._renderNews
+        def failingRenderNews(path, header, fragments=None):
+            if 'Core' in header:
+                raise ZeroDivisionError()
+            return renderNews(path, header, fragments)
+        builder._renderNews = failingRenderNews
+        strategy = TwistedBuildStrategy(newsBuilder=builder)
+        self.assertRaises(ZeroDivisionError, strategy.buildAll, project)
+
+        rendered = []
+        builder._renderNews = lambda path, header, fragments=None: (
+            rendered.append(header) or renderNews(path, header, fragments))
+        strategy.buildAll(project)
+        self.assertEqual(2, len(rendered))
+
+
+    def test_previewAll(self):
+        """
+        L{TwistedBuildStrategy.previewAll} writes the news of each subproject
+        in alphabetical order and then that of the top-level I{NEWS} file,
+        changing no files, not even the manifest, and running no commands.
+        """
+        self.patch(_newsbuilder, 'runCommand', self.fail)
+        builder = NewsBuilder()
+        builder._renderNews = lambda path, header, fragments=None: (
+            '<%s>\n' % (header,))
+        project = createFakeTwistedProject(FilePath(self.mktemp()))
+        # A manifest of another search, which a new search would replace.
+        manifest = project.child("projects.json")
+        findTwistedProjects(project, exclude=["docs"], manifest=manifest)
+        before = [(path.path, path.getContent())
+                  for path in project.walk() if path.isfile()]
+        strategy = TwistedBuildStrategy(
+            newsBuilder=builder, manifest=manifest)
+        strategy._today = lambda: '2009-12-01'
+        output = StringIO()
+        strategy.previewAll(project, output)
+
+        coreHeader = "<Twisted Core 1.2.3 (2009-12-01)>\n"
+        conchHeader = "<Twisted Conch 3.4.5 (2009-12-01)>\n"
+        self.assertEqual(
+            '==> %s <==\n%s'
+            '==> %s <==\n%s'
+            '==> %s <==\n%s%s' % (
+                project.child("topfiles").child("NEWS").path,
+                coreHeader,
+                project.child("conch").child("topfiles").child("NEWS").path,
+                conchHeader,
+                project.child("NEWS").path,
+                coreHeader, conchHeader),
+            output.getvalue())
+        self.assertEqual(
+            before,
+            [(path.path, path.getContent())
+             for path in project.walk() if path.isfile()])
+
+        missing = FilePath(self.mktemp())
+        strategy = TwistedBuildStrategy(newsBuilder=builder, manifest=missing)
+        strategy.previewAll(project, StringIO())
+        self.assertFalse(missing.exists())
+
+
+    def test_previewAllDiff(self):
+        """
+        When asked for a diff, L{TwistedBuildStrategy.previewAll} writes the
+        changes to each I{NEWS} file as a unified diff.
+        """
+        self.patch(_newsbuilder, 'runCommand', self.fail)
+        project = createFakeTwistedProject(FilePath(self.mktemp()))
+        strategy = TwistedBuildStrategy(newsBuilder=NewsBuilder())
+        output = StringIO()
+        strategy.previewAll(project, output, diff=True)
+        self.assertEqual(
+            ['--- ' + project.child("topfiles").child("NEWS").path,
+             '--- ' + project.child("conch").child("topfiles").child(
+                 "NEWS").path,
+             '--- ' + project.child("NEWS").path],
+            [line for line in output.getvalue().splitlines()
+             if line.startswith('--- ')])
+        self.assertIn('+ - Fixed that bug. (#7)\n', output.getvalue())
+        self.assertIn(' Old boring stuff from the past.\n', output.getvalue())
+
+
     def test_checkSVN(self):
         """
         L{TwistedBuildStrategy.buildAll} raises L{NotWorkingDirectory} when the
         given path is not a SVN checkout.
         """
-        strategy = TwistedBuildStrategy(newsBuilder=object())
+        strategy = TwistedBuildStrategy(newsBuilder=object(), vcs="svn")
         self.assertRaises(
             NotWorkingDirectory,
             strategy.buildAll,
@@ -841,6 +1746,319 @@ class TwistedBuildStrategyTests(TestCase):
         )
 
 
+    def test_checkSVNWithoutRunningIt(self):
+        """
+        L{TwistedBuildStrategy.buildAll} recognizes a Subversion working copy
+        without running C{svn info}.
+        """
+        commands = []
+        self.patch(_newsbuilder, 'runCommand', fakeVersionControl(commands))
+        strategy = TwistedBuildStrategy(newsBuilder=NewsBuilder())
+        strategy.buildAll(createFakeTwistedProject(
+            FilePath(self.mktemp()), workingCopy=True))
+        self.assertEqual(
+            [["svn", "status"], ["svn", "rm"]],
+            [command[:2] for command in commands])
+
+
+    def test_notWorkingCopy(self):
+        """
+        L{TwistedBuildStrategy.buildAll} raises L{NotWorkingDirectory} without
+        running any command when the given path is in no working copy with a
+        backend, and no backend was named.
+        """
+        commands = []
+        self.patch(_newsbuilder, 'runCommand', commands.append)
+        self.patch(_newsbuilder, 'chooseBackend', lambda directory: None)
+        project = createFakeTwistedProject(FilePath(self.mktemp()))
+        strategy = TwistedBuildStrategy(newsBuilder=NewsBuilder())
+        self.assertRaises(NotWorkingDirectory, strategy.buildAll, project)
+        self.assertEqual([], commands)
+        self.assertEqual(
+            'Old boring stuff from the past.\n',
+            project.child("NEWS").getContent())
+
+
+    def test_buildAllGit(self):
+        """
+        L{TwistedBuildStrategy.buildAll} removes the fragments of a Git
+        working copy with C{git rm}, in a single command, once a single
+        C{git ls-files} found that they are all under version control.
+        """
+        commands = []
+        self.patch(_newsbuilder, 'runCommand', fakeVersionControl(commands))
+        project = createFakeTwistedProject(FilePath(self.mktemp()))
+        project.child(".git").makedirs()
+        strategy = TwistedBuildStrategy(newsBuilder=NewsBuilder())
+        strategy.buildAll(project)
+        fragments = sorted([
+            project.descendant(["topfiles", "3.feature"]).path,
+            project.descendant(["topfiles", "5.misc"]).path,
+            project.descendant(["conch", "topfiles", "7.bugfix"]).path])
+        self.assertEqual(2, len(commands))
+        self.assertEqual(["git", "-C"], commands[0][:2])
+        self.assertEqual(
+            ["ls-files", "-z", "--others", "--"], commands[0][3:7])
+        self.assertEqual(fragments, sorted(commands[0][7:]))
+        self.assertEqual(["git", "-C"], commands[1][:2])
+        self.assertEqual(["rm", "-q", "-f", "--"], commands[1][3:7])
+        self.assertEqual(fragments, sorted(commands[1][7:]))
+        self.assertIn("Fixed that bug.", project.child("NEWS").getContent())
+
+
+    def test_buildAllIndexDiscovery(self):
+        """
+        When L{TwistedBuildStrategy.discovery} is C{"index"},
+        L{TwistedBuildStrategy.buildAll} finds the projects and their
+        fragments among the files listed by a single version control command,
+        ignoring the fragments which are not under version control.
+        """
+        project = createFakeTwistedProject(FilePath(self.mktemp()))
+        project.child(".git").makedirs()
+        topfiles = project.child("topfiles")
+        topfiles.child("9.feature").setContent("Scratch work.\n")
+        conch = project.descendant(["conch", "topfiles"])
+        tracked = [
+            "NEWS", "_version.py", "topfiles/NEWS", "topfiles/3.feature",
+            "topfiles/5.misc", "topfiles/11.misc", "conch/_version.py",
+            "conch/topfiles/NEWS", "conch/topfiles/7.bugfix"]
+        commands = []
+
+        def runCommand(args, output=None):
+            commands.append(args)
+            if args[3:] == ["ls-files", "-z"]:
+                output("\0".join(tracked) + "\0")
+            return ""
+        self.patch(_newsbuilder, 'runCommand', runCommand)
+        # Nothing is searched for or listed.
+        self.patch(_newsbuilder, 'findTwistedProjects', None)
+        self.patch(FilePath, 'listdir', None)
+        self.patch(FilePath, 'children', None)
+        strategy = TwistedBuildStrategy(
+            newsBuilder=NewsBuilder(), discovery="index")
+        strategy.buildAll(project)
+
+        self.assertEqual(
+            [["git", "-C", project.path, "ls-files", "-z"]], commands[:1])
+        self.assertEqual(2, len(commands))
+        self.assertEqual(
+            sorted([topfiles.child("3.feature").path,
+                    topfiles.child("5.misc").path,
+                    conch.child("7.bugfix").path]),
+            sorted(commands[1][7:]))
+        news = project.child("NEWS").getContent()
+        self.assertIn("Third feature addition.", news)
+        self.assertIn("Fixed that bug.", news)
+        self.assertNotIn("Scratch work.", news)
+        self.assertEqual("Scratch work.\n",
+                         topfiles.child("9.feature").getContent())
+
+
+    def test_buildAllFilesystem(self):
+        """
+        L{TwistedBuildStrategy.buildAll} deletes the fragments itself, without
+        running any command or checking for a working copy, when
+        L{TwistedBuildStrategy.vcs} is C{"filesystem"}.
+        """
+        commands = []
+        self.patch(_newsbuilder, 'runCommand', commands.append)
+        self.patch(_newsbuilder, 'chooseBackend', lambda directory: None)
+        project = createFakeTwistedProject(FilePath(self.mktemp()))
+        strategy = TwistedBuildStrategy(
+            newsBuilder=NewsBuilder(), vcs="filesystem")
+        strategy.buildAll(project)
+        self.assertEqual([], commands)
+        for topfiles in [project.child("topfiles"),
+                         project.descendant(["conch", "topfiles"])]:
+            self.assertEqual(
+                [], strategy.newsBuilder._findFragments(topfiles))
+        self.assertIn("Fixed that bug.", project.child("NEWS").getContent())
+
+
+    def _commitFakeTwistedProject(self):
+        """
+        Create a fake Twisted project in a new Git repository, and commit it.
+
+        @return: The L{FilePath} of the repository.
+        """
+        repository = FilePath(self.mktemp())
+        createFakeTwistedProject(repository)
+        for args in [["init", "-q"], ["add", "-A"],
+                     ["commit", "-q", "-m", "Add the project."]]:
+            subprocess.check_call(
+                ["git", "-C", repository.path, "-c", "user.name=Test",
+                 "-c", "user.email=test@example.invalid"] + args)
+        return repository
+
+
+    def test_buildAllLeavesNoUnknownFiles(self):
+        """
+        L{TwistedBuildStrategy.buildAll} leaves no file unknown to the
+        version control system in the working tree.
+        """
+        repository = self._commitFakeTwistedProject()
+        strategy = TwistedBuildStrategy(newsBuilder=NewsBuilder())
+        strategy.buildAll(repository.child("twisted"))
+        status = subprocess.check_output(
+            ["git", "-C", repository.path, "status", "--porcelain",
+             "--untracked-files=all"])
+        self.assertEqual(
+            [], [line for line in status.splitlines()
+                 if line.startswith("??")])
+
+
+    def test_buildAllGitModifiedFragments(self):
+        """
+        L{TwistedBuildStrategy.buildAll} removes the fragments of a Git
+        working tree which were modified, or staged, since they were
+        committed, their news having been built from their new contents.
+        """
+        repository = self._commitFakeTwistedProject()
+        project = repository.child("twisted")
+        modified = project.descendant(["conch", "topfiles", "7.bugfix"])
+        modified.setContent("Fixed that other bug.\n")
+        staged = project.descendant(["topfiles", "3.feature"])
+        staged.setContent("Staged feature.\n")
+        subprocess.check_call(
+            ["git", "-C", repository.path, "add", staged.path])
+        strategy = TwistedBuildStrategy(newsBuilder=NewsBuilder())
+        strategy.buildAll(project)
+
+        news = project.child("NEWS").getContent()
+        self.assertIn("Fixed that other bug.", news)
+        self.assertIn("Staged feature.", news)
+        self.assertFalse(modified.exists())
+        self.assertFalse(staged.exists())
+        removed = subprocess.check_output(
+            ["git", "-C", repository.path, "diff", "--cached", "--name-only",
+             "--diff-filter=D"])
+        self.assertEqual(
+            ["twisted/conch/topfiles/7.bugfix", "twisted/topfiles/3.feature",
+             "twisted/topfiles/5.misc"],
+            sorted(removed.splitlines()))
+        self.assertIdentical(None, strategy.unfinishedBuild(project))
+
+
+    def test_buildAllGitUnversionedFragment(self):
+        """
+        L{TwistedBuildStrategy.buildAll} removes the fragments of a Git
+        working tree which are not under version control from the disk, and
+        the others with C{git rm}, leaving no journal or backups behind.
+        """
+        repository = self._commitFakeTwistedProject()
+        project = repository.child("twisted")
+        untracked = project.descendant(["topfiles", "9.feature"])
+        untracked.setContent("Not added yet.\n")
+        strategy = TwistedBuildStrategy(newsBuilder=NewsBuilder())
+        strategy.buildAll(project)
+
+        self.assertIn("Not added yet.", project.child("NEWS").getContent())
+        self.assertFalse(untracked.exists())
+        removed = subprocess.check_output(
+            ["git", "-C", repository.path, "diff", "--cached", "--name-only",
+             "--diff-filter=D"])
+        self.assertEqual(
+            ["twisted/conch/topfiles/7.bugfix", "twisted/topfiles/3.feature",
+             "twisted/topfiles/5.misc"],
+            sorted(removed.splitlines()))
+        self.assertIdentical(None, strategy.unfinishedBuild(project))
+        self.assertFalse(project.child("NEWS.old").exists())
+
+
+    def test_buildRevision(self):
+        """
+        L{TwistedBuildStrategy.buildRevision} writes the news files which
+        L{TwistedBuildStrategy.buildAll} would write for a tree of a Git
+        revision to the output directory, reading the revision rather than
+        the working tree, which is left alone.
+        """
+        repository = self._commitFakeTwistedProject()
+        project = repository.child("twisted")
+        fragment = project.descendant(["conch", "topfiles", "7.bugfix"])
+        fragment.setContent("Not committed.\n")
+        output = FilePath(self.mktemp())
+        strategy = TwistedBuildStrategy(newsBuilder=NewsBuilder())
+        strategy._today = lambda: "2009-12-01"
+        strategy.buildRevision(repository, "HEAD:twisted", output)
+
+        self.assertEqual("Not committed.\n", fragment.getContent())
+        self.assertEqual(
+            "Old conch news.\n",
+            project.descendant(["conch", "topfiles", "NEWS"]).getContent())
+        fragment.setContent("Fixed that bug.\n")
+        self.patch(_newsbuilder, 'chooseBackend', lambda directory: None)
+        strategy = TwistedBuildStrategy(
+            newsBuilder=NewsBuilder(), vcs="filesystem")
+        strategy._today = lambda: "2009-12-01"
+        strategy.buildAll(project)
+        for segments in [["NEWS"], ["topfiles", "NEWS"],
+                         ["conch", "topfiles", "NEWS"]]:
+            self.assertEqual(
+                project.descendant(segments).getContent(),
+                output.descendant(segments).getContent())
+        self.assertEqual(
+            [["NEWS"], ["conch", "topfiles", "NEWS"], ["topfiles", "NEWS"]],
+            sorted(path.segmentsFrom(output) for path in output.walk()
+                   if path.isfile()))
+
+
+    def test_buildRevisionRoot(self):
+        """
+        Given a whole revision, L{TwistedBuildStrategy.buildRevision} writes
+        the news files at their paths in the revision, and the news of all
+        the projects to I{NEWS} in the output directory, which is new if the
+        revision has no I{NEWS} file at its root.  No fragment is removed.
+        """
+        repository = self._commitFakeTwistedProject()
+        output = FilePath(self.mktemp())
+        strategy = TwistedBuildStrategy(newsBuilder=NewsBuilder())
+        strategy._today = lambda: "2009-12-01"
+        strategy.buildRevision(repository, "HEAD", output)
+
+        core = output.descendant(["twisted", "topfiles", "NEWS"]).getContent()
+        self.assertTrue(core.startswith("Twisted Core 1.2.3 (2009-12-01)\n"))
+        self.assertTrue(core.endswith("\nOld core news.\n"))
+        news = output.child("NEWS").getContent()
+        self.assertTrue(news.startswith("Twisted Core 1.2.3 (2009-12-01)\n"))
+        self.assertIn("Twisted Conch 3.4.5 (2009-12-01)\n", news)
+        self.assertNotIn("Old", news)
+        self.assertFalse(output.child("twisted").child("NEWS").exists())
+        self.assertTrue(repository.descendant(
+            ["twisted", "conch", "topfiles", "7.bugfix"]).exists())
+
+
+    def test_buildRevisionMissing(self):
+        """
+        L{TwistedBuildStrategy.buildRevision} raises L{CommandFailed} for a
+        revision which does not exist, without writing anything.
+        """
+        repository = self._commitFakeTwistedProject()
+        output = FilePath(self.mktemp())
+        strategy = TwistedBuildStrategy(newsBuilder=NewsBuilder())
+        self.assertRaises(
+            CommandFailed, strategy.buildRevision, repository, "no-such-tag",
+            output)
+        self.assertFalse(output.exists())
+
+
+    def test_checkSVNOldFormat(self):
+        """
+        L{TwistedBuildStrategy.buildAll} runs C{svn info} to check a
+        directory which looks like it is in a Subversion working copy in an
+        older format.
+        """
+        commands = []
+        def runCommand(args):
+            commands.append(args)
+            raise CommandFailed(1, None, '')
+        self.patch(_newsbuilder, 'runCommand', runCommand)
+        project = createFakeTwistedProject(FilePath(self.mktemp()))
+        project.child(".svn").makedirs()
+        strategy = TwistedBuildStrategy(newsBuilder=NewsBuilder())
+        self.assertRaises(NotWorkingDirectory, strategy.buildAll, project)
+        self.assertEqual([["svn", "info", project.path]], commands)
+
+
 
 class NewsBuilderOptionsTests(TestCase):
     """
@@ -856,6 +2074,257 @@ class NewsBuilderOptionsTests(TestCase):
         self.assertEqual(FilePath(expectedPath), options['repositoryPath'])
 
 
+    def test_exclude(self):
+        """
+        L{NewsbuilderOptions} accepts any number of I{--exclude} options and
+        collects their patterns in a list.
+        """
+        options = NewsBuilderOptions()
+        options.parseOptions(['/path/to/repo'])
+        self.assertEqual([], options['exclude'])
+
+        options = NewsBuilderOptions()
+        options.parseOptions(
+            ['--exclude', 'docs', '--exclude', '*.tmp', '/path/to/repo'])
+        self.assertEqual(['docs', '*.tmp'], options['exclude'])
+
+
+    def test_trace(self):
+        """
+        L{NewsbuilderOptions} accepts a I{--trace} option naming the file to
+        which to write a trace of the run.
+        """
+        options = NewsBuilderOptions()
+        options.parseOptions(['/path/to/repo'])
+        self.assertEqual(None, options['trace'])
+
+        options = NewsBuilderOptions()
+        options.parseOptions(['--trace', 'trace.json', '/path/to/repo'])
+        self.assertEqual('trace.json', options['trace'])
+
+
+    def test_dryRun(self):
+        """
+        L{NewsbuilderOptions} accepts a I{--dry-run} flag, also spelt
+        I{-n} or I{--preview}, and a I{--diff} flag which implies it.
+        """
+        for args, dryRun, diff in [
+                ([], False, False),
+                (['--dry-run'], True, False),
+                (['-n'], True, False),
+                (['--preview'], True, False),
+                (['--diff'], True, True)]:
+            options = NewsBuilderOptions()
+            options.parseOptions(args + ['/path/to/repo'])
+            self.assertEqual(
+                (dryRun, diff),
+                (bool(options['dry-run']), bool(options['diff'])))
+
+
+    def test_jobs(self):
+        """
+        L{NewsbuilderOptions} accepts a I{--jobs} option giving the number of
+        projects to build at the same time, which defaults to 1 and must be
+        positive.
+        """
+        options = NewsBuilderOptions()
+        options.parseOptions(['/path/to/repo'])
+        self.assertEqual(1, options['jobs'])
+
+        options = NewsBuilderOptions()
+        options.parseOptions(['--jobs', '4', '/path/to/repo'])
+        self.assertEqual(4, options['jobs'])
+
+        options = NewsBuilderOptions()
+        self.assertRaises(
+            usage.UsageError, options.parseOptions,
+            ['--jobs', '0', '/path/to/repo'])
+
+
+    def test_commandTimeout(self):
+        """
+        L{NewsBuilderOptions} accepts a I{--command-timeout} option giving the
+        number of seconds after which to kill commands, which must be
+        positive.
+        """
+        options = NewsBuilderOptions()
+        options.parseOptions(['/path/to/repo'])
+        self.assertIdentical(None, options['command-timeout'])
+
+        options = NewsBuilderOptions()
+        options.parseOptions(['--command-timeout', '2.5', '/path/to/repo'])
+        self.assertEqual(2.5, options['command-timeout'])
+
+        options = NewsBuilderOptions()
+        self.assertRaises(
+            usage.UsageError, options.parseOptions,
+            ['--command-timeout', '0', '/path/to/repo'])
+
+
+    def test_maxProcesses(self):
+        """
+        L{NewsBuilderOptions} accepts a I{--max-processes} option giving the
+        number of commands which may run at once, which is 8 by default and
+        must be at least 1.
+        """
+        options = NewsBuilderOptions()
+        options.parseOptions(['/path/to/repo'])
+        self.assertEqual(8, options['max-processes'])
+
+        options = NewsBuilderOptions()
+        options.parseOptions(['--max-processes', '2', '/path/to/repo'])
+        self.assertEqual(2, options['max-processes'])
+
+        options = NewsBuilderOptions()
+        self.assertRaises(
+            usage.UsageError, options.parseOptions,
+            ['--max-processes', '0', '/path/to/repo'])
+
+
+    def test_vcs(self):
+        """
+        L{NewsBuilderOptions} accepts a I{--vcs} option naming the version
+        control backend, which is chosen from the working copy by default.
+        """
+        options = NewsBuilderOptions()
+        options.parseOptions(['/path/to/repo'])
+        self.assertIdentical(None, options['vcs'])
+
+        for name in ['svn', 'git', 'filesystem']:
+            options = NewsBuilderOptions()
+            options.parseOptions(['--vcs', name, '/path/to/repo'])
+            self.assertEqual(name, options['vcs'])
+
+        options = NewsBuilderOptions()
+        self.assertRaises(
+            usage.UsageError, options.parseOptions,
+            ['--vcs', 'cvs', '/path/to/repo'])
+
+
+    def test_discovery(self):
+        """
+        L{NewsBuilderOptions} accepts a I{--discovery} option, which is
+        either I{walk}, the default, or I{index}.
+        """
+        options = NewsBuilderOptions()
+        options.parseOptions(['/path/to/repo'])
+        self.assertEqual('walk', options['discovery'])
+
+        options = NewsBuilderOptions()
+        options.parseOptions(['--discovery', 'index', '/path/to/repo'])
+        self.assertEqual('index', options['discovery'])
+
+        options = NewsBuilderOptions()
+        self.assertRaises(
+            usage.UsageError, options.parseOptions,
+            ['--discovery', 'find', '/path/to/repo'])
+
+
+    def test_revision(self):
+        """
+        L{NewsBuilderOptions} accepts a I{--revision} option, which must be
+        given with I{--output-directory} and cannot be used with
+        I{--dry-run}.
+        """
+        options = NewsBuilderOptions()
+        options.parseOptions(['/path/to/repo'])
+        self.assertEqual(
+            (None, None), (options['revision'], options['output-directory']))
+
+        options = NewsBuilderOptions()
+        options.parseOptions(
+            ['--revision', 'v1.0', '--output-directory', '/out',
+             '/path/to/repo'])
+        self.assertEqual(
+            ('v1.0', '/out'),
+            (options['revision'], options['output-directory']))
+
+        for args in [['--revision', 'v1.0'], ['--output-directory', '/out'],
+                     ['--revision', 'v1.0', '--output-directory', '/out',
+                      '--dry-run'],
+                     ['--revision', 'v1.0', '--output-directory', '/out',
+                      '--diff']]:
+            options = NewsBuilderOptions()
+            self.assertRaises(
+                usage.UsageError, options.parseOptions,
+                args + ['/path/to/repo'])
+
+
+    def test_rollBack(self):
+        """
+        L{NewsBuilderOptions} accepts a I{--roll-back} flag, which is off by
+        default and cannot be used with I{--dry-run} or I{--revision}.
+        """
+        options = NewsBuilderOptions()
+        options.parseOptions(['/path/to/repo'])
+        self.assertFalse(options['roll-back'])
+
+        options = NewsBuilderOptions()
+        options.parseOptions(['--roll-back', '/path/to/repo'])
+        self.assertTrue(options['roll-back'])
+
+        for args in [['--dry-run'], ['--diff'],
+                     ['--revision', 'v1.0', '--output-directory', '/out']]:
+            options = NewsBuilderOptions()
+            self.assertRaises(
+                usage.UsageError, options.parseOptions,
+                ['--roll-back'] + args + ['/path/to/repo'])
+
+
+    def test_resume(self):
+        """
+        L{NewsBuilderOptions} accepts a I{--resume} flag, which is off by
+        default.
+        """
+        options = NewsBuilderOptions()
+        options.parseOptions(['/path/to/repo'])
+        self.assertFalse(options['resume'])
+
+        options = NewsBuilderOptions()
+        options.parseOptions(['--resume', '/path/to/repo'])
+        self.assertTrue(options['resume'])
+
+
+
+class LazyImportTests(TestCase):
+    """
+    Tests for the lazy loading of the public names of L{newsbuilder}.
+    """
+    def test_importDoesNotLoadTwisted(self):
+        """
+        Importing L{newsbuilder} does not import Twisted, run version control
+        commands to compute C{__version__} or import the implementation
+        module.
+        """
+        script = (
+            'import sys, newsbuilder\n'
+            'sys.stdout.write(repr(sorted(\n'
+            '    name for name in sys.modules\n'
+            '    if sys.modules[name] is not None and (\n'
+            '        name.startswith("twisted") or\n'
+            '        name.startswith("newsbuilder.") or\n'
+            '        name == "subprocess"))))\n')
+        environ = dict(os.environ)
+        environ['PYTHONPATH'] = _packageParent
+        output = subprocess.check_output(
+            [sys.executable, '-c', script], env=environ)
+        self.assertEqual('[]', output)
+
+
+    def test_publicNames(self):
+        """
+        All of the names in C{newsbuilder.__all__} are available as
+        attributes of the package, and are the objects defined in
+        L{newsbuilder._newsbuilder}.
+        """
+        import newsbuilder
+        for name in newsbuilder.__all__:
+            if name != '__version__':
+                self.assertIdentical(
+                    getattr(_newsbuilder, name), getattr(newsbuilder, name))
+        self.assertEqual(__version__, newsbuilder.__version__)
+
+
 
 class FakeBuildStrategy(object):
     """
@@ -867,6 +2336,10 @@ class FakeBuildStrategy(object):
         Initialise lists for recording method calls.
         """
         self.buildAllCalls = []
+        self.previewAllCalls = []
+        self.buildRevisionCalls = []
+        self.rollBackCalls = []
+        self.unfinished = None
 
 
     def buildAll(self, baseDirectory):
@@ -876,6 +2349,38 @@ class FakeBuildStrategy(object):
         self.buildAllCalls.append(baseDirectory)
 
 
+    def previewAll(self, baseDirectory, output, diff=False):
+        """
+        Record calls to L{previewAll}.
+        """
+        self.previewAllCalls.append((baseDirectory, output, diff))
+
+
+    def buildRevision(self, repository, revision, outputDirectory):
+        """
+        Record calls to L{buildRevision}.
+        """
+        self.buildRevisionCalls.append(
+            (repository, revision, outputDirectory))
+
+
+    def unfinishedBuild(self, baseDirectory):
+        """
+        Return C{self.unfinished}, the journal of an unfinished build, if
+        any.
+        """
+        return self.unfinished
+
+
+    def rollBack(self, baseDirectory):
+        """
+        Record calls to L{rollBack}, returning whether there was an
+        unfinished build.
+        """
+        self.rollBackCalls.append(baseDirectory)
+        return self.unfinished is not None
+
+
 
 class NewsBuilderScriptTests(TestCase):
     """
@@ -941,3 +2446,186 @@ class NewsBuilderScriptTests(TestCase):
             [FilePath(expectedPath)],
             fakeBuildStrategy.buildAllCalls
         )
+
+
+    def test_mainDryRun(self):
+        """
+        When given I{--dry-run}, L{NewsBuilderScript.main} calls
+        C{self.buildStrategy.previewAll} with the repository directory path
+        and its stdout instead of C{buildAll}.
+        """
+        stdout = io.BytesIO()
+        fakeBuildStrategy = FakeBuildStrategy()
+        script = NewsBuilderScript(
+            buildStrategy=fakeBuildStrategy, stdout=stdout)
+        script.main(['--dry-run', '/foo/bar/baz'])
+        script.main(['--diff', '/foo/bar/baz'])
+        self.assertEqual([], fakeBuildStrategy.buildAllCalls)
+        self.assertEqual(
+            [(FilePath('/foo/bar/baz'), stdout, False),
+             (FilePath('/foo/bar/baz'), stdout, True)],
+            fakeBuildStrategy.previewAllCalls)
+
+
+    def test_mainBuildRevision(self):
+        """
+        When given I{--revision}, L{NewsBuilderScript.main} calls
+        C{self.buildStrategy.buildRevision} with the repository path, the
+        revision and the output directory instead of C{buildAll}.
+        """
+        fakeBuildStrategy = FakeBuildStrategy()
+        script = NewsBuilderScript(buildStrategy=fakeBuildStrategy)
+        script.main(['--revision', 'v1.0', '--output-directory', '/out',
+                     '/foo/bar/baz'])
+        self.assertEqual([], fakeBuildStrategy.buildAllCalls)
+        self.assertEqual(
+            [(FilePath('/foo/bar/baz'), 'v1.0', FilePath('/out'))],
+            fakeBuildStrategy.buildRevisionCalls)
+
+
+    def test_mainRollBack(self):
+        """
+        When given I{--roll-back}, L{NewsBuilderScript.main} calls
+        C{self.buildStrategy.rollBack} with the repository path instead of
+        C{buildAll}, and exits with an error if there was no unfinished
+        build.
+        """
+        stderr = io.BytesIO()
+        fakeBuildStrategy = FakeBuildStrategy()
+        fakeBuildStrategy.unfinished = FilePath('/cache/journal.json')
+        script = NewsBuilderScript(
+            buildStrategy=fakeBuildStrategy, stderr=stderr)
+        script.main(['--roll-back', '/foo/bar/baz'])
+        self.assertEqual([], fakeBuildStrategy.buildAllCalls)
+        self.assertEqual(
+            [FilePath('/foo/bar/baz')], fakeBuildStrategy.rollBackCalls)
+        self.assertEqual(b'', stderr.getvalue())
+
+        fakeBuildStrategy.unfinished = None
+        error = self.assertRaises(
+            SystemExit, script.main, ['--roll-back', '/foo/bar/baz'])
+        self.assertEqual(
+            (1, b'ERROR: There is no unfinished build of /foo/bar/baz.\n'),
+            (error.code, stderr.getvalue()))
+
+
+    def test_mainReportsUnfinishedBuild(self):
+        """
+        When C{self.buildStrategy.buildAll} fails after replacing the news
+        files, L{NewsBuilderScript.main} tells how to finish or undo the
+        build, and where its journal is, before letting the failure through.
+        """
+        stderr = io.BytesIO()
+        fakeBuildStrategy = FakeBuildStrategy()
+        def buildAll(baseDirectory):
+            fakeBuildStrategy.unfinished = FilePath('/cache/journal.json')
+            raise CommandFailed(1, None, 'interrupted')
+        fakeBuildStrategy.buildAll = buildAll
+        script = NewsBuilderScript(
+            buildStrategy=fakeBuildStrategy, stderr=stderr)
+        self.assertRaises(CommandFailed, script.main, ['/foo/bar/baz'])
+        message = stderr.getvalue()
+        self.assertIn(b'/foo/bar/baz', message)
+        self.assertIn(b'--roll-back', message)
+        self.assertIn(b'/cache/journal.json', message)
+
+
+    def test_mainFailureBeforeReplacing(self):
+        """
+        When C{self.buildStrategy.buildAll} fails before replacing the news
+        files, L{NewsBuilderScript.main} lets the failure through without
+        writing anything.
+        """
+        stderr = io.BytesIO()
+        fakeBuildStrategy = FakeBuildStrategy()
+        def buildAll(baseDirectory):
+            raise CommandFailed(1, None, 'interrupted')
+        fakeBuildStrategy.buildAll = buildAll
+        script = NewsBuilderScript(
+            buildStrategy=fakeBuildStrategy, stderr=stderr)
+        self.assertRaises(CommandFailed, script.main, ['/foo/bar/baz'])
+        self.assertEqual(b'', stderr.getvalue())
+
+
+    def test_mainWritesTrace(self):
+        """
+        When given I{--trace}, L{NewsBuilderScript.main} writes a Chrome trace
+        to the given file once the build is done.
+        """
+        trace = FilePath(self.mktemp())
+        script = NewsBuilderScript(buildStrategy=FakeBuildStrategy())
+        script.main(['--trace', trace.path, '/foo/bar/baz'])
+        self.assertIn('traceEvents', json.loads(trace.getContent()))
+
+
+    def test_mainCommandTimeout(self):
+        """
+        L{NewsBuilderScript.main} sets the time limit of the commands run by
+        L{runCommand} from I{--command-timeout}, and records the time they
+        took in the trace.
+        """
+        runner = ProcessRunner()
+        self.patch(_newsbuilder, '_processRunner', runner)
+        strategy = FakeBuildStrategy()
+        strategy.buildAll = lambda path: runCommand(['true'])
+        trace = FilePath(self.mktemp())
+        script = NewsBuilderScript(buildStrategy=strategy)
+        script.main(['--command-timeout', '30', '--trace', trace.path, '/foo'])
+        self.assertEqual(30, runner.timeout)
+        counters = [event for event in json.loads(
+            trace.getContent())['traceEvents'] if event['name'] == 'counters']
+        self.assertEqual(
+            0, counters[0]['args']['subprocessesTimedOut'])
+        self.assertIn('subprocessMilliseconds', counters[0]['args'])
+
+        script.main(['/foo'])
+        self.assertIdentical(None, runner.timeout)
+
+
+    def test_mainMaxProcesses(self):
+        """
+        L{NewsBuilderScript.main} sets the number of commands which
+        L{runCommand} may run at once from I{--max-processes}.
+        """
+        runner = ProcessRunner()
+        self.patch(_newsbuilder, '_processRunner', runner)
+        script = NewsBuilderScript(buildStrategy=FakeBuildStrategy())
+        script.main(['--max-processes', '3', '/foo'])
+        self.assertEqual(3, runner.maxProcesses)
+
+
+    def test_defaultBuildStrategyTracer(self):
+        """
+        The build strategy created by L{NewsBuilderScript} records the phases
+        of the build with the given tracer, and so does the L{NewsBuilder} it
+        creates for the strategy.
+        """
+        tracer = Tracer()
+        options = NewsBuilderOptions()
+        options.parseOptions(['/foo'])
+        strategy = NewsBuilderScript()._makeBuildStrategy(options, tracer)
+        self.assertIdentical(tracer, strategy.tracer)
+        self.assertIdentical(tracer, strategy.newsBuilder.tracer)
+
+
+    def test_defaultBuildStrategy(self):
+        """
+        When no build strategy is supplied, L{NewsBuilderScript.main} uses a
+        L{TwistedBuildStrategy} configured from the command line options,
+        with the supplied L{NewsBuilder}.
+        """
+        newsBuilder = NewsBuilder()
+        script = NewsBuilderScript(newsBuilder=newsBuilder)
+        options = NewsBuilderOptions()
+        options.parseOptions([
+            '--exclude', 'docs', '--manifest', 'projects.json', '--jobs', '3',
+            '--resume', '--vcs', 'git', '--discovery', 'index', '/foo'])
+        strategy = script._makeBuildStrategy(options)
+        self.assertIsInstance(strategy, TwistedBuildStrategy)
+        self.assertIdentical(newsBuilder, strategy.newsBuilder)
+        self.assertEqual(('docs',), strategy.exclude)
+        self.assertEqual(FilePath('projects.json'), strategy.manifest)
+        self.assertEqual(3, strategy.jobs)
+        self.assertTrue(strategy.resume)
+        self.assertEqual('git', strategy.vcs)
+        self.assertEqual('index', strategy.discovery)
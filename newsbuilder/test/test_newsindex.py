@@ -0,0 +1,185 @@
+# Copyright (c) Twisted Matrix Laboratories.
+# See LICENSE for details.
+
+"""
+Tests for L{newsbuilder._newsindex}.
+"""
+
+import os
+
+from twisted.trial.unittest import TestCase
+from twisted.python.filepath import FilePath
+
+from newsbuilder._newsindex import NewsIndex, Section
+from newsbuilder.test.test_cache import useTemporaryCache
+
+_CORE_2 = (
+    'Twisted Core 2.0.0 (2015-02-01)\n'
+    '===============================\n'
+    '\n'
+    'Features\n'
+    '--------\n'
+    ' - Twisted Core 1.0.0 is old. (#2)\n'
+    '\n\n')
+
+_CONCH = (
+    'Twisted Conch 1.5.0 (2015-01-15)\n'
+    '================================\n'
+    '\n'
+    'No significant changes have been made for this release.\n'
+    '\n\n')
+
+_CORE_1 = (
+    'Twisted Core 1.0.0 (2015-01-01)\n'
+    '===============================\n'
+    '\n'
+    'Twisted Core 1.0.0 (not a header)\n'
+    'Twisted Core 0.9.0 (2014-01-01)\n'
+    '\n')
+
+_HINT = 'Ticket numbers are links.\n\n'
+
+
+
+class NewsIndexTests(TestCase):
+    """
+    Tests for L{NewsIndex}.
+    """
+    def setUp(self):
+        """
+        Create a NEWS file with three release sections.
+        """
+        self.cache = useTemporaryCache(self)
+        self.directory = FilePath(self.mktemp())
+        self.directory.makedirs()
+        self.news = self.directory.child('NEWS')
+        self.news.setContent(_HINT + _CORE_2 + _CONCH + _CORE_1)
+        self.sections = [
+            Section(len(_HINT), 'Core', '2.0.0', '2015-02-01'),
+            Section(len(_HINT + _CORE_2), 'Conch', '1.5.0', '2015-01-15'),
+            Section(len(_HINT + _CORE_2 + _CONCH), 'Core', '1.0.0',
+                    '2015-01-01')]
+
+
+    def test_scan(self):
+        """
+        L{NewsIndex.scan} finds the offset, project name, version and date of
+        each underlined release header.
+        """
+        self.assertEqual(self.sections, NewsIndex.scan(self.news).sections)
+
+
+    def test_saveAndLoad(self):
+        """
+        L{NewsIndex.load} reads the index saved by L{NewsIndex.save} in the
+        cache, leaving the directory of the NEWS file alone.
+        """
+        NewsIndex(self.sections).save(self.news)
+        self.assertEqual(['NEWS'], self.directory.listdir())
+        self.assertEqual(1, len(self.cache.child('news-index').listdir()))
+        loaded = NewsIndex.load(self.news)
+        self.assertEqual(self.sections, loaded.sections)
+        for section in loaded.sections:
+            self.assertIsInstance(section.name, str)
+
+
+    def test_loadMissing(self):
+        """
+        L{NewsIndex.load} returns C{None} if no index was saved.
+        """
+        self.assertIdentical(None, NewsIndex.load(self.news))
+
+
+    def test_loadCorrupt(self):
+        """
+        L{NewsIndex.load} returns C{None} if the index cannot be parsed.
+        """
+        NewsIndex(self.sections).save(self.news)
+        NewsIndex._indexPath(self.news).setContent('{')
+        self.assertIdentical(None, NewsIndex.load(self.news))
+
+
+    def test_saveUnwritableCache(self):
+        """
+        L{NewsIndex.save} saves nothing, without failing, if the cache cannot
+        be written to.
+        """
+        self.cache.parent().makedirs(ignoreExistingDirectory=True)
+        self.cache.setContent('Not a directory.\n')
+        NewsIndex(self.sections).save(self.news)
+        self.assertIdentical(None, NewsIndex.load(self.news))
+
+
+    def test_loadEdited(self):
+        """
+        L{NewsIndex.load} returns C{None} if the size or the modification
+        time of the NEWS file changed since the index was saved.
+        """
+        NewsIndex(self.sections).save(self.news)
+        status = os.stat(self.news.path)
+        os.utime(self.news.path, (status.st_atime, status.st_mtime - 10))
+        self.assertIdentical(None, NewsIndex.load(self.news))
+
+        NewsIndex(self.sections).save(self.news)
+        with self.news.open('a') as news:
+            news.write('More news.\n')
+        os.utime(self.news.path, (status.st_atime, status.st_mtime - 10))
+        self.assertIdentical(None, NewsIndex.load(self.news))
+
+
+    def test_splicedInsertion(self):
+        """
+        L{NewsIndex.spliced} adds the sections of inserted text and moves
+        those which follow it.
+        """
+        inserted = (
+            'Twisted Web 3.0.0 (2015-03-01)\n'
+            '==============================\n\n')
+        start = len(_HINT)
+        self.news.setContent(
+            _HINT + inserted + _CORE_2 + _CONCH + _CORE_1)
+        self.assertEqual(
+            NewsIndex.scan(self.news).sections,
+            NewsIndex(self.sections).spliced(start, start, inserted).sections)
+
+
+    def test_splicedReplacement(self):
+        """
+        L{NewsIndex.spliced} replaces the sections which started within the
+        replaced text.
+        """
+        header = (
+            'Twisted Conch 1.5.1 (2015-01-16)\n'
+            '================================\n\n')
+        start = len(_HINT + _CORE_2)
+        end = start + _CONCH.index('No significant')
+        self.news.setContent(
+            _HINT + _CORE_2 + header + _CONCH[end - start:] + _CORE_1)
+        self.assertEqual(
+            NewsIndex.scan(self.news).sections,
+            NewsIndex(self.sections).spliced(start, end, header).sections)
+
+
+    def test_find(self):
+        """
+        L{NewsIndex.find} finds the first section of a project, or of a
+        version of it.
+        """
+        index = NewsIndex(self.sections)
+        self.assertEqual(self.sections[0], index.find('Core'))
+        self.assertEqual(self.sections[2], index.find('Core', '1.0.0'))
+        self.assertEqual(self.sections[1], index.find('Conch'))
+        self.assertIdentical(None, index.find('Core', '1.5.0'))
+        self.assertIdentical(None, index.find('Web'))
+
+
+    def test_readSection(self):
+        """
+        L{NewsIndex.readSection} reads a section up to the next one, or to
+        the end of the file.
+        """
+        index = NewsIndex(self.sections)
+        self.assertEqual(
+            [_CORE_2, _CONCH, _CORE_1],
+            [index.readSection(self.news, section)
+             for section in self.sections])
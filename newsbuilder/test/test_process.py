@@ -0,0 +1,185 @@
+# Copyright (c) Twisted Matrix Laboratories.
+# See LICENSE for details.
+
+"""
+Tests for L{newsbuilder._process}.
+"""
+
+import os
+import signal
+import sys
+from threading import Thread
+import time
+
+from twisted.trial.unittest import TestCase
+
+from newsbuilder._process import (
+    CommandFailed, CommandTimedOut, ProcessRunner)
+
+
+
+def python(source):
+    """
+    Make the arguments running some Python source code.
+    """
+    return [sys.executable, '-c', source]
+
+
+
+class ProcessRunnerTests(TestCase):
+    """
+    Tests for L{ProcessRunner}.
+    """
+    def setUp(self):
+        self.runner = ProcessRunner()
+
+
+    def test_output(self):
+        """
+        L{ProcessRunner.run} returns the standard output and error of the
+        command.
+        """
+        self.assertEqual(
+            'out\nerr\n',
+            self.runner.run(python(
+                'import sys\n'
+                'sys.stdout.write("out\\n"); sys.stdout.flush()\n'
+                'sys.stderr.write("err\\n")\n')))
+
+
+    def test_exitStatus(self):
+        """
+        L{ProcessRunner.run} raises L{CommandFailed} with the exit status and
+        the output when the command exits with a non-0 status.
+        """
+        error = self.assertRaises(
+            CommandFailed, self.runner.run,
+            python('import sys; sys.stdout.write("oops"); sys.exit(3)'))
+        self.assertEqual((3, None, 'oops'),
+                         (error.exitStatus, error.exitSignal, error.output))
+
+
+    def test_exitSignal(self):
+        """
+        L{ProcessRunner.run} raises L{CommandFailed} with the signal which
+        killed the command.
+        """
+        error = self.assertRaises(
+            CommandFailed, self.runner.run,
+            python('import os, signal; os.kill(os.getpid(), signal.SIGTERM)'))
+        self.assertEqual((None, signal.SIGTERM),
+                         (error.exitStatus, error.exitSignal))
+
+
+    def test_timeout(self):
+        """
+        L{ProcessRunner.run} kills a command still running after the time
+        limit and raises L{CommandTimedOut} with the output read so far.
+        """
+        started = time.time()
+        error = self.assertRaises(
+            CommandTimedOut, self.runner.run,
+            python('import sys, time\n'
+                   'sys.stdout.write("started"); sys.stdout.flush()\n'
+                   'time.sleep(30)\n'),
+            timeout=0.5)
+        self.assertLess(time.time() - started, 10)
+        self.assertIsInstance(error, CommandFailed)
+        self.assertEqual((None, signal.SIGKILL, 'started', 0.5),
+                         (error.exitStatus, error.exitSignal, error.output,
+                          error.timeout))
+        self.assertEqual(1, self.runner.timedOut)
+
+
+    def test_timeoutAfterOutput(self):
+        """
+        The time limit also applies to a command which closed its output.
+        """
+        self.runner.timeout = 0.5
+        self.assertRaises(
+            CommandTimedOut, self.runner.run,
+            python('import os, time; os.close(1); os.close(2); '
+                   'time.sleep(30)'))
+
+
+    def test_boundedOutput(self):
+        """
+        L{ProcessRunner.run} keeps only the last
+        L{ProcessRunner.maxOutput} bytes of the output.
+        """
+        self.runner.maxOutput = 1000
+        output = self.runner.run(python(
+            'import sys\n'
+            'for i in range(10000):\n'
+            '    sys.stdout.write("%d\\n" % (i,))\n'))
+        expected = ''.join('%d\n' % (i,) for i in range(10000))[-1000:]
+        self.assertEqual(expected, output)
+
+
+    def test_outputCallback(self):
+        """
+        Given a callable, L{ProcessRunner.run} gives it the output as it is
+        read instead of keeping it.
+        """
+        chunks = []
+        self.assertEqual('', self.runner.run(
+            python('print "a" * 100000'), output=chunks.append))
+        self.assertEqual('a' * 100000 + '\n', ''.join(chunks))
+
+
+    def test_stats(self):
+        """
+        L{ProcessRunner} counts the commands it ran and the time they took.
+        """
+        self.runner.run(python('import time; time.sleep(0.2)'))
+        self.assertRaises(CommandFailed, self.runner.run, python('1 / 0'))
+        self.assertEqual(2, self.runner.spawned)
+        self.assertEqual(0, self.runner.timedOut)
+        self.assertTrue(0.2 <= self.runner.seconds < 10)
+
+
+    def maxConcurrent(self, runner):
+        """
+        Run five commands with C{runner} from five threads at once.
+
+        @return: The largest number of the commands seen running at once.
+        """
+        directory = self.mktemp()
+        source = (
+            'import os, sys, time\n'
+            'path = os.path.join(sys.argv[1], str(os.getpid()))\n'
+            'open(path, "w").close()\n'
+            'print len(os.listdir(sys.argv[1]))\n'
+            'time.sleep(0.3)\n'
+            'os.remove(path)\n')
+        os.mkdir(directory)
+        results = []
+        threads = [
+            Thread(target=lambda: results.append(int(runner.run(
+                python(source) + [directory]))))
+            for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(5, len(results))
+        return max(results)
+
+
+    def test_maxProcesses(self):
+        """
+        L{ProcessRunner.run} runs at most L{ProcessRunner.maxProcesses}
+        commands at once.
+        """
+        self.assertLessEqual(
+            self.maxConcurrent(ProcessRunner(maxProcesses=2)), 2)
+
+
+    def test_setMaxProcesses(self):
+        """
+        L{ProcessRunner.maxProcesses} can be changed while no command runs.
+        """
+        runner = ProcessRunner(maxProcesses=4)
+        runner.maxProcesses = 1
+        self.assertEqual(1, runner.maxProcesses)
+        self.assertEqual(1, self.maxConcurrent(runner))
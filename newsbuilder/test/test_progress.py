@@ -0,0 +1,181 @@
+# Copyright (c) Twisted Matrix Laboratories.
+# See LICENSE for details.
+
+"""
+Tests for L{newsbuilder._progress}.
+"""
+
+import os
+
+from twisted.trial.unittest import TestCase
+from twisted.python.filepath import FilePath
+
+from newsbuilder._progress import Progress, fragmentsKey
+
+
+
+class FragmentsKeyTests(TestCase):
+    """
+    Tests for L{fragmentsKey}.
+    """
+    def setUp(self):
+        """
+        Create a directory with two fragments.
+        """
+        self.topfiles = FilePath(self.mktemp())
+        self.topfiles.makedirs()
+        self.topfiles.child('1.feature').setContent('A feature.\n')
+        self.topfiles.child('2.bugfix').setContent('A fix.\n')
+
+
+    def key(self, header='Twisted Core 1.0.0 (2015-01-01)'):
+        """
+        Compute the key of the fragments in the directory.
+        """
+        return fragmentsKey(header, self.topfiles.children())
+
+
+    def test_stable(self):
+        """
+        L{fragmentsKey} gives the same key for the same header and fragments,
+        whatever their order.
+        """
+        self.assertEqual(
+            self.key(),
+            fragmentsKey('Twisted Core 1.0.0 (2015-01-01)',
+                         list(reversed(sorted(self.topfiles.children())))))
+
+
+    def test_changes(self):
+        """
+        L{fragmentsKey} gives a different key if the header changes, or a
+        fragment is added, removed or modified.
+        """
+        keys = [self.key()]
+        keys.append(self.key('Twisted Core 1.0.1 (2015-01-01)'))
+        self.topfiles.child('3.doc').setContent('')
+        keys.append(self.key())
+        self.topfiles.child('1.feature').remove()
+        keys.append(self.key())
+        self.topfiles.child('2.bugfix').setContent('A better fix.\n')
+        keys.append(self.key())
+        self.assertEqual(len(keys), len(set(keys)))
+
+
+
+class ProgressTests(TestCase):
+    """
+    Tests for L{Progress}.
+    """
+    def setUp(self):
+        """
+        Record the news of two projects.
+        """
+        self.path = FilePath(self.mktemp())
+        self.core = FilePath('/repo/topfiles')
+        self.conch = FilePath('/repo/conch/topfiles')
+        progress = Progress.open(self.path)
+        progress.record(self.core, 'a' * 40, 'Core news.\n')
+        progress.record(self.conch, 'b' * 40, 'Conch news \xe9.\n')
+        progress.close()
+
+
+    def test_resume(self):
+        """
+        When resuming, L{Progress.find} finds the news recorded before with
+        the same key.
+        """
+        progress = Progress.open(self.path, resume=True)
+        self.addCleanup(progress.close)
+        self.assertEqual('Core news.\n', progress.find(self.core, 'a' * 40))
+        self.assertEqual(
+            'Conch news \xe9.\n', progress.find(self.conch, 'b' * 40))
+        self.assertIdentical(None, progress.find(self.core, 'c' * 40))
+        self.assertIdentical(
+            None, progress.find(FilePath('/repo/web/topfiles'), 'a' * 40))
+
+
+    def test_noResume(self):
+        """
+        When not resuming, L{Progress.open} discards the news recorded
+        before.
+        """
+        Progress.open(self.path).close()
+        progress = Progress.open(self.path, resume=True)
+        self.addCleanup(progress.close)
+        self.assertIdentical(None, progress.find(self.core, 'a' * 40))
+
+
+    def test_resumeTwice(self):
+        """
+        The news recorded by builds which were resumed is kept for the next
+        one.
+        """
+        progress = Progress.open(self.path, resume=True)
+        progress.record(self.core, 'c' * 40, 'New core news.\n')
+        progress.close()
+        progress = Progress.open(self.path, resume=True)
+        self.addCleanup(progress.close)
+        self.assertEqual(
+            'New core news.\n', progress.find(self.core, 'c' * 40))
+        self.assertEqual(
+            'Conch news \xe9.\n', progress.find(self.conch, 'b' * 40))
+
+
+    def test_incomplete(self):
+        """
+        A line left incomplete, by a record which was not written entirely,
+        is ignored.
+        """
+        content = self.path.getContent()
+        self.path.setContent(content[:-5])
+        progress = Progress.open(self.path, resume=True)
+        progress.close()
+        self.assertIdentical(None, progress.find(self.core, 'a' * 40))
+        self.assertEqual(
+            'Conch news \xe9.\n', progress.find(self.conch, 'b' * 40))
+        self.assertTrue(self.path.getContent().endswith('\n'))
+
+
+    def test_unknownFormat(self):
+        """
+        A record in a format which L{Progress} cannot read is discarded.
+        """
+        self.path.setContent('{"format": 2}\n')
+        progress = Progress.open(self.path, resume=True)
+        self.addCleanup(progress.close)
+        self.assertIdentical(None, progress.find(self.core, 'a' * 40))
+
+
+    def test_writtenOnClose(self):
+        """
+        L{Progress.record} keeps the news in memory, and L{Progress.close}
+        writes it, in a directory which may not exist yet.
+        """
+        path = FilePath(self.mktemp()).child('progress').child('record.json')
+        progress = Progress.open(path)
+        progress.record(self.core, 'a' * 40, 'Core news.\n')
+        self.assertFalse(path.exists())
+        progress.close()
+        progress = Progress.open(path, resume=True)
+        self.assertEqual('Core news.\n', progress.find(self.core, 'a' * 40))
+
+
+    def test_closeUnwritable(self):
+        """
+        L{Progress.close} does not fail if the record cannot be written.
+        """
+        parent = FilePath(self.mktemp())
+        parent.setContent('Not a directory.\n')
+        progress = Progress.open(parent.child('record.json'))
+        progress.record(self.core, 'a' * 40, 'Core news.\n')
+        progress.close()
+        self.assertEqual('Not a directory.\n', parent.getContent())
+
+
+    def test_remove(self):
+        """
+        L{Progress.remove} removes the record.
+        """
+        Progress.open(self.path, resume=True).remove()
+        self.assertFalse(os.path.exists(self.path.path))
@@ -0,0 +1,275 @@
+# Copyright (c) Twisted Matrix Laboratories.
+# See LICENSE for details.
+
+"""
+Tests for L{newsbuilder._revision}.
+"""
+
+import subprocess
+
+from twisted.trial.unittest import TestCase
+from twisted.python.filepath import FilePath
+from twisted.python.procutils import which
+
+from newsbuilder import _revision
+from newsbuilder._process import CommandFailed, CommandTimedOut
+from newsbuilder._revision import GitRevision, RevisionPath, _CatFile
+from newsbuilder._trace import Tracer
+
+if which("git"):
+    gitSkip = None
+else:
+    gitSkip = "git is not available."
+
+
+
+def git(repository, *args):
+    """
+    Run a Git command in a repository, without depending on the
+    configuration of the user running the tests.
+    """
+    subprocess.check_call(
+        ['git', '-C', repository.path, '-c', 'user.name=Test',
+         '-c', 'user.email=test@example.invalid'] + list(args))
+
+
+
+def runCommand(args, output):
+    """
+    Run a command the way the backends of L{newsbuilder._vcs} do.
+    """
+    process = subprocess.Popen(
+        args, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    stdout = process.communicate()[0]
+    if process.returncode:
+        raise CommandFailed(process.returncode, None, stdout)
+    output(stdout)
+
+
+
+def makeRepository(repository, files):
+    """
+    Commit some files to a new Git repository.
+
+    @param files: A C{dict} mapping paths, with C{/} as separator, to the
+        contents of the files.
+    """
+    repository.makedirs()
+    git(repository, 'init', '-q')
+    for path, content in files.items():
+        child = repository.descendant(path.split('/'))
+        if not child.parent().exists():
+            child.parent().makedirs()
+        child.setContent(content)
+    git(repository, 'add', '-A')
+    git(repository, 'commit', '-q', '-m', 'Add files.')
+
+
+
+class GitRevisionTests(TestCase):
+    """
+    Tests for L{GitRevision}.
+    """
+    skip = gitSkip
+
+    def setUp(self):
+        """
+        Create a repository with a commit.
+        """
+        self.repository = FilePath(self.mktemp())
+        makeRepository(self.repository, {
+            'README': 'Read me.\n',
+            'twisted/topfiles/3.feature': 'A feature.\n',
+            'twisted/topfiles/NEWS': 'Old news.\n' * 1000})
+
+
+    def test_paths(self):
+        """
+        L{GitRevision.open} lists the files of the revision, with the names
+        of their objects.
+        """
+        revision = GitRevision.open(self.repository.path, 'HEAD', runCommand)
+        self.assertEqual(
+            ['README', 'twisted/topfiles/3.feature', 'twisted/topfiles/NEWS'],
+            sorted(revision.paths))
+        self.assertTrue(revision.exists('README'))
+        self.assertFalse(revision.exists('twisted/topfiles'))
+
+
+    def test_tree(self):
+        """
+        Given a tree of a revision, L{GitRevision.open} lists the files
+        beneath it, relative to it.
+        """
+        revision = GitRevision.open(
+            self.repository.path, 'HEAD:twisted', runCommand)
+        self.assertEqual(
+            ['topfiles/3.feature', 'topfiles/NEWS'], sorted(revision.paths))
+
+
+    def test_read(self):
+        """
+        L{GitRevision.read} reads the contents of files of the revision one
+        after another through a single process, and leaves the working tree
+        alone.
+        """
+        self.repository.child('README').setContent('Changed.\n')
+        revision = GitRevision.open(self.repository.path, 'HEAD', runCommand)
+        self.addCleanup(revision.close)
+        self.assertEqual('Read me.\n', revision.read('README'))
+        catFile = revision._catFile
+        self.assertEqual(
+            'Old news.\n' * 1000, revision.read('twisted/topfiles/NEWS'))
+        self.assertEqual(
+            'A feature.\n', revision.read('twisted/topfiles/3.feature'))
+        self.assertIdentical(catFile, revision._catFile)
+        self.assertEqual(
+            'Changed.\n', self.repository.child('README').getContent())
+
+
+    def test_readMissing(self):
+        """
+        L{GitRevision.read} raises L{KeyError} for a file which is not part
+        of the revision, without starting a process.
+        """
+        revision = GitRevision.open(self.repository.path, 'HEAD', runCommand)
+        self.assertRaises(KeyError, revision.read, 'NEWS')
+        self.assertIdentical(None, revision._catFile)
+
+
+    def test_missingObject(self):
+        """
+        L{_CatFile.read} raises L{KeyError} for an object which is not in the
+        repository, and can still read others afterwards.
+        """
+        revision = GitRevision.open(self.repository.path, 'HEAD', runCommand)
+        catFile = _CatFile(self.repository.path)
+        self.addCleanup(catFile.close)
+        self.assertRaises(KeyError, catFile.read, '0' * 40)
+        self.assertEqual(
+            'Read me.\n', catFile.read(revision.paths['README']))
+
+
+    def test_close(self):
+        """
+        L{GitRevision.close} stops the process reading the files, which is
+        started again if another file is read.
+        """
+        revision = GitRevision.open(self.repository.path, 'HEAD', runCommand)
+        revision.read('README')
+        process = revision._catFile._process
+        revision.close()
+        self.assertEqual(0, process.returncode)
+        self.assertIdentical(None, revision._catFile)
+        self.assertEqual('Read me.\n', revision.read('README'))
+        revision.close()
+
+
+    def test_countsProcesses(self):
+        """
+        L{GitRevision} counts the C{git ls-tree} and C{git cat-file}
+        processes it starts in its tracer.
+        """
+        tracer = Tracer()
+        revision = GitRevision.open(
+            self.repository.path, 'HEAD', runCommand, tracer)
+        self.addCleanup(revision.close)
+        self.assertEqual(1, tracer.counters['subprocesses'])
+        revision.read('README')
+        revision.read('twisted/topfiles/NEWS')
+        self.assertEqual(2, tracer.counters['subprocesses'])
+
+
+    def test_readWithTimeout(self):
+        """
+        L{GitRevision.read} reads the files of the revision through a
+        process with a time limit.
+        """
+        revision = GitRevision.open(
+            self.repository.path, 'HEAD', runCommand, timeout=30)
+        self.addCleanup(revision.close)
+        self.assertEqual(
+            'Old news.\n' * 1000, revision.read('twisted/topfiles/NEWS'))
+        self.assertEqual('Read me.\n', revision.read('README'))
+        self.assertEqual(30, revision._catFile.timeout)
+
+
+    def test_timeout(self):
+        """
+        L{_CatFile.read} kills the process and raises L{CommandTimedOut} if
+        it does not send the object within its time limit.
+        """
+        self.patch(_revision, 'Popen', lambda args, **kwargs:
+                   subprocess.Popen(['sleep', '10'], **kwargs))
+        catFile = _CatFile(self.repository.path, timeout=0.1)
+        self.addCleanup(catFile.close)
+        error = self.assertRaises(CommandTimedOut, catFile.read, '0' * 40)
+        self.assertEqual(0.1, error.timeout)
+        self.assertIsNot(None, catFile._process.returncode)
+
+
+    def test_badRevision(self):
+        """
+        L{GitRevision.open} raises L{CommandFailed} for a revision which does
+        not exist.
+        """
+        self.assertRaises(
+            CommandFailed, GitRevision.open, self.repository.path,
+            'no-such-branch', runCommand)
+
+
+
+class RevisionPathTests(TestCase):
+    """
+    Tests for L{RevisionPath}.
+    """
+    def setUp(self):
+        """
+        Create a L{GitRevision} with a few files, whose objects are never
+        read.
+        """
+        self.revision = GitRevision('/repository', 'HEAD', {
+            'topfiles/NEWS': 'a' * 40, 'topfiles/3.feature': 'b' * 40})
+
+
+    def test_child(self):
+        """
+        L{RevisionPath.child} joins a name to the path with a C{/}.
+        """
+        root = RevisionPath(self.revision, '')
+        topfiles = root.child('topfiles')
+        self.assertEqual('topfiles', topfiles.path)
+        self.assertEqual('topfiles/NEWS', topfiles.child('NEWS').path)
+        self.assertEqual(
+            RevisionPath(self.revision, 'topfiles/NEWS'),
+            topfiles.child('NEWS'))
+        self.assertNotEqual(topfiles, topfiles.child('NEWS'))
+
+
+    def test_basename(self):
+        """
+        L{RevisionPath.basename} returns the last segment of the path.
+        """
+        self.assertEqual(
+            '3.feature',
+            RevisionPath(self.revision, 'topfiles/3.feature').basename())
+
+
+    def test_exists(self):
+        """
+        L{RevisionPath.exists} returns whether the path is a file of the
+        revision.
+        """
+        self.assertTrue(RevisionPath(self.revision, 'topfiles/NEWS').exists())
+        self.assertFalse(RevisionPath(self.revision, 'topfiles').exists())
+        self.assertFalse(RevisionPath(self.revision, 'NEWS').exists())
+
+
+    def test_getContent(self):
+        """
+        L{RevisionPath.getContent} reads the file from the revision.
+        """
+        read = []
+        self.patch(self.revision, 'read', lambda path: read.append(path))
+        RevisionPath(self.revision, 'topfiles/NEWS').getContent()
+        self.assertEqual(['topfiles/NEWS'], read)
@@ -0,0 +1,137 @@
+# Copyright (c) Twisted Matrix Laboratories.
+# See LICENSE for details.
+
+"""
+Tests for L{newsbuilder._trace}.
+"""
+
+import json
+import os
+
+from twisted.trial.unittest import TestCase
+from twisted.python.filepath import FilePath
+
+from newsbuilder._trace import NullTracer, Tracer
+
+
+
+class FakeClock(object):
+    """
+    A clock which only moves when told to.
+
+    @ivar now: The current time in seconds.
+    """
+    def __init__(self, now=0.0):
+        self.now = now
+
+
+    def __call__(self):
+        return self.now
+
+
+
+class TracerTests(TestCase):
+    """
+    Tests for L{Tracer}.
+    """
+    def setUp(self):
+        """
+        Create a L{Tracer} with fake wall and CPU clocks.
+        """
+        self.clock = FakeClock(1000.0)
+        self.cpuClock = FakeClock(5.0)
+        self.tracer = Tracer(clock=self.clock, cpuClock=self.cpuClock)
+
+
+    def test_span(self):
+        """
+        L{Tracer.span} records a complete event with the wall time the code
+        in the C{with} statement took, relative to the creation of the
+        tracer, and the CPU time it used.
+        """
+        self.clock.now += 0.5
+        with self.tracer.span('discovery', project='Core'):
+            self.clock.now += 0.25
+            self.cpuClock.now += 0.125
+        self.assertEqual(
+            [{'name': 'discovery', 'cat': 'phase', 'ph': 'X',
+              'ts': 500000, 'dur': 250000, 'pid': os.getpid(),
+              'tid': self.tracer.events[0]['tid'],
+              'args': {'project': 'Core', 'cpu_ms': 125.0}}],
+            self.tracer.events)
+
+
+    def test_spanError(self):
+        """
+        L{Tracer.span} records the event even if the code in the C{with}
+        statement raises an exception.
+        """
+        def fail():
+            with self.tracer.span('svn info', 'vcs'):
+                1 // 0
+        self.assertRaises(ZeroDivisionError, fail)
+        self.assertEqual(
+            [('svn info', 'vcs')],
+            [(event['name'], event['cat']) for event in self.tracer.events])
+
+
+    def test_count(self):
+        """
+        L{Tracer.count} adds to the named counter, by one by default.
+        """
+        self.tracer.count('filesRead')
+        self.tracer.count('filesRead')
+        self.tracer.count('bytesWritten', 1024)
+        self.assertEqual(
+            {'filesRead': 2, 'bytesWritten': 1024}, self.tracer.counters)
+
+
+    def test_toChromeTrace(self):
+        """
+        L{Tracer.toChromeTrace} returns the events sorted by time followed by
+        a counter event with the totals of the counters, which are also given
+        under C{otherData}.
+        """
+        with self.tracer.span('outer'):
+            self.clock.now += 1
+            with self.tracer.span('inner'):
+                self.clock.now += 1
+        self.tracer.count('subprocesses', 3)
+        trace = self.tracer.toChromeTrace()
+        self.assertEqual(
+            ['outer', 'inner', 'counters'],
+            [event['name'] for event in trace['traceEvents']])
+        self.assertEqual(
+            {'name': 'counters', 'ph': 'C', 'ts': 2000000,
+             'pid': os.getpid(), 'args': {'subprocesses': 3}},
+            trace['traceEvents'][-1])
+        self.assertEqual(
+            {'counters': {'subprocesses': 3}}, trace['otherData'])
+
+
+    def test_write(self):
+        """
+        L{Tracer.write} writes the trace as JSON to the given file.
+        """
+        with self.tracer.span('render'):
+            pass
+        path = FilePath(self.mktemp())
+        self.tracer.write(path)
+        self.assertEqual(
+            json.loads(json.dumps(self.tracer.toChromeTrace())),
+            json.loads(path.getContent()))
+
+
+
+class NullTracerTests(TestCase):
+    """
+    Tests for L{NullTracer}.
+    """
+    def test_interface(self):
+        """
+        L{NullTracer} accepts the same calls as L{Tracer}.
+        """
+        tracer = NullTracer()
+        with tracer.span('discovery', 'phase', project='Core'):
+            tracer.count('filesRead')
+            tracer.count('bytesWritten', 10)
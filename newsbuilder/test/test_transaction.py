@@ -0,0 +1,188 @@
+# Copyright (c) Twisted Matrix Laboratories.
+# See LICENSE for details.
+
+"""
+Tests for L{newsbuilder._transaction}.
+"""
+
+from twisted.trial.unittest import TestCase
+from twisted.python.filepath import FilePath
+
+from newsbuilder._transaction import Transaction
+
+
+
+class TransactionTests(TestCase):
+    """
+    Tests for L{Transaction}.
+    """
+    def setUp(self):
+        """
+        Create two files in different directories, and stage new contents for
+        them and for a file which does not exist yet.
+        """
+        self.base = FilePath(self.mktemp())
+        self.base.child('sub').makedirs()
+        self.targets = [
+            self.base.child('NEWS'),
+            self.base.child('sub').child('NEWS'),
+            self.base.child('sub').child('README')]
+        self.targets[0].setContent('old\n')
+        self.targets[1].setContent('old sub\n')
+        self.journal = self.base.child('journal')
+        self.transaction = Transaction(self.journal)
+        for target in self.targets:
+            staged = Transaction.stagingPath(target)
+            staged.setContent('new ' + target.basename() + '\n')
+            self.transaction.add(staged, target)
+
+
+    def contents(self):
+        """
+        Read the files of the transaction.
+
+        @return: A C{list} of their contents, or C{None} for those which do
+            not exist.
+        """
+        return [target.getContent() if target.exists() else None
+                for target in self.targets]
+
+
+    def listing(self):
+        """
+        List the files in the test directories.
+        """
+        return (sorted(self.base.listdir()),
+                sorted(self.base.child('sub').listdir()))
+
+
+    def prepare(self):
+        """
+        Commit the transaction up to writing its journal, as a process
+        interrupted before renaming any file would.
+        """
+        def interrupted():
+            raise KeyboardInterrupt()
+        self.transaction.rollForward = interrupted
+        self.transaction.rollBack = lambda: None
+        self.assertRaises(KeyboardInterrupt, self.transaction.commit,
+                          [self.base.child('fragment')])
+
+
+    def test_commit(self):
+        """
+        L{Transaction.commit} replaces every file by its staged contents, and
+        L{Transaction.finish} removes the backups and the journal.
+        """
+        self.transaction.commit()
+        self.assertEqual(
+            ['new NEWS\n', 'new NEWS\n', 'new README\n'], self.contents())
+        self.assertTrue(self.journal.exists())
+        self.transaction.finish()
+        self.assertEqual((['NEWS', 'sub'], ['NEWS', 'README']),
+                         self.listing())
+
+
+    def test_journalDirectory(self):
+        """
+        L{Transaction.commit} creates the directory of the journal if it does
+        not exist.
+        """
+        journal = FilePath(self.mktemp()).child('journal').child('base.json')
+        self.transaction.journal = journal
+        self.transaction.commit()
+        self.assertTrue(journal.exists())
+        self.transaction.finish()
+        self.assertFalse(journal.exists())
+
+
+    def test_committed(self):
+        """
+        The callbacks given to L{Transaction.add} are run once all the files
+        are replaced.
+        """
+        contents = []
+        staged = self.base.child('other.new')
+        staged.setContent('other\n')
+        self.transaction.add(
+            staged, self.base.child('other'),
+            lambda: contents.append(self.contents()))
+        self.transaction.commit()
+        self.assertEqual(
+            [['new NEWS\n', 'new NEWS\n', 'new README\n']], contents)
+
+
+    def test_abort(self):
+        """
+        L{Transaction.abort} removes the staged files, leaving the others
+        alone.
+        """
+        self.transaction.abort()
+        self.assertEqual(['old\n', 'old sub\n', None], self.contents())
+        self.assertEqual((['NEWS', 'sub'], ['NEWS']), self.listing())
+
+
+    def test_commitFailure(self):
+        """
+        If a file cannot be replaced, L{Transaction.commit} restores those it
+        replaced already and removes the journal.
+        """
+        staged = self.base.child('missing.new')
+        self.transaction.add(staged, self.base.child('missing'))
+        original = FilePath.moveTo
+        def moveTo(path, destination, followLinks=True):
+            if path == staged:
+                raise OSError('rename failed')
+            return original(path, destination, followLinks)
+        self.patch(FilePath, 'moveTo', moveTo)
+        staged.setContent('missing\n')
+        self.assertRaises(OSError, self.transaction.commit)
+        self.assertEqual(['old\n', 'old sub\n', None], self.contents())
+        self.assertEqual((['NEWS', 'sub'], ['NEWS']), self.listing())
+
+
+    def test_loadNothing(self):
+        """
+        L{Transaction.load} returns C{None} if there is no journal.
+        """
+        self.assertIdentical(None, Transaction.load(self.journal))
+
+
+    def test_rollForward(self):
+        """
+        The transaction read by L{Transaction.load} from the journal of an
+        interrupted commit can be finished with L{Transaction.rollForward},
+        and has the removals given to L{Transaction.commit}.
+        """
+        self.prepare()
+        Transaction.stagingPath(self.targets[0]).moveTo(self.targets[0])
+        transaction = Transaction.load(self.journal)
+        self.assertEqual([self.base.child('fragment')], transaction.removals)
+        transaction.rollForward()
+        self.assertEqual(
+            ['new NEWS\n', 'new NEWS\n', 'new README\n'], self.contents())
+        transaction.finish()
+        self.assertEqual((['NEWS', 'sub'], ['NEWS', 'README']),
+                         self.listing())
+
+
+    def test_rollBack(self):
+        """
+        The transaction read by L{Transaction.load} from the journal of an
+        interrupted commit can be undone with L{Transaction.rollBack}.
+        """
+        self.prepare()
+        Transaction.stagingPath(self.targets[0]).moveTo(self.targets[0])
+        Transaction.stagingPath(self.targets[2]).moveTo(self.targets[2])
+        Transaction.load(self.journal).rollBack()
+        self.assertEqual(['old\n', 'old sub\n', None], self.contents())
+        self.assertEqual((['NEWS', 'sub'], ['NEWS']), self.listing())
+
+
+    def test_loadUnknownFormat(self):
+        """
+        L{Transaction.load} raises L{ValueError} for a journal in a format it
+        does not know.
+        """
+        self.journal.setContent('{"format": 2}')
+        self.assertRaises(ValueError, Transaction.load, self.journal)
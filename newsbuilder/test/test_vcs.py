@@ -0,0 +1,396 @@
+# Copyright (c) Twisted Matrix Laboratories.
+# See LICENSE for details.
+
+"""
+Tests for L{newsbuilder._vcs}.
+"""
+
+from zope.interface.verify import verifyObject
+
+from twisted.trial.unittest import TestCase
+from twisted.python.filepath import FilePath
+
+from newsbuilder import _process, _vcs
+from newsbuilder._trace import Tracer
+from newsbuilder._vcs import (
+    BACKENDS, FILESYSTEM, GIT, HG, SVN, UNKNOWN, FilesystemBackend,
+    GitBackend, IVersionControlBackend, SubversionBackend, chooseBackend,
+    detectWorkingCopy)
+
+
+
+class DetectWorkingCopyTests(TestCase):
+    """
+    Tests for L{detectWorkingCopy}.
+    """
+    def setUp(self):
+        """
+        Create a directory several levels beneath a temporary one.
+        """
+        self.root = FilePath(self.mktemp())
+        self.directory = self.root.descendant(['a', 'b', 'c'])
+        self.directory.makedirs()
+
+
+    def test_svn(self):
+        """
+        L{detectWorkingCopy} recognizes a Subversion working copy by the
+        I{.svn/wc.db} file at its root.
+        """
+        svn = self.root.descendant(['a', '.svn'])
+        svn.makedirs()
+        svn.child('wc.db').setContent('')
+        self.assertEqual(SVN, detectWorkingCopy(self.directory.path))
+
+
+    def test_svnOldFormat(self):
+        """
+        L{detectWorkingCopy} returns L{UNKNOWN} for a I{.svn} directory
+        without I{wc.db}.
+        """
+        self.directory.child('.svn').makedirs()
+        self.assertEqual(UNKNOWN, detectWorkingCopy(self.directory.path))
+
+
+    def test_git(self):
+        """
+        L{detectWorkingCopy} recognizes a Git working copy by its I{.git}
+        directory, or by the I{.git} file of linked worktrees.
+        """
+        self.root.child('a').child('.git').makedirs()
+        self.assertEqual(GIT, detectWorkingCopy(self.directory.path))
+        self.directory.child('.git').setContent('gitdir: /elsewhere\n')
+        self.assertEqual(GIT, detectWorkingCopy(self.directory.path))
+
+
+    def test_hg(self):
+        """
+        L{detectWorkingCopy} recognizes a Mercurial working copy by its
+        I{.hg} directory.
+        """
+        self.root.child('.hg').makedirs()
+        self.assertEqual(HG, detectWorkingCopy(self.directory.path))
+
+
+    def test_nearest(self):
+        """
+        L{detectWorkingCopy} finds the working copy nearest to the directory.
+        """
+        self.root.child('.git').makedirs()
+        self.root.descendant(['a', 'b', '.svn']).makedirs()
+        self.root.descendant(['a', 'b', '.svn', 'wc.db']).setContent('')
+        self.assertEqual(SVN, detectWorkingCopy(self.directory.path))
+
+
+    def test_none(self):
+        """
+        L{detectWorkingCopy} returns C{None} when no directory up to the root
+        of the file system is a working copy.
+        """
+        # Ignore any working copy containing the temporary directory.
+        inside = self.root.path + '/'
+        for name in ['isfile', 'isdir', 'exists']:
+            check = getattr(_vcs.os.path, name)
+            self.patch(_vcs.os.path, name,
+                       lambda path, check=check: path.startswith(inside)
+                       and check(path))
+        self.assertIdentical(None, detectWorkingCopy(self.directory.path))
+
+
+
+class ChooseBackendTests(TestCase):
+    """
+    Tests for L{chooseBackend}.
+    """
+    def test_choose(self):
+        """
+        L{chooseBackend} chooses the Subversion backend for any Subversion
+        working copy, the Git one for Git working copies, and none for
+        anything else.
+        """
+        for workingCopy, name in [(SVN, SVN), (UNKNOWN, SVN), (GIT, GIT),
+                                  (HG, None), (None, None)]:
+            self.patch(_vcs, 'detectWorkingCopy',
+                       lambda directory, found=workingCopy: found)
+            self.assertEqual(name, chooseBackend('/repository'))
+
+
+    def test_backends(self):
+        """
+        L{BACKENDS} maps the name of each backend to its class.
+        """
+        for name, backend in BACKENDS.items():
+            self.assertEqual(name, backend.name)
+        self.assertEqual(set([SVN, GIT, FILESYSTEM]), set(BACKENDS))
+
+
+
+class BackendTestsMixin(object):
+    """
+    Tests for the backends, which run commands with L{runCommand}.
+
+    @ivar backendClass: The class of the backend being tested.
+    @ivar commands: The argument vectors of the commands run.
+    @ivar outputs: The outputs given for the commands run, in turn.
+    """
+    def setUp(self):
+        self.commands = []
+        self.outputs = []
+        self.tracer = Tracer()
+        self.backend = self.backendClass(self.runCommand, self.tracer)
+
+
+    def runCommand(self, args, output=None):
+        """
+        Record a command instead of running it.
+        """
+        self.commands.append(args)
+        result = ''
+        if self.outputs:
+            result = self.outputs.pop(0)
+        if output is None:
+            return result
+        output(result)
+        return ''
+
+
+    def test_interface(self):
+        """
+        The backend provides L{IVersionControlBackend}, under its name in
+        L{BACKENDS}.
+        """
+        self.assertTrue(verifyObject(IVersionControlBackend, self.backend))
+        self.assertIdentical(self.backendClass, BACKENDS[self.backend.name])
+
+
+    def test_removeNothing(self):
+        """
+        Removing no files runs no command.
+        """
+        self.backend.remove([])
+        self.assertEqual([], self.commands)
+
+
+
+class SubversionBackendTests(BackendTestsMixin, TestCase):
+    """
+    Tests for L{SubversionBackend}.
+    """
+    backendClass = SubversionBackend
+
+    def test_verify(self):
+        """
+        L{SubversionBackend.verify} runs C{svn info} unless the directory is
+        known to be in a Subversion working copy.
+        """
+        detected = [SVN]
+        self.patch(_vcs, 'detectWorkingCopy', lambda directory: detected[0])
+        self.backend.verify('/repository')
+        self.assertEqual([], self.commands)
+        detected[0] = UNKNOWN
+        self.backend.verify('/repository')
+        self.assertEqual([['svn', 'info', '/repository']], self.commands)
+        self.assertEqual(1, self.tracer.counters['subprocesses'])
+
+
+    def test_remove(self):
+        """
+        L{SubversionBackend.remove} removes files with as few C{svn rm}
+        commands as fit on a command line.
+        """
+        self.patch(_process, '_argumentLimit', lambda: 100)
+        paths = ['/repository/%d.misc' % (i,) for i in range(20)]
+        self.backend.remove(paths)
+        self.assertTrue(1 < len(self.commands) < len(paths))
+        for command in self.commands:
+            self.assertEqual(['svn', 'rm', '--force'], command[:3])
+        self.assertEqual(
+            paths, [path for command in self.commands for path in command[3:]])
+        self.assertEqual(
+            len(self.commands), self.tracer.counters['subprocesses'])
+
+
+    def test_unversioned(self):
+        """
+        L{SubversionBackend.unversioned} finds the unversioned and ignored
+        files in the XML output of C{svn status}.
+        """
+        self.outputs.append(
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            '<status>\n'
+            '<target path="/r/1.misc">\n'
+            '<entry path="/r/1.misc">'
+            '<wc-status item="unversioned" props="none" /></entry>\n'
+            '</target>\n'
+            '<target path="/r/2.misc">\n'
+            '</target>\n'
+            '<target path="/r/3.misc">\n'
+            '<entry path="/r/3.misc"><wc-status item="ignored" props="none" />'
+            '</entry>\n'
+            '</target>\n'
+            '<target path="/r/4.misc">\n'
+            '<entry path="/r/4.misc"><wc-status item="modified" props="none"'
+            ' /></entry>\n'
+            '</target>\n'
+            '</status>\n')
+        paths = ['/r/%d.misc' % (i,) for i in range(1, 5)]
+        self.assertEqual(
+            set(['/r/1.misc', '/r/3.misc']), self.backend.unversioned(paths))
+        self.assertEqual([['svn', 'status', '--xml'] + paths], self.commands)
+
+
+    def test_trackedFiles(self):
+        """
+        L{SubversionBackend.trackedFiles} lists the files and directories
+        under version control with a single C{svn status} command.
+        """
+        self.outputs.append(
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            '<status>\n'
+            '<target path="/r">\n'
+            '<entry path="/r"><wc-status item="normal" /></entry>\n'
+            '<entry path="/r/topfiles">'
+            '<wc-status item="normal" /></entry>\n'
+            '<entry path="/r/topfiles/1.misc">'
+            '<wc-status item="added" /></entry>\n'
+            '<entry path="/r/topfiles/2.misc">'
+            '<wc-status item="unversioned" /></entry>\n'
+            '<entry path="/r/topfiles/3.misc">'
+            '<wc-status item="deleted" /></entry>\n'
+            '</target>\n'
+            '</status>\n')
+        self.assertEqual(
+            ['/r', '/r/topfiles', '/r/topfiles/1.misc'],
+            self.backend.trackedFiles('/r'))
+        self.assertEqual(
+            [['svn', 'status', '--verbose', '--xml', '/r']], self.commands)
+
+
+
+class GitBackendTests(BackendTestsMixin, TestCase):
+    """
+    Tests for L{GitBackend}.
+    """
+    backendClass = GitBackend
+
+    def test_verify(self):
+        """
+        L{GitBackend.verify} runs C{git rev-parse} unless the directory is
+        known to be in a Git working tree.
+        """
+        detected = [GIT]
+        self.patch(_vcs, 'detectWorkingCopy', lambda directory: detected[0])
+        self.backend.verify('/repository')
+        self.assertEqual([], self.commands)
+        detected[0] = None
+        self.backend.verify('/repository')
+        self.assertEqual(
+            [['git', '-C', '/repository', 'rev-parse', '--git-dir']],
+            self.commands)
+
+
+    def test_remove(self):
+        """
+        L{GitBackend.remove} removes files with as few C{git rm} commands as
+        fit on a command line, run in the directory of the first file.
+        """
+        self.patch(_process, '_argumentLimit', lambda: 200)
+        paths = ['/repository/topfiles/%d.misc' % (i,) for i in range(20)]
+        self.backend.remove(paths)
+        self.assertTrue(1 < len(self.commands) < len(paths))
+        prefix = ['git', '-C', '/repository/topfiles', 'rm', '-q', '-f', '--']
+        for command in self.commands:
+            self.assertEqual(prefix, command[:7])
+        self.assertEqual(
+            paths, [path for command in self.commands for path in command[7:]])
+
+
+    def test_unversioned(self):
+        """
+        L{GitBackend.unversioned} finds the untracked and ignored files with
+        C{git ls-files}, whose output is relative to the directory it was run
+        in.
+        """
+        self.outputs.append('1.misc\0sub/3.misc\0')
+        paths = ['/r/t/1.misc', '/r/t/2.misc', '/r/t/sub/3.misc']
+        self.assertEqual(
+            set(['/r/t/1.misc', '/r/t/sub/3.misc']),
+            self.backend.unversioned(paths))
+        self.assertEqual(
+            [['git', '-C', '/r/t', 'ls-files', '-z', '--others', '--'] +
+             paths],
+            self.commands)
+        self.assertEqual(set(), self.backend.unversioned([]))
+
+
+    def test_trackedFiles(self):
+        """
+        L{GitBackend.trackedFiles} lists the files under version control with
+        a single C{git ls-files} command, whose output is relative to the
+        directory it was run in.
+        """
+        self.outputs.append('NEWS\0topfiles/1 2.misc\0topfiles/NEWS\0')
+        self.assertEqual(
+            ['/r/NEWS', '/r/topfiles/1 2.misc', '/r/topfiles/NEWS'],
+            self.backend.trackedFiles('/r'))
+        self.assertEqual(
+            [['git', '-C', '/r', 'ls-files', '-z']], self.commands)
+
+
+
+class FilesystemBackendTests(BackendTestsMixin, TestCase):
+    """
+    Tests for L{FilesystemBackend}.
+    """
+    backendClass = FilesystemBackend
+
+    def test_verify(self):
+        """
+        L{FilesystemBackend.verify} accepts any directory.
+        """
+        self.patch(_vcs, 'detectWorkingCopy', lambda directory: None)
+        self.backend.verify('/repository')
+        self.assertEqual([], self.commands)
+
+
+    def test_remove(self):
+        """
+        L{FilesystemBackend.remove} deletes the files, ignoring those which
+        are already gone, without running any command.
+        """
+        directory = FilePath(self.mktemp())
+        directory.makedirs()
+        present = directory.child('1.misc')
+        present.setContent('')
+        self.backend.remove([present.path, directory.child('2.misc').path])
+        self.assertEqual([], directory.listdir())
+        self.assertEqual([], self.commands)
+        self.assertNotIn('subprocesses', self.tracer.counters)
+
+
+    def test_removeFails(self):
+        """
+        L{FilesystemBackend.remove} raises the error of a file which cannot
+        be deleted.
+        """
+        directory = FilePath(self.mktemp())
+        directory.child('1.misc').makedirs()
+        self.assertRaises(
+            OSError, self.backend.remove, [directory.child('1.misc').path])
+
+
+    def test_unversioned(self):
+        """
+        L{FilesystemBackend.unversioned} reports every file as unversioned.
+        """
+        self.assertEqual(
+            set(['/r/1.misc', '/r/2.misc']),
+            self.backend.unversioned(['/r/1.misc', '/r/2.misc']))
+
+
+    def test_trackedFiles(self):
+        """
+        L{FilesystemBackend.trackedFiles} does not know which files are
+        under version control.
+        """
+        self.assertIdentical(None, self.backend.trackedFiles('/r'))
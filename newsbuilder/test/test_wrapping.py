@@ -0,0 +1,109 @@
+# Copyright (c) Twisted Matrix Laboratories.
+# See LICENSE for details.
+
+"""
+Tests for L{newsbuilder._wrapping}.
+"""
+
+import random
+import textwrap
+
+from twisted.trial.unittest import TestCase
+
+from newsbuilder import _wrapping
+from newsbuilder._wrapping import fill
+
+# Pieces from which to build text to wrap, including words longer than a
+# line and the characters which TextWrapper treats specially.
+_PIECES = [
+    'a', 'now', 'twisted.internet.defer.Deferred', 'x' * 67, 'y' * 150,
+    ' ', '  ', ' - ', '(#1234)', '#5,', '.', '-', '--', 'well-known',
+    '\t', '\n', '\xc3\xa9']
+
+
+
+class FillTests(TestCase):
+    """
+    Tests for L{fill}.
+    """
+    def assertFillsLikeTextwrap(self, text):
+        """
+        Assert that L{fill} wraps C{text} exactly like L{textwrap.fill}
+        does with the news entry settings.
+        """
+        self.assertEqual(
+            textwrap.fill(text, subsequent_indent='   '), fill(text))
+
+
+    def test_entry(self):
+        """
+        L{fill} wraps an entry at 70 columns, indenting all the lines but the
+        first by three spaces.
+        """
+        entry = (
+            ' - twisted.internet.defer.Deferred now has a method which does '
+            'something useful with its result. (#1234, #1235)')
+        self.assertEqual(
+            ' - twisted.internet.defer.Deferred now has a method which does\n'
+            '   something useful with its result. (#1234, #1235)',
+            fill(entry))
+        self.assertFillsLikeTextwrap(entry)
+
+
+    def test_misc(self):
+        """
+        L{fill} wraps a long list of ticket numbers like L{textwrap.fill}.
+        """
+        self.assertFillsLikeTextwrap(
+            ' - ' + ', '.join('#%d' % (ticket,) for ticket in range(5000)))
+
+
+    def test_empty(self):
+        """
+        L{fill} returns an empty string for an empty or blank entry.
+        """
+        self.assertEqual('', fill(''))
+        self.assertFillsLikeTextwrap('')
+        self.assertFillsLikeTextwrap('    ')
+
+
+    def test_longWords(self):
+        """
+        L{fill} breaks words which are longer than a line, starting on the
+        line they follow.
+        """
+        for text in ['x' * 200, ' - ' + 'x' * 200, 'x' * 70 + ' ' + 'y' * 80,
+                     'x' * 69 + ' ' + 'y' * 80]:
+            self.assertFillsLikeTextwrap(text)
+
+
+    def test_slowPath(self):
+        """
+        L{fill} hands text with hyphens within words, whitespace other than
+        spaces or non-ASCII characters to L{textwrap}.
+        """
+        calls = []
+        wrapper = _wrapping._wrapper
+        class RecordingWrapper(object):
+            def fill(self, text):
+                calls.append(text)
+                return wrapper.fill(text)
+        self.patch(_wrapping, '_wrapper', RecordingWrapper())
+        texts = ['a well-known bug', 'a\ttab', 'caf\xc3\xa9', u'unicode']
+        for text in texts:
+            self.assertFillsLikeTextwrap(text)
+        fill(' - plain text')
+        self.assertEqual(texts, calls)
+
+
+    def test_differential(self):
+        """
+        L{fill} wraps random text made of words, spaces and special
+        characters exactly like L{textwrap.fill}.
+        """
+        generator = random.Random(17)
+        for _ in range(5000):
+            text = ''.join(
+                generator.choice(_PIECES)
+                for _ in range(generator.randint(0, 40)))
+            self.assertFillsLikeTextwrap(text)